@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth.signals import user_logged_out
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+
+        from . import authentication, instrumentation, replicas
+        from .cache import require_shared_cache
+
+        if settings.AUTH_TOKEN_CACHE_ALIAS:
+            require_shared_cache(
+                "AUTH_TOKEN_CACHE_ALIAS", settings.AUTH_TOKEN_CACHE_ALIAS
+            )
+        replicas.check_pin_cache()
+
+        post_delete.connect(authentication.invalidate_token, sender=Token)
+        post_save.connect(authentication.invalidate_token, sender=Token)
+        post_save.connect(authentication.invalidate_user_tokens,
+                          sender=get_user_model())
+        user_logged_out.connect(authentication.invalidate_logged_out_user)
+        # Запросы к БД передаются наблюдателям текущего запроса (метрики)
+        connection_created.connect(instrumentation.install_query_dispatcher)
@@ -0,0 +1,67 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def json_response(data, status=200):
+    """Ответ с тем же JSON, что отдаёт JSONRenderer в представлениях DRF"""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status,
+        content_type="application/json",
+    )
+
+
+def _authenticate(request):
+    drf_request = Request(
+        request,
+        authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+    try:
+        drf_request.user
+    except APIException:
+        return None
+    return drf_request
+
+
+async def authenticate(request):
+    """
+    Request DRF с пользователем, определённым аутентификаторами API.
+    Токен обычно берётся из кэша, но при промахе нужен запрос к БД, поэтому
+    проверка выполняется вне цикла событий. None при неверных данных.
+    """
+    return await sync_to_async(_authenticate)(request)
+
+
+def async_read_view(sync_view, handler):
+    """
+    Асинхронное представление поверх представления вьюсета sync_view.
+
+    GET и HEAD обслуживает корутина handler(request, **kwargs) без
+    занятого потока на время ожидания БД и кэша. Если handler вернул None
+    (нет объекта, ошибка аутентификации и другие редкие случаи), а также
+    для остальных методов запрос передаётся синхронному sync_view, чтобы
+    ответы об ошибках и права доступа остались прежними.
+    """
+    run_sync_view = sync_to_async(sync_view)
+
+    # Атрибуты представления DRF (actions, csrf_exempt) переходят обёртке
+    @wraps(sync_view)
+    async def view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            response = await handler(request, **kwargs)
+            if response is not None:
+                return response
+        return await run_sync_view(request, *args, **kwargs)
+
+    return view
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.metrics import record_cache
+
+TOKEN_CACHE_KEY = "auth:token:{}"
+
+
+class TokenCache:
+    """
+    Кэш «ключ токена -> id пользователя» в два уровня.
+
+    Первый — LRU в памяти процесса на AUTH_TOKEN_CACHE_SIZE записей со
+    сроком AUTH_TOKEN_LOCAL_TTL секунд: токен, отозванный в другом воркере,
+    принимается не дольше этого срока. Второй, если задан
+    AUTH_TOKEN_CACHE_ALIAS, — общий кэш воркеров (Redis, Memcached) со
+    сроком AUTH_TOKEN_CACHE_TTL, удаление из которого действует сразу
+    везде. Данные пользователя и хеш пароля в кэш не попадают.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def shared(self):
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _key(key):
+        # Сам ключ токена в кэш не попадает
+        return TOKEN_CACHE_KEY.format(
+            hashlib.sha256(key.encode()).hexdigest()
+        )
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def _set_local(self, key, user_id):
+        expires_at = time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        key = self._key(key)
+        user_id = self._get_local(key)
+        shared = self.shared
+        if user_id is None and shared is not None:
+            user_id = shared.get(key)
+            if user_id is not None:
+                self._set_local(key, user_id)
+        record_cache("auth_tokens", user_id is not None)
+        return user_id
+
+    def set(self, key, user_id):
+        key = self._key(key)
+        self._set_local(key, user_id)
+        shared = self.shared
+        if shared is not None:
+            shared.set(key, user_id, settings.AUTH_TOKEN_CACHE_TTL)
+
+    def delete(self, *keys):
+        keys = [self._key(key) for key in keys]
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared = self.shared
+        if shared is not None and keys:
+            shared.delete_many(keys)
+
+    def delete_user(self, user_id):
+        self.delete(
+            *Token.objects
+            .filter(user_id=user_id)
+            .values_list("key", flat=True)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedUser(SimpleLazyObject):
+    """
+    Пользователь токена из кэша. id и признаки аутентификации известны
+    сразу, остальные поля загружаются из БД при первом обращении к ним:
+    большинству запросов на чтение хватает id.
+    """
+
+    def __init__(self, user_id):
+        manager = get_user_model()._default_manager
+        super().__init__(partial(manager.get, pk=user_id))
+        # Атрибуты самой обёртки не требуют загрузки пользователя.
+        # Неактивные пользователи в кэш не попадают
+        self.__dict__.update(
+            pk=user_id,
+            id=user_id,
+            is_active=True,
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+    def __bool__(self):
+        return True
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который не обращается к БД для уже виденных токенов.
+    Записи сбрасываются при удалении токена (выход через djoser), а также
+    при сохранении пользователя: смене пароля, деактивации, правке профиля.
+    """
+
+    def authenticate_credentials(self, key):
+        user_id = token_cache.get(key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user.pk)
+            return user, token
+        return CachedUser(user_id), Token(key=key, user_id=user_id)
+
+
+def invalidate_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, raw=False, **kwargs):
+    if not raw:
+        token_cache.delete_user(instance.pk)
+
+
+def invalidate_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        token_cache.delete_user(user.pk)
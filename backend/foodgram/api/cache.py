@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.response import Response
+
+from api.metrics import record_cache
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT_TIMEOUT = 2
+LOCK_POLL_INTERVAL = 0.05
+
+# Бэкенды, записи которых видны только процессу, который их сделал
+PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+def is_shared_cache(alias):
+    """Видят ли все процессы сервера одни и те же записи кэша alias"""
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    return backend is not None and backend not in PROCESS_LOCAL_BACKENDS
+
+
+def require_shared_cache(setting_name, alias):
+    """
+    Прерывает запуск, если кэш alias из настройки setting_name хранит
+    записи в памяти процесса: воркеры не увидят изменения друг друга.
+    """
+    if not is_shared_cache(alias):
+        raise ImproperlyConfigured(
+            f"{setting_name} must name a cache shared by all worker "
+            f"processes (Redis, Memcached, database), got {alias!r}"
+        )
+
+
+def response_cache_key(request, *versions):
+    """Ключ ответа по адресу, параметрам запроса и версиям данных"""
+    params = sorted(
+        (name, sorted(values)) for name, values in request.query_params.lists()
+    )
+    raw = repr((request.get_host(), request.path, params, versions))
+    return "responses:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_response(key, build_response):
+    """
+    Возвращает ответ из кэша или строит его через build_response.
+
+    Пока один запрос строит ответ, остальные с тем же ключом ждут его
+    появления в кэше, а не повторяют ту же работу одновременно.
+    Кэшируются только успешные ответы.
+    """
+    cache = caches[settings.RECIPE_CACHE_ALIAS]
+    cached = cache.get(key)
+    record_cache("responses", cached is not None)
+    if cached is not None:
+        return Response(cached)
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            response = build_response()
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    response.data,
+                    settings.RECIPE_RESPONSE_CACHE_TIMEOUT,
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + LOCK_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(cached)
+    return build_response()
+
+
+async def acached_data(key, build_data):
+    """
+    Асинхронный вариант cached_response для представлений, которые сами
+    сериализуют ответ: возвращает данные из кэша или результат build_data().
+    Ожидание чужой блокировки не занимает поток.
+    """
+    cache = caches[settings.RECIPE_CACHE_ALIAS]
+    cached = await cache.aget(key)
+    record_cache("responses", cached is not None)
+    if cached is not None:
+        return cached
+
+    lock_key = f"{key}:lock"
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            data = await build_data()
+            await cache.aset(key, data, settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+            return data
+        finally:
+            await cache.adelete(lock_key)
+
+    deadline = time.monotonic() + LOCK_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+    return await build_data()
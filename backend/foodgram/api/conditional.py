@@ -0,0 +1,62 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+NANOSECONDS = 10 ** 9
+
+
+def response_validators(request, versions, user_id=None):
+    """ETag и Last-Modified ответа для данных версий versions"""
+    query_params = getattr(request, "query_params", request.GET)
+    params = sorted(
+        (name, sorted(values)) for name, values in query_params.lists()
+    )
+    raw = repr((request.path, params, user_id, versions))
+    etag = quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+    return etag, max(versions) // NANOSECONDS
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def conditional_response(request, build_response, versions):
+    """
+    Отвечает 304 Not Modified, если у клиента актуальная копия ответа.
+
+    ETag и Last-Modified вычисляются по версиям данных из БД (время
+    изменения в наносекундах), адресу запроса и пользователю, поэтому при
+    совпадении валидаторов ответ не сериализуется вовсе.
+    """
+    etag, last_modified = response_validators(
+        request, versions, request.user.pk
+    )
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+    return _set_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, build_response, versions,
+                                user_id=None):
+    """
+    conditional_response для асинхронных представлений: build_response —
+    корутина. Пользователь передаётся явно, так как request.user в цикле
+    событий может потребовать запроса к БД.
+    """
+    etag, last_modified = response_validators(request, versions, user_id)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = await build_response()
+        if response.status_code != 200:
+            return response
+    return _set_validators(response, etag, last_modified)
@@ -1,5 +1,8 @@
+from django.db.models import F
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import IngredientModel, RecipeModel
+from recipes.recipe_index import id_set, recipe_ingredient_index
+from recipes.search import get_search_backend
 
 
 class FilterIngredientModel(FilterSet):
@@ -12,25 +15,84 @@ class FilterIngredientModel(FilterSet):
         fields = ["name"]
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку чисел через запятую"""
+
+
 class FilterRecipeModel(FilterSet):
     """Фильтр для модели рецептов"""
 
     author = filters.NumberFilter(field_name="author__id")
     shopping_cart = filters.BooleanFilter(method="filter_shopping_cart")
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
+    search = filters.CharFilter(method="filter_search")
+    ingredients = NumberInFilter(method="filter_ingredients")
+    exclude_ingredients = NumberInFilter(method="filter_exclude_ingredients")
+    ordering = filters.ChoiceFilter(
+        choices=(("trending", "trending"),), method="filter_ordering"
+    )
 
     class Meta:
         model = RecipeModel
-        fields = ["author", "is_favorited", "shopping_cart"]
+        fields = [
+            "author",
+            "is_favorited",
+            "shopping_cart",
+            "search",
+            "ingredients",
+            "exclude_ingredients",
+            "ordering",
+        ]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        include = self.form.cleaned_data.get("ingredients")
+        exclude = self.form.cleaned_data.get("exclude_ingredients")
+        if not include and not exclude:
+            return queryset
+        # Пересечение и исключение считаются по инвертированному индексу в
+        # памяти, в БД отобранные id уходят одним параметром. Пустые
+        # элементы списка (ingredients=1,,2) пропускаются
+        included, excluded = recipe_ingredient_index.matching(
+            include=[int(pk) for pk in include or () if pk is not None],
+            exclude=[int(pk) for pk in exclude or () if pk is not None],
+        )
+        if included is not None:
+            queryset = queryset.filter(
+                pk__in=id_set(included - excluded, queryset.db)
+            )
+        elif excluded:
+            queryset = queryset.exclude(pk__in=id_set(excluded, queryset.db))
+        return queryset
+
+    def filter_ingredients(self, queryset, name, value):
+        # Отбор выполняется в filter_queryset после остальных фильтров
+        return queryset
+
+    filter_exclude_ingredients = filter_ingredients
+
+    def filter_search(self, queryset, name, value):
+        return get_search_backend(queryset.db).search(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        # Только рецепты с недавней активностью, по предрассчитанной оценке.
+        # Сортировка по полям таблицы оценок читается прямо из её индекса
+        return (queryset
+                .filter(trending__isnull=False)
+                .annotate(trending_score=F("trending__score"),
+                          trending_id=F("trending__recipe_id"))
+                .order_by("-trending_score", "trending_id"))
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if user.is_authenticated and value:
-            return queryset.filter(favoriterecipemodel_relations__user=user)
+            return queryset.filter(
+                favoriterecipemodel_relations__user=user.pk
+            )
         return queryset
 
     def filter_of_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if user.is_authenticated and value:
-            return queryset.filter(shoppingcart_relations__user=user)
+            return queryset.filter(shoppingcart_relations__user=user.pk)
         return queryset
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger("foodgram.requests")
+
+# Литералы и списки параметров не влияют на форму запроса: без них
+# одинаковые запросы с разными id дают один отпечаток
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+SQL_PARAMS_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+SQL_PREVIEW_LENGTH = 200
+
+_current = ContextVar("request_metrics", default=None)
+_query_observers = ContextVar("query_observers", default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    """
+    Обёртка execute всех подключений к БД: передаёт запрос наблюдателям
+    текущего контекста. Контекст копируется и в поток, где sync_to_async
+    выполняет запросы асинхронного ORM, поэтому наблюдатели видят их тоже.
+    """
+    for observer in reversed(_query_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender, connection, **kwargs):
+    if dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_query)
+
+
+@contextmanager
+def observe_queries(observer):
+    """Передаёт observer запросы к БД, выполненные внутри блока"""
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _query_observers.reset(token)
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса и его короткий хэш"""
+    normalized = SQL_STRING.sub("?", sql)
+    normalized = SQL_NUMBER.sub("?", normalized)
+    normalized = SQL_PARAMS_LIST.sub("(?...)", normalized)
+    normalized = " ".join(normalized.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _call_site():
+    """Ближайший к запросу кадр кода проекта, кроме этого модуля"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if (frame.filename.startswith(base_dir)
+                and frame.filename != __file__
+                and "site-packages" not in frame.filename):
+            path = frame.filename[len(base_dir) + 1:]
+            return f"{path}:{frame.lineno} {frame.name}"
+    return None
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL, сериализаторы, представление"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_queries = 0
+        self.serializer_time = defaultdict(float)
+        self.serializer_depth = 0
+        self.fingerprints = Counter()
+        self.statements = {}
+        self.call_sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            if self.serializer_depth:
+                self.serializer_queries += 1
+            key, normalized = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.statements.setdefault(key, normalized)
+            # Стек снимается один раз на отпечаток, когда он стал повтором
+            threshold = settings.REQUEST_METRICS_DUPLICATE_THRESHOLD
+            if self.fingerprints[key] == threshold:
+                self.call_sites[key] = _call_site()
+
+    def duplicates(self):
+        threshold = settings.REQUEST_METRICS_DUPLICATE_THRESHOLD
+        return [
+            {
+                "fingerprint": key,
+                "count": count,
+                "sql": self.statements[key][:SQL_PREVIEW_LENGTH],
+                "call_site": self.call_sites.get(key),
+            }
+            for key, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def timings(self, finished):
+        """Длительности этапов в миллисекундах"""
+        total = finished - self.started
+        timings = {
+            "db": self.sql_time,
+            "serializer": sum(self.serializer_time.values()),
+            "total": total,
+        }
+        if self.view_started is not None:
+            view_finished = self.view_finished or finished
+            timings["view"] = view_finished - self.view_started
+            timings["render"] = finished - view_finished
+        return {
+            name: round(value * 1000, 2) for name, value in timings.items()
+        }
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает время to_representation сериализатора в метриках запроса.
+    Вложенные сериализаторы засчитываются внешнему.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time[type(self).__name__] += (
+                time.perf_counter() - started
+            )
+            metrics.serializer_depth -= 1
+
+
+class ObservingMiddleware:
+    """
+    Основа middleware, которое работает и под WSGI, и под ASGI без
+    переключения потоков. Подкласс определяет observe(request) —
+    контекстный менеджер вокруг обработки запроса — и
+    record(request, response, state) с результатом observe.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self.observe(request) as state:
+            response = self.get_response(request)
+        return self.record(request, response, state)
+
+    async def __acall__(self, request):
+        with self.observe(request) as state:
+            response = await self.get_response(request)
+        return self.record(request, response, state)
+
+
+class RequestMetricsMiddleware(ObservingMiddleware):
+    """
+    Метрики запроса для доли REQUEST_METRICS_SAMPLE_RATE запросов: число и
+    время SQL-запросов, повторяющиеся запросы (N+1), время сериализаторов,
+    представления и рендеринга. Метрики отдаются заголовком Server-Timing и
+    пишутся строкой JSON в лог foodgram.requests. Запросы дольше
+    REQUEST_METRICS_SLOW_MS пишутся с уровнем WARNING, в том числе не
+    попавшие в выборку (только с общим временем).
+    """
+
+    @contextmanager
+    def observe(self, request):
+        if random.random() >= settings.REQUEST_METRICS_SAMPLE_RATE:
+            yield time.perf_counter()
+            return
+        metrics = RequestMetrics()
+        request._request_metrics = metrics
+        token = _current.set(metrics)
+        try:
+            with observe_queries(metrics):
+                yield metrics
+        finally:
+            _current.reset(token)
+
+    def record(self, request, response, state):
+        if not isinstance(state, RequestMetrics):
+            elapsed = (time.perf_counter() - state) * 1000
+            if elapsed >= settings.REQUEST_METRICS_SLOW_MS:
+                self._log(
+                    request,
+                    response,
+                    {"timings": {"total": round(elapsed, 2)}},
+                )
+            return response
+
+        metrics = state
+        timings = metrics.timings(time.perf_counter())
+        response["Server-Timing"] = ", ".join(
+            [f'db;dur={timings["db"]};desc="{metrics.queries} queries"']
+            + [f"{name};dur={timings[name]}"
+               for name in ("serializer", "view", "render", "total")
+               if name in timings]
+        )
+        self._log(request, response, {
+            "timings": timings,
+            "queries": metrics.queries,
+            "serializer_queries": metrics.serializer_queries,
+            "serializers": {
+                name: round(value * 1000, 2)
+                for name, value in metrics.serializer_time.items()
+            },
+            "duplicates": metrics.duplicates(),
+        })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, "_request_metrics", None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после выхода из представления
+        metrics = getattr(request, "_request_metrics", None)
+        if metrics is not None:
+            metrics.view_finished = time.perf_counter()
+        return response
+
+    def _log(self, request, response, record):
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            **record,
+        }
+        slow = record["timings"]["total"] >= settings.REQUEST_METRICS_SLOW_MS
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+            extra={"request_metrics": record},
+        )
@@ -0,0 +1,131 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from api.instrumentation import ObservingMiddleware, observe_queries
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Каталог метрик воркеров очищает и создаёт gunicorn (on_starting). Команды
+# manage.py в том же окружении запускаются без него, а метрика с метками
+# открывает свой файл в этом каталоге при первом изменении
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+REQUESTS = Counter(
+    "foodgram_requests_total",
+    "Handled HTTP requests",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "foodgram_request_duration_seconds",
+    "Time to build an HTTP response",
+    ["route", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "foodgram_request_db_queries",
+    "Database queries executed per HTTP request",
+    ["route", "method"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+CACHE_REQUESTS = Counter(
+    "foodgram_cache_requests_total",
+    "Cache lookups; the hit rate is the share of result=\"hit\"",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache, hit):
+    """Учитывает обращение к кэшу cache: попадание или промах"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def route_name(request, view_func):
+    """
+    Метка маршрута: «basename.action» для вьюсетов DRF (например,
+    recipes.download_shopping_cart), имя URL для остальных представлений.
+    """
+    actions = getattr(view_func, "actions", None)
+    if actions is not None:
+        basename = view_func.initkwargs.get("basename")
+        action = actions.get(request.method.lower(), "method_not_allowed")
+        return f"{basename}.{action}"
+    match = request.resolver_match
+    return (match.view_name if match else None) or view_func.__name__
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(ObservingMiddleware):
+    """
+    Считает запросы, время ответа и число SQL-запросов по маршрутам.
+    Запросы, не сопоставленные ни одному URL, попадают в одну метку,
+    чтобы произвольные адреса не раздували число временных рядов.
+    """
+
+    @contextmanager
+    def observe(self, request):
+        request._metrics_route = UNMATCHED_ROUTE
+        with observe_queries(QueryCounter()) as queries:
+            yield time.perf_counter(), queries
+
+    def record(self, request, response, state):
+        started, queries = state
+        elapsed = time.perf_counter() - started
+        route, method = request._metrics_route, request.method
+        REQUESTS.labels(route, method, response.status_code).inc()
+        REQUEST_LATENCY.labels(route, method).observe(elapsed)
+        REQUEST_QUERIES.labels(route, method).observe(queries.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_route = route_name(request, view_func)
+
+
+def _authorized(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. Доступны сотрудникам и по
+    заголовку «Authorization: Bearer <METRICS_TOKEN>».
+
+    Если задан PROMETHEUS_MULTIPROC_DIR, каждый воркер пишет метрики в свои
+    файлы в этом каталоге, а ответ собирается из файлов всех воркеров.
+    """
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -1,9 +1,137 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_after(fields, values):
+    """
+    Условие «строка идёт после values» для сортировки по fields.
+    Поле с префиксом «-» сортируется по убыванию.
+    """
+    field, *rest_fields = fields
+    value, *rest_values = values
+    name = field.lstrip("-")
+    after, from_ = ("lt", "lte") if field.startswith("-") else ("gt", "gte")
+    if not rest_fields:
+        return Q(**{f"{name}__{after}": value})
+    # field >= value в начале позволяет БД сканировать индекс с нужного места
+    return Q(**{f"{name}__{from_}": value}) & (
+        Q(**{f"{name}__{after}": value})
+        | keyset_after(rest_fields, rest_values)
+    )
 
 
 class PaginationClass(PageNumberPagination):
-    """Класс Пагинации"""
+    """
+    Класс Пагинации
+
+    По умолчанию постраничный (page/limit). Если передан параметр cursor
+    и у вьюсета задан cursor_ordering, включается пагинация по ключу:
+    следующая страница выбирается условием на поля cursor_ordering, без
+    COUNT(*) и OFFSET. Вьюсет с cursor_only = True всегда отдаётся по ключу.
+    Метод вьюсета get_cursor_ordering, если есть, заменяет cursor_ordering.
+    """
 
     page_size = 8
     page_size_query_param = "limit"
     max_page_size = 50
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if hasattr(view, "get_cursor_ordering"):
+            self.ordering = view.get_cursor_ordering()
+        else:
+            self.ordering = getattr(view, "cursor_ordering", None)
+        self.cursor_mode = self.ordering is not None and (
+            getattr(view, "cursor_only", False)
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(keyset_after(self.ordering, position))
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        page = results[:page_size]
+        self.next_position = (
+            [getattr(page[-1], field.lstrip("-")) for field in self.ordering]
+            if self.has_next else None
+        )
+        return page
+
+    @staticmethod
+    def _cursor_value(queryset, name, value):
+        """Значение курсора, приведённое к полю name и проверенное им"""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            field = annotation.output_field
+        else:
+            field = queryset.model._meta.get_field(name)
+        # Для внешнего ключа проверяется поле, на которое он ссылается
+        field = getattr(field, "target_field", field)
+        value = field.to_python(value)
+        field.run_validators(value)
+        return value
+
+    def decode_cursor(self, request, queryset):
+        """
+        Позиция из параметра cursor. Каждое значение приводится к типу своего
+        поля сортировки, поэтому подделанный курсор даёт 404, а не ошибку БД.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(isinstance(value, (str, int, float))
+                           for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                self._cursor_value(queryset, field.lstrip("-"), value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": None,
+            "results": data,
+        })
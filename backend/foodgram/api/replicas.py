@@ -0,0 +1,128 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import require_shared_cache
+from .instrumentation import ObservingMiddleware
+
+PIN_KEY = "replicas:pinned:{}"
+# Модели, которые читаются только из основной БД: токен, выданный при
+# входе, должен работать в следующем же запросе
+PRIMARY_ONLY_MODELS = {"authtoken.token"}
+
+_routing = ContextVar("read_routing", default=None)
+
+
+class ReadRouting:
+    """Реплика для чтения в текущем запросе и признак записи в нём"""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """
+    Чтения запроса, которому ReplicaRoutingMiddleware выбрало реплику, идут
+    в неё, пока в этом запросе не было записи. Записи, миграции и всё вне
+    HTTP-запросов (команды, фоновые задачи) работают с основной БД.
+    Попутная запись в безопасном запросе (служебная строка версий)
+    переводит на основную БД только его собственные чтения.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.wrote or routing.replica is None:
+            return None
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return None
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же строки, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def check_pin_cache():
+    """
+    С репликами закрепления должны храниться в общем кэше: иначе запрос,
+    попавший в другой воркер, прочитает с реплики ещё не записанное.
+    """
+    if settings.REPLICA_DATABASES:
+        require_shared_cache(
+            "REPLICA_PIN_CACHE_ALIAS", settings.REPLICA_PIN_CACHE_ALIAS
+        )
+
+
+def _pin_cache():
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def _pin_key(request):
+    credentials = request.headers.get("Authorization")
+    if not credentials:
+        return None
+    return PIN_KEY.format(hashlib.sha256(credentials.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware(ObservingMiddleware):
+    """
+    Направляет чтения безопасных методов во вьюсетах с replica_reads = True
+    на случайную реплику из REPLICA_DATABASES.
+
+    После успешного небезопасного запроса с записью учётные данные
+    пользователя на REPLICA_PIN_SECONDS закрепляются за основной БД в
+    общем кэше REPLICA_PIN_CACHE_ALIAS: пока реплика догоняет её,
+    пользователь в любом воркере читает свои изменения оттуда, куда их
+    записал.
+    """
+
+    @contextmanager
+    def observe(self, request):
+        routing = ReadRouting()
+        token = _routing.set(routing)
+        try:
+            yield routing
+        finally:
+            _routing.reset(token)
+
+    def record(self, request, response, state):
+        if (
+            state.wrote
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            key = _pin_key(request)
+            if key is not None:
+                _pin_cache().set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if (
+            routing is None
+            or not settings.REPLICA_DATABASES
+            or request.method not in SAFE_METHODS
+            or not getattr(
+                getattr(view_func, "cls", None), "replica_reads", False
+            )
+        ):
+            return
+        key = _pin_key(request)
+        if key is not None and _pin_cache().get(key):
+            return
+        routing.replica = random.choice(settings.REPLICA_DATABASES)
@@ -1,8 +1,28 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
 from rest_framework import serializers
 
+# Размер блока base64 кратен 4, чтобы блоки декодировались независимо
+BASE64_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def decode_base64_file(encoded, name, max_size):
+    """Декодирует base64 блоками во временный файл, проверяя размер"""
+    if len(encoded) * 3 // 4 > max_size:
+        raise serializers.ValidationError("Image is too large.")
+
+    decoded = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+        chunk = encoded[start:start + BASE64_CHUNK_SIZE]
+        decoded.write(base64.b64decode(chunk))
+    decoded.seek(0)
+    return File(decoded, name=name)
+
 
 class Base64Field(serializers.ImageField):
     """Поле для обработки изображений в формате base64"""
@@ -12,9 +32,44 @@ class Base64Field(serializers.ImageField):
             try:
                 header, encoded = data.split(";base64,", 1)
                 extension = header.split("/")[-1]
-                decoded_file = base64.b64decode(encoded)
-                data = ContentFile(decoded_file, name=f"temp.{extension}")
-            except (ValueError, TypeError, IndexError, base64.binascii.Error):
+                data = decode_base64_file(
+                    encoded,
+                    f"temp.{extension}",
+                    settings.IMAGE_UPLOAD_MAX_SIZE,
+                )
+            except (ValueError, TypeError, IndexError, binascii.Error):
                 raise serializers.ValidationError("Invalid base64 image data.")
 
-        return super().to_internal_value(data)
+        image_file = super().to_internal_value(data)
+        width, height = image_file.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError("Image resolution is too large.")
+        return image_file
+
+
+class ImageVariantField(serializers.ImageField):
+    """
+    Поле только для чтения, отдающее вариант изображения нужного размера.
+    detail_variant используется вместо variant в действии retrieve.
+    """
+
+    def __init__(self, variant, detail_variant=None, **kwargs):
+        self.variant = variant
+        self.detail_variant = detail_variant
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def _get_variant(self):
+        view = self.context.get("view")
+        if self.detail_variant and getattr(view, "action", None) == "retrieve":
+            return self.detail_variant
+        return self.variant
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = value.variant_url(self._get_variant())
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
 from recipes.models import IngredientModel, RecipeIngredientModel
+from api.instrumentation import TimedSerializerMixin
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для создания и редактирования ингредиентов"""
 
     class Meta:
@@ -25,12 +26,13 @@ class IngredientRecipeReadSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
-    """Сериализатор для записи ингредиентов в рецепт"""
+    """
+    Сериализатор для записи ингредиентов в рецепт.
+    Существование ингредиентов проверяется одним запросом для всего списка
+    в WriteRecipeSerializer.validate_ingredients.
+    """
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="ingredient",
-        queryset=IngredientModel.objects.all()
-    )
+    id = serializers.IntegerField(source="ingredient_id", min_value=1)
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
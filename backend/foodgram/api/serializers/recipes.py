@@ -1,19 +1,26 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    Prefetch,
+    prefetch_related_objects,
+)
 
-from recipes.models import RecipeModel, RecipeIngredientModel
+from recipes.models import IngredientModel, RecipeModel, RecipeIngredientModel
 from api.serializers.users import ProfileUserSerializer
 from api.serializers.ingredients import (
     IngredientRecipeReadSerializer,
     IngredientRecipeWriteSerializer,
 )
-from api.serializers.fields import Base64Field
+from api.serializers.fields import Base64Field, ImageVariantField
+from api.instrumentation import TimedSerializerMixin
+from api.viewer import get_viewer_relations
 
 User = get_user_model()
 
 
-class ReadRecipeSerializer(serializers.ModelSerializer):
+class ReadRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для чтения деталей рецепта"""
 
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
@@ -22,6 +29,7 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         many=True, read_only=True, source="recipe_ingredients"
     )
     author = ProfileUserSerializer(read_only=True)
+    image = ImageVariantField(variant="card", detail_variant="full")
 
     class Meta:
         model = RecipeModel
@@ -38,19 +46,37 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         )
         fields = read_only_fields
 
-    def _verify_relation_presence(self, recipe_object, relation_name):
+    def _verify_relation_presence(self, recipe_object, relation_ids_name):
         request = self.context.get("request")
-        user = getattr(request, "user", None)
-        if not user or not user.is_authenticated:
+        if request is None:
             return False
-        return getattr(recipe_object, relation_name).filter(user=user).exists()
+        relations = get_viewer_relations(request)
+        return recipe_object.pk in getattr(relations, relation_ids_name)
 
     def get_is_favorited(self, recipe_object):
-        return self._verify_relation_presence(recipe_object,
-                                              "favoriterecipemodel_relations")
+        return self._verify_relation_presence(
+            recipe_object, "favorite_recipe_ids"
+        )
 
     def get_is_in_shopping_cart(self, recipe_object):
-        return self._verify_relation_presence(recipe_object, "shoppingcart_relations")
+        return self._verify_relation_presence(recipe_object, "cart_recipe_ids")
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериалайзер списка id рецептов для пакетных операций"""
+
+    # Больше MAX_BIGINT id не бывает, а БД такое число не примет
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(
+            min_value=1, max_value=BigIntegerField.MAX_BIGINT
+        ),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_recipes(self, recipe_ids):
+        # Повторы не меняют результат, порядок сохраняется для ответа
+        return list(dict.fromkeys(recipe_ids))
 
 
 class WriteRecipeSerializer(serializers.ModelSerializer):
@@ -84,13 +110,24 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
                 {"ingredients": "Please fill in this field."}
             )
 
-        ingredient_ids = [item["ingredient"] for item in ingredients_info]
+        ingredient_ids = [item["ingredient_id"] for item in ingredients_info]
 
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError(
                 {"ingredients": "Duplicate values are not permitted."}
             )
 
+        existing_ids = set(
+            IngredientModel.objects
+            .filter(pk__in=ingredient_ids)
+            .values_list("pk", flat=True)
+        )
+        missing_ids = [pk for pk in ingredient_ids if pk not in existing_ids]
+        if missing_ids:
+            raise serializers.ValidationError(
+                {"ingredients": f"Ingredients do not exist: {missing_ids}."}
+            )
+
         return ingredients_info
 
     def _create_recipe_ingredients(self, recipe, ingredients_data):
@@ -98,13 +135,47 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
             [
                 RecipeIngredientModel(
                     recipe=recipe,
-                    ingredient=ingredient_data["ingredient"],
+                    ingredient_id=ingredient_data["ingredient_id"],
                     amount=ingredient_data["amount"]
                 )
                 for ingredient_data in ingredients_data
             ]
         )
 
+    def _update_recipe_ingredients(self, recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к ingredients_data, изменяя только
+        отличающиеся строки: новые добавляются, лишние удаляются, у
+        оставшихся обновляется количество.
+        """
+        amounts = {
+            item["ingredient_id"]: item["amount"] for item in ingredients_data
+        }
+        changed, removed_ids = [], []
+        recipe_ingredients = RecipeIngredientModel.objects.filter(
+            recipe=recipe
+        )
+        for recipe_ingredient in recipe_ingredients:
+            amount = amounts.pop(recipe_ingredient.ingredient_id, None)
+            if amount is None:
+                removed_ids.append(recipe_ingredient.pk)
+            elif amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+
+        if removed_ids:
+            RecipeIngredientModel.objects.filter(pk__in=removed_ids).delete()
+        if changed:
+            RecipeIngredientModel.objects.bulk_update(changed, ["amount"])
+        # В amounts остались только ингредиенты, которых в рецепте не было
+        self._create_recipe_ingredients(
+            recipe,
+            [
+                {"ingredient_id": ingredient_id, "amount": amount}
+                for ingredient_id, amount in amounts.items()
+            ],
+        )
+
     @transaction.atomic
     def create(self, validated_data):
         ingredients_info = validated_data.pop("ingredients")
@@ -115,9 +186,15 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_info = validated_data.pop("ingredients")
-        instance.recipe_ingredients.all().delete()
-        self._create_recipe_ingredients(instance, ingredients_info)
+        self._update_recipe_ingredients(instance, ingredients_info)
         return super().update(instance, validated_data)
 
     def to_representation(self, recipe):
+        # Ингредиенты с названиями загружаются одним запросом, а не по одному
+        prefetch_related_objects([recipe], Prefetch(
+            "recipe_ingredients",
+            queryset=RecipeIngredientModel.objects.select_related(
+                "ingredient"
+            ),
+        ))
         return ReadRecipeSerializer(recipe, context=self.context).data
@@ -2,10 +2,12 @@ from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
 from recipes.models import UserModel, RecipeModel
-from api.serializers.fields import Base64Field
+from api.serializers.fields import Base64Field, ImageVariantField
+from api.instrumentation import TimedSerializerMixin
+from api.viewer import get_viewer_relations
 
 
-class ProfileUserSerializer(UserSerializer):
+class ProfileUserSerializer(TimedSerializerMixin, UserSerializer):
     """Сериализатор для профиля пользователя"""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -25,19 +27,17 @@ class ProfileUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get("request")
-        return (request is not None
-                and not request.user.is_anonymous
-                and obj.followers.filter(user=request.user).exists()
-                and request.user.is_authenticated
-                )
+        if request is None:
+            return False
+        return obj.pk in get_viewer_relations(request).followed_author_ids
 
     def get_avatar(self, obj):
         if obj.avatar:
-            return obj.avatar.url
+            return obj.avatar.variant_url("card")
         return None
 
 
-class AvatarUserSerializer(serializers.ModelSerializer):
+class AvatarUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для аватара пользователя"""
 
     avatar = Base64Field(required=True)
@@ -56,9 +56,11 @@ class AvatarUserSerializer(serializers.ModelSerializer):
         model = UserModel
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для коротких деталей"""
 
+    image = ImageVariantField(variant="thumbnail")
+
     class Meta:
         model = RecipeModel
         read_only_fields = ("id", "name", "image", "cooking_time")
@@ -69,24 +71,26 @@ class RecipesWithUserSerializer(ProfileUserSerializer):
     """Сериализатор для рецептов пользователя"""
 
     recipes = serializers.SerializerMethodField()
-    recipes_amount = serializers.IntegerField(
-        source="recipes.amount", read_only=True
-    )
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(ProfileUserSerializer.Meta):
         fields = ProfileUserSerializer.Meta.fields + (
             "recipes",
-            "recipes_amount",
+            "recipes_count",
         )
 
     def get_recipes(self, user_obj):
-        recipes_limit = self.context.get("request").GET.get("recipes_limit")
-        recipes = user_obj.recipes.all()
-        if recipes_limit is not None:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        # Рецепты, уже ограниченные recipes_limit в prefetch вьюсета
+        recipes = getattr(user_obj, "limited_recipes", None)
+        if recipes is None:
+            request = self.context.get("request")
+            recipes_limit = request.GET.get("recipes_limit")
+            recipes = user_obj.recipes.all()
+            if recipes_limit is not None:
+                try:
+                    recipes = recipes[:int(recipes_limit)]
+                except ValueError:
+                    pass
 
         return ShortRecipeSerializer(
             recipes,
@@ -0,0 +1,45 @@
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    IngredientModel,
+    RecipeIngredientModel,
+    RecipeModel,
+    UserModel,
+)
+
+
+def create_user(username):
+    return UserModel.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="password-123",
+        first_name=username.title(),
+        last_name="Test",
+    )
+
+
+def create_token(user):
+    return Token.objects.create(user=user).key
+
+
+def create_ingredients(count, prefix="ingredient"):
+    return IngredientModel.objects.bulk_create(
+        IngredientModel(name=f"{prefix} {number}", measurement_unit="g")
+        for number in range(count)
+    )
+
+
+def create_recipe(author, name, ingredients=(), cooking_time=10):
+    recipe = RecipeModel.objects.create(
+        author=author,
+        name=name,
+        text=f"{name} text",
+        cooking_time=cooking_time,
+        image="recipes/test.png",
+        image_variants_ready=True,
+    )
+    RecipeIngredientModel.objects.bulk_create(
+        RecipeIngredientModel(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    return recipe
@@ -0,0 +1,125 @@
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.authentication import TokenCache, token_cache
+from api.cache import is_shared_cache, require_shared_cache
+
+from .factories import create_token, create_user
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # В тестах общий кэш заменяет кэш в памяти: клиенты одного процесса
+    # видят его так же, как воркеры видят Redis или Memcached
+    "tokens": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tokens",
+    },
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES, AUTH_TOKEN_CACHE_ALIAS=None)
+class CachedTokenAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user("reader")
+        self.key = create_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def token_queries(self, url="/api/users/me/"):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response.status_code, len([
+            query for query in queries
+            if "authtoken_token" in query["sql"]
+        ])
+
+    def test_repeated_request_skips_token_lookup(self):
+        self.assertEqual(self.token_queries(), (200, 1))
+        self.assertEqual(self.token_queries(), (200, 0))
+
+    def test_cached_user_is_loaded_on_demand(self):
+        self.token_queries()
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.data["username"], "reader")
+        # Проверке ETag нужен только id пользователя
+        etag = self.client.get("/api/recipes/")["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/recipes/", headers={"If-None-Match": etag}
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([
+            query for query in queries
+            if '"recipes_usermodel"' in query["sql"]
+        ])
+
+    def test_logout_revokes_cached_token(self):
+        self.token_queries()
+        response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.token_queries()[0], 401)
+
+    def test_user_save_evicts_cached_token(self):
+        self.token_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.token_queries()[0], 401)
+
+    def test_reads_do_not_load_cached_user(self):
+        self.token_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/recipes/?is_favorited=1&is_in_shopping_cart=1"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([
+            query for query in queries
+            if 'FROM "recipes_usermodel" WHERE' in query["sql"]
+        ])
+
+    @override_settings(AUTH_TOKEN_LOCAL_TTL=-1)
+    def test_local_entries_expire(self):
+        self.assertEqual(self.token_queries(), (200, 1))
+        self.assertEqual(self.token_queries(), (200, 1))
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="tokens")
+    def test_shared_cache_serves_other_workers(self):
+        self.assertEqual(self.token_queries(), (200, 1))
+        # Другой воркер: его LRU пуст, запись берётся из общего кэша
+        token_cache.clear()
+        self.assertEqual(self.token_queries(), (200, 0))
+        # В общем кэше только id пользователя, без хеша пароля
+        self.assertEqual(
+            caches["tokens"].get(TokenCache._key(self.key)), self.user.pk
+        )
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="tokens")
+    def test_revocation_reaches_shared_cache(self):
+        self.token_queries()
+        self.client.post("/api/auth/token/logout/")
+        token_cache.clear()
+        self.assertEqual(self.token_queries()[0], 401)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    @override_settings(CACHES={
+        **LOCAL_CACHES,
+        "memcached": {
+            "BACKEND": "django.core.cache.backends.memcached"
+                       ".PyMemcacheCache",
+            "LOCATION": "127.0.0.1:11211",
+        },
+    })
+    def test_process_local_cache_is_rejected(self):
+        self.assertTrue(is_shared_cache("memcached"))
+        self.assertFalse(is_shared_cache("tokens"))
+        self.assertFalse(is_shared_cache("missing"))
+        require_shared_cache("AUTH_TOKEN_CACHE_ALIAS", "memcached")
+        with self.assertRaises(ImproperlyConfigured):
+            require_shared_cache("AUTH_TOKEN_CACHE_ALIAS", "tokens")
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import FavoriteRecipeModel, RecipeModel, ShoppingCart
+
+from .factories import create_recipe, create_user
+
+MISSING_ID = 10 ** 6
+
+
+class BulkRelationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        author = create_user("author")
+        cls.recipes = [
+            create_recipe(author, f"recipe {number}") for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {row["id"]: row["status"] for row in response.data["results"]}
+
+    def counters(self, field):
+        return dict(RecipeModel.objects.values_list("pk", field))
+
+    def test_add_and_remove_favorites(self):
+        first, second, third = self.recipes
+        FavoriteRecipeModel.objects.create(user=self.user, recipe=first)
+
+        response = self.client.post(
+            "/api/recipes/favorite/bulk/",
+            {"recipes": [first.pk, second.pk, MISSING_ID]},
+            format="json",
+        )
+        self.assertEqual(self.statuses(response), {
+            first.pk: "exists", second.pk: "created", MISSING_ID: "not_found",
+        })
+        self.assertEqual(self.counters("favorites_count"), {
+            first.pk: 1, second.pk: 1, third.pk: 0,
+        })
+
+        response = self.client.delete(
+            "/api/recipes/favorite/bulk/",
+            {"recipes": [first.pk, third.pk]},
+            format="json",
+        )
+        self.assertEqual(self.statuses(response), {
+            first.pk: "deleted", third.pk: "not_found",
+        })
+        self.assertEqual(self.counters("favorites_count"), {
+            first.pk: 0, second.pk: 1, third.pk: 0,
+        })
+        self.assertEqual(
+            list(
+                FavoriteRecipeModel.objects
+                .filter(user=self.user)
+                .values_list("recipe_id", flat=True)
+            ),
+            [second.pk],
+        )
+
+    def test_counts_only_rows_inserted_by_the_request(self):
+        first, second, _ = self.recipes
+        bulk_create = QuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            # Параллельный запрос вставляет ту же связь между проверкой и
+            # вставкой и сам увеличивает счётчик
+            ShoppingCart.objects.create(
+                user=self.user,
+                recipe=first,
+                created_at=timezone.now() - timedelta(seconds=1),
+            )
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "bulk_create", racing_bulk_create):
+            response = self.client.post(
+                "/api/recipes/shopping_cart/bulk/",
+                {"recipes": [first.pk, second.pk]},
+                format="json",
+            )
+        self.assertEqual(self.statuses(response), {
+            first.pk: "exists", second.pk: "created",
+        })
+        counters = self.counters("shopping_carts_count")
+        self.assertEqual(counters[first.pk], 1)
+        self.assertEqual(counters[second.pk], 1)
+
+    def test_out_of_range_ids_are_rejected(self):
+        for recipe_id in (0, 2 ** 63, 10 ** 30):
+            response = self.client.post(
+                "/api/recipes/favorite/bulk/",
+                {"recipes": [self.recipes[0].pk, recipe_id]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400, recipe_id)
+            self.assertIn("recipes", response.data)
+        self.assertFalse(FavoriteRecipeModel.objects.exists())
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            "/api/recipes/favorite/bulk/",
+            {"recipes": [self.recipes[0].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import FavoriteRecipeModel, RecipeModel
+
+from .factories import create_ingredients, create_recipe, create_user
+
+
+class ConditionalResponseTests(APITestCase):
+    """
+    Валидаторы ответов строятся по состоянию БД: изменения, сделанные без
+    сигналов этого процесса (другой воркер, команда), меняют ETag.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.ingredients = create_ingredients(3)
+        cls.recipe = create_recipe(cls.author, "soup", cls.ingredients[:2])
+
+    def get(self, url, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(url, headers=headers)
+
+    def assert_revalidates(self, url, change):
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        change()
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_recipe_changed_elsewhere(self):
+        def change():
+            RecipeModel.objects.filter(pk=self.recipe.pk).update(
+                name="borscht", updated_at=timezone.now()
+            )
+
+        response = self.assert_revalidates(
+            f"/api/recipes/{self.recipe.pk}/", change
+        )
+        self.assertEqual(response.json()["name"], "borscht")
+
+    def test_recipe_list_after_update(self):
+        self.client.force_authenticate(self.author)
+
+        def change():
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    f"/api/recipes/{self.recipe.pk}/",
+                    {
+                        "name": "borscht",
+                        "text": "text",
+                        "cooking_time": 5,
+                        "ingredients": [
+                            {"id": self.ingredients[0].pk, "amount": 5},
+                        ],
+                    },
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+
+        response = self.assert_revalidates("/api/recipes/", change)
+        self.assertEqual(response.data["results"][0]["name"], "borscht")
+
+    def test_trending_refresh_changes_list(self):
+        FavoriteRecipeModel.objects.create(
+            user=self.author,
+            recipe=self.recipe,
+            created_at=timezone.now() - timedelta(hours=1),
+        )
+
+        def change():
+            call_command("refresh_trending", "--full", stdout=StringIO())
+
+        self.assert_revalidates("/api/recipes/?ordering=trending", change)
+
+    def test_ingredient_catalog_changed_by_command(self):
+        names = iter(["zest", "zucchini"])
+
+        def change():
+            with TemporaryDirectory() as directory:
+                path = Path(directory) / "ingredients.csv"
+                path.write_text(f"{next(names)},g\n", encoding="utf-8")
+                call_command(
+                    "install_ingredients", str(path), stdout=StringIO()
+                )
+
+        self.assert_revalidates(
+            f"/api/ingredients/{self.ingredients[0].pk}/", change
+        )
+        self.assert_revalidates("/api/ingredients/?name=ing", change)
+
+    def test_non_numeric_id_is_not_found(self):
+        self.assertEqual(self.get("/api/recipes/abc/").status_code, 404)
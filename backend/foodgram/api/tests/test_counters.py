@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from recipes.models import RecipeModel, UserModel
+
+from .factories import create_recipe, create_user
+
+
+class CounterTests(APITestCase):
+    """Денормализованные счётчики рецептов и пользователей"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        cls.author = create_user("author")
+        cls.recipes = [
+            create_recipe(cls.author, f"recipe {number}")
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def recipe_counters(self, recipe):
+        return (
+            RecipeModel.objects
+            .filter(pk=recipe.pk)
+            .values("favorites_count", "shopping_carts_count")
+            .get()
+        )
+
+    def user_counters(self, user):
+        return (
+            UserModel.objects
+            .filter(pk=user.pk)
+            .values("recipes_count", "followers_count", "following_count")
+            .get()
+        )
+
+    def test_recipe_relations(self):
+        recipe = self.recipes[0]
+        for action in ("favorite", "shopping_cart"):
+            response = self.client.post(f"/api/recipes/{recipe.pk}/{action}/")
+            self.assertEqual(response.status_code, 201)
+            # Повторное добавление счётчик не меняет
+            response = self.client.post(f"/api/recipes/{recipe.pk}/{action}/")
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.recipe_counters(recipe),
+            {"favorites_count": 1, "shopping_carts_count": 1},
+        )
+
+        for action in ("favorite", "shopping_cart"):
+            response = self.client.delete(
+                f"/api/recipes/{recipe.pk}/{action}/"
+            )
+            self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.recipe_counters(recipe),
+            {"favorites_count": 0, "shopping_carts_count": 0},
+        )
+
+    def test_bulk_relations(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        self.client.post(
+            "/api/recipes/shopping_cart/bulk/", {"recipes": ids}, format="json"
+        )
+        self.assertEqual(
+            [self.recipe_counters(recipe)["shopping_carts_count"]
+             for recipe in self.recipes],
+            [1, 1],
+        )
+        self.client.delete(
+            "/api/recipes/shopping_cart/bulk/",
+            {"recipes": ids[:1]},
+            format="json",
+        )
+        self.assertEqual(
+            [self.recipe_counters(recipe)["shopping_carts_count"]
+             for recipe in self.recipes],
+            [0, 1],
+        )
+
+    def test_subscriptions(self):
+        url = f"/api/users/{self.author.pk}/subscribe/"
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.user_counters(self.author)["followers_count"], 1)
+        self.assertEqual(self.user_counters(self.user)["following_count"], 1)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.user_counters(self.author)["followers_count"], 0)
+        self.assertEqual(self.user_counters(self.user)["following_count"], 0)
+
+    def test_author_recipes(self):
+        self.assertEqual(self.user_counters(self.author)["recipes_count"], 2)
+        self.recipes[0].delete()
+        self.assertEqual(self.user_counters(self.author)["recipes_count"], 1)
+
+    def test_counter_does_not_go_negative(self):
+        recipe = self.recipes[0]
+        self.client.post(f"/api/recipes/{recipe.pk}/favorite/")
+        RecipeModel.objects.filter(pk=recipe.pk).update(favorites_count=0)
+        self.client.delete(f"/api/recipes/{recipe.pk}/favorite/")
+        self.assertEqual(self.recipe_counters(recipe)["favorites_count"], 0)
+
+    def test_recount_command(self):
+        self.client.post(f"/api/recipes/{self.recipes[0].pk}/favorite/")
+        self.client.post(f"/api/users/{self.author.pk}/subscribe/")
+        RecipeModel.objects.update(favorites_count=7, shopping_carts_count=7)
+        UserModel.objects.update(
+            recipes_count=7, followers_count=7, following_count=7
+        )
+
+        output = StringIO()
+        call_command("recount", stdout=output)
+        self.assertIn("Recounted 2 recipes and 2 users", output.getvalue())
+        self.assertEqual(
+            [self.recipe_counters(recipe) for recipe in self.recipes],
+            [
+                {"favorites_count": 1, "shopping_carts_count": 0},
+                {"favorites_count": 0, "shopping_carts_count": 0},
+            ],
+        )
+        self.assertEqual(self.user_counters(self.author), {
+            "recipes_count": 2, "followers_count": 1, "following_count": 0,
+        })
+        self.assertEqual(self.user_counters(self.user), {
+            "recipes_count": 0, "followers_count": 0, "following_count": 1,
+        })
@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import FeedEntryModel
+
+from .factories import create_recipe, create_user
+
+
+class FeedTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user("reader")
+        cls.author = create_user("author")
+        cls.other = create_user("other")
+        cls.recipes = [
+            create_recipe(cls.author, f"soup {number}") for number in range(3)
+        ]
+        cls.foreign = create_recipe(cls.other, "stew")
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, author):
+        response = self.client.post(f"/api/users/{author.pk}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+
+    def feed_ids(self, limit=2):
+        ids = []
+        url = f"/api/users/feed/?limit={limit}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def entry_ids(self):
+        return set(
+            FeedEntryModel.objects
+            .filter(user=self.reader)
+            .values_list("recipe_id", flat=True)
+        )
+
+    def test_subscribe_backfills_recent_recipes(self):
+        self.subscribe(self.author)
+        expected = [recipe.pk for recipe in reversed(self.recipes)]
+        self.assertEqual(self.entry_ids(), set(expected))
+        self.assertEqual(self.feed_ids(), expected)
+
+    @override_settings(FEED_BACKFILL_SIZE=2)
+    def test_backfill_is_limited(self):
+        self.subscribe(self.author)
+        self.assertEqual(
+            self.entry_ids(), {recipe.pk for recipe in self.recipes[1:]}
+        )
+
+    def test_new_recipe_fans_out_to_followers(self):
+        self.subscribe(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, "new soup")
+        self.assertEqual(self.feed_ids()[0], recipe.pk)
+
+    def test_unsubscribe_prunes_feed(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        response = self.client.delete(
+            f"/api/users/{self.author.pk}/subscribe/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.entry_ids(), {self.foreign.pk})
+        self.assertEqual(self.feed_ids(), [self.foreign.pk])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_authors_are_merged_at_read_time(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, "new soup")
+        # Популярный автор не рассылает рецепты
+        self.assertNotIn(recipe.pk, self.entry_ids())
+
+        with CaptureQueriesContext(connection) as queries:
+            ids = self.feed_ids()
+        expected = sorted(
+            [recipe.pk, self.foreign.pk]
+            + [own.pk for own in self.recipes],
+            reverse=True,
+        )
+        self.assertEqual(ids, expected)
+        self.assertFalse([
+            query for query in queries
+            if not query["sql"].startswith("SELECT")
+        ])
+
+    def test_rebuild_command(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        FeedEntryModel.objects.all().delete()
+
+        output = StringIO()
+        call_command("rebuild_feeds", "--per-author", "1", stdout=output)
+        self.assertIn("Created 2 feed entries", output.getvalue())
+        self.assertEqual(
+            self.entry_ids(), {self.recipes[-1].pk, self.foreign.pk}
+        )
+
+        call_command(
+            "rebuild_feeds", "--user", str(self.reader.pk), stdout=StringIO()
+        )
+        self.assertEqual(
+            self.entry_ids(),
+            {recipe.pk for recipe in self.recipes} | {self.foreign.pk},
+        )
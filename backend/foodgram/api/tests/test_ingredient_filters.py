@@ -0,0 +1,124 @@
+import sqlite3
+from contextlib import contextmanager
+
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.search import get_search_backend
+
+from .factories import create_ingredients, create_recipe, create_user
+
+# Меньше, чем рецептов с общим ингредиентом: их id не поместились бы в
+# запрос отдельными параметрами
+VARIABLE_LIMIT = 20
+
+
+@contextmanager
+def variable_limit(limit):
+    """Понижает лимит параметров запроса SQLite, как у большой выборки"""
+    connection.ensure_connection()
+    previous = connection.connection.setlimit(
+        sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit
+    )
+    try:
+        yield
+    finally:
+        connection.connection.setlimit(
+            sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, previous
+        )
+
+
+class IngredientFilterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.other = create_user("other")
+        cls.salt, cls.sugar, cls.pepper = create_ingredients(3)
+        cls.salted = [
+            create_recipe(
+                cls.author if number % 2 else cls.other,
+                f"salted {number:02}",
+                [cls.salt] + ([cls.pepper] if number % 3 == 0 else []),
+            )
+            for number in range(30)
+        ]
+        cls.sweet = create_recipe(cls.author, "sweet", [cls.sugar])
+        get_search_backend().rebuild()
+
+    def setUp(self):
+        recipe_ingredient_index.build()
+
+    def get_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_large_match_is_one_parameter(self):
+        expected = [recipe.pk for recipe in self.salted]
+        with variable_limit(VARIABLE_LIMIT):
+            response = self.client.get(
+                f"/api/recipes/?ingredients={self.salt.pk}&limit=5"
+            )
+            ids = self.get_ids(
+                f"/api/recipes/?ingredients={self.salt.pk}&limit=5"
+            )
+        self.assertEqual(response.data["count"], len(self.salted))
+        self.assertEqual(ids, expected)
+
+    def test_large_exclusion(self):
+        with variable_limit(VARIABLE_LIMIT):
+            ids = self.get_ids(
+                f"/api/recipes/?exclude_ingredients={self.salt.pk}"
+            )
+        self.assertEqual(ids, [self.sweet.pk])
+
+    def test_combined_with_database_filters(self):
+        expected = [
+            recipe.pk
+            for number, recipe in enumerate(self.salted)
+            if number % 2 and number % 3
+        ]
+        with variable_limit(VARIABLE_LIMIT):
+            ids = self.get_ids(
+                f"/api/recipes/?ingredients={self.salt.pk}"
+                f"&exclude_ingredients={self.pepper.pk}"
+                f"&author={self.author.pk}&limit=4"
+            )
+        self.assertEqual(ids, expected)
+
+    def test_empty_list_elements_are_skipped(self):
+        expected = [
+            recipe.pk
+            for number, recipe in enumerate(self.salted)
+            if number % 3 == 0
+        ]
+        ids = self.get_ids(
+            f"/api/recipes/?ingredients={self.salt.pk},,{self.pepper.pk}"
+        )
+        self.assertEqual(ids, expected)
+
+    def test_combined_with_search(self):
+        with variable_limit(VARIABLE_LIMIT):
+            ids = self.get_ids(
+                f"/api/recipes/?ingredients={self.salt.pk}&search=salted 07"
+            )
+        self.assertEqual(ids, [self.salted[7].pk])
+
+    def test_cursor_mode(self):
+        expected = [
+            recipe.pk
+            for number, recipe in enumerate(self.salted)
+            if number % 3 == 0
+        ]
+        with variable_limit(VARIABLE_LIMIT):
+            ids = self.get_ids(
+                f"/api/recipes/?ingredients={self.salt.pk},{self.pepper.pk}"
+                f"&cursor=&limit=3"
+            )
+        self.assertEqual(ids, expected)
@@ -0,0 +1,89 @@
+import base64
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import SubscriptionModel
+
+from .factories import create_recipe, create_user
+
+
+def cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+class CursorPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.authors = [create_user(f"author{number}") for number in range(5)]
+        # Одинаковые названия проверяют сортировку по id внутри названия
+        cls.recipes = [
+            create_recipe(cls.authors[number % 5], f"recipe {number // 2:02}")
+            for number in range(11)
+        ]
+        for author in cls.authors:
+            SubscriptionModel.objects.create(user=cls.viewer, author=author)
+
+    def walk(self, url):
+        """Проходит все страницы по ссылкам next и возвращает id строк"""
+        ids, query_counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            query_counts.append(len(queries))
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        return ids, query_counts
+
+    def test_recipes_walk_every_row_once(self):
+        ids, query_counts = self.walk("/api/recipes/?cursor=&limit=3")
+        expected = [
+            recipe.pk
+            for recipe in sorted(self.recipes, key=lambda r: (r.name, r.pk))
+        ]
+        self.assertEqual(ids, expected)
+        # Глубина не влияет на число запросов
+        self.assertEqual(len(set(query_counts[1:])), 1, query_counts)
+
+    def test_page_number_mode_is_unchanged(self):
+        response = self.client.get("/api/recipes/?page=2&limit=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], len(self.recipes))
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_subscriptions_cursor(self):
+        self.client.force_authenticate(self.viewer)
+        ids, _ = self.walk("/api/users/subscriptions/?cursor=&limit=2")
+        self.assertEqual(ids, [author.pk for author in self.authors])
+
+    def test_invalid_cursor_is_not_found(self):
+        invalid = [
+            "not base64!",
+            base64.urlsafe_b64encode(b"{").decode(),
+            cursor("recipe 01"),
+            cursor("recipe 01", 1, 2),
+            cursor("a", "xyz"),
+            cursor("a", None),
+            cursor("a", [1]),
+            cursor("a", 10 ** 30),
+            cursor({"name": "a"}, 1),
+        ]
+        for value in invalid:
+            with self.subTest(cursor=value):
+                response = self.client.get(
+                    "/api/recipes/", {"cursor": value}
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_invalid_trending_cursor_is_not_found(self):
+        response = self.client.get(
+            "/api/recipes/",
+            {"ordering": "trending", "cursor": cursor("high", 1)},
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,119 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import RecipeIngredientModel
+
+from .factories import create_ingredients, create_recipe, create_user
+
+MISSING_ID = 10 ** 6
+
+
+class RecipeIngredientUpdateTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.ingredients = create_ingredients(45)
+        cls.recipe = create_recipe(cls.author, "soup", cls.ingredients[:3])
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def patch(self, ingredients):
+        return self.client.patch(
+            f"/api/recipes/{self.recipe.pk}/",
+            {
+                "name": "soup",
+                "text": "text",
+                "cooking_time": 5,
+                "ingredients": [
+                    {"id": ingredient.pk, "amount": amount}
+                    for ingredient, amount in ingredients
+                ],
+            },
+            format="json",
+        )
+
+    def rows(self):
+        return {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in (
+                RecipeIngredientModel.objects
+                .filter(recipe=self.recipe)
+                .values_list("pk", "ingredient_id", "amount")
+            )
+        }
+
+    def test_only_differing_rows_change(self):
+        kept, changed, removed = self.ingredients[:3]
+        added = self.ingredients[3]
+        before = self.rows()
+
+        response = self.patch([(kept, 10), (changed, 25), (added, 7)])
+        self.assertEqual(response.status_code, 200)
+
+        after = self.rows()
+        self.assertEqual(set(after), {kept.pk, changed.pk, added.pk})
+        self.assertNotIn(removed.pk, after)
+        # Существующие строки обновляются на месте, а не пересоздаются
+        self.assertEqual(after[kept.pk], before[kept.pk])
+        self.assertEqual(after[changed.pk], (before[changed.pk][0], 25))
+        self.assertEqual(after[added.pk][1], 7)
+        self.assertEqual(
+            sorted(row["amount"] for row in response.data["ingredients"]),
+            [7, 10, 25],
+        )
+
+    def test_unchanged_ingredients_are_not_written(self):
+        ingredients = [(ingredient, 10) for ingredient in self.ingredients[:3]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(ingredients)
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query["sql"] for query in queries
+            if "recipes_recipeingredientmodel" in query["sql"]
+            and not query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(writes, [])
+
+    def test_query_count_does_not_depend_on_ingredient_count(self):
+        def count_queries(amount, added):
+            # Каждое изменение меняет количество, удаляет и добавляет строки
+            with CaptureQueriesContext(connection) as queries:
+                response = self.patch(
+                    [(self.ingredients[0], amount)]
+                    + [(ingredient, 5) for ingredient in added]
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        small = count_queries(5, self.ingredients[3:5])
+        large = count_queries(9, self.ingredients[5:45])
+        self.assertEqual(small, large)
+
+    def test_missing_ingredients_are_reported_together(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f"/api/recipes/{self.recipe.pk}/",
+                {
+                    "name": "soup",
+                    "text": "text",
+                    "cooking_time": 5,
+                    "ingredients": [
+                        {"id": self.ingredients[0].pk, "amount": 1},
+                        {"id": MISSING_ID, "amount": 1},
+                        {"id": MISSING_ID + 1, "amount": 1},
+                    ],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MISSING_ID), str(response.data))
+        self.assertIn(str(MISSING_ID + 1), str(response.data))
+        ingredient_queries = [
+            query for query in queries
+            if 'FROM "recipes_ingredientmodel"' in query["sql"]
+        ]
+        self.assertEqual(len(ingredient_queries), 1)
+        self.assertEqual(len(self.rows()), 3)
@@ -0,0 +1,79 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import FavoriteRecipeModel, ShoppingCart, SubscriptionModel
+
+from .factories import create_ingredients, create_recipe, create_user
+
+
+class RecipeQueryCountTests(TestCase):
+    """
+    Число запросов к БД в списке и карточке рецепта не зависит от числа
+    строк
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        authors = [create_user(f"author{number}") for number in range(3)]
+        ingredients = create_ingredients(6)
+        cls.recipes = [
+            create_recipe(
+                authors[number % len(authors)],
+                f"recipe {number:02}",
+                ingredients[number % 3:number % 3 + 3],
+            )
+            for number in range(12)
+        ]
+        for recipe in cls.recipes[::2]:
+            FavoriteRecipeModel.objects.create(user=cls.viewer, recipe=recipe)
+        for recipe in cls.recipes[::3]:
+            ShoppingCart.objects.create(user=cls.viewer, recipe=recipe)
+        SubscriptionModel.objects.create(user=cls.viewer, author=authors[0])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def count_queries(self, url):
+        # Первый запрос создаёт версии данных; считается второй, без кэшей
+        self.client.get(url)
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant(self, urls):
+        counts = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+        return next(iter(counts.values()))
+
+    def test_list_anonymous(self):
+        count = self.assert_constant([
+            "/api/recipes/?limit=1",
+            "/api/recipes/?limit=6&page=2",
+            "/api/recipes/?limit=12",
+        ])
+        self.assertEqual(count, 4)
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(self.viewer)
+        count = self.assert_constant([
+            "/api/recipes/?limit=1",
+            "/api/recipes/?limit=6&page=2",
+            "/api/recipes/?limit=12",
+        ])
+        self.assertEqual(count, 7)
+
+    def test_retrieve(self):
+        self.assertEqual(
+            self.count_queries(f"/api/recipes/{self.recipes[0].pk}/"), 4
+        )
+        self.client.force_authenticate(self.viewer)
+        self.assertEqual(
+            self.count_queries(f"/api/recipes/{self.recipes[1].pk}/"), 7
+        )
@@ -0,0 +1,132 @@
+from django.apps import apps
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from api.replicas import check_pin_cache
+from recipes.models import SubscriptionModel, UserModel
+
+from .factories import create_token, create_user
+
+REPLICA = "replica_test"
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    # Кэш закреплений отдельно от остальных, чтобы проверить, куда они
+    # записываются
+    "pins": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pins",
+    },
+}
+
+
+@override_settings(
+    REPLICA_DATABASES=[REPLICA],
+    REPLICA_PIN_CACHE_ALIAS="pins",
+    CACHES=CACHES,
+)
+class ReplicaRoutingTests(APITestCase):
+    """Основная БД и реплика — две отдельные базы SQLite"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика — база SQLite в памяти, которая существует только на
+        # время класса, поэтому раннер о ней не знает. Маршрутизатор её не
+        # мигрирует: таблицы создаются здесь, до транзакций класса, так как
+        # схему SQLite нельзя менять в atomic
+        connections.settings[REPLICA] = connections.configure_settings({
+            **connections.settings,
+            REPLICA: {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": ":memory:",
+            },
+        })[REPLICA]
+        with connections[REPLICA].schema_editor() as editor:
+            for model in apps.get_models():
+                if not model._meta.proxy:
+                    editor.create_model(model)
+        cls.databases = {"default", REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del cls.databases
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user("reader")
+        cls.author = create_user("author")
+        cls.token = create_token(cls.reader)
+        # Реплика отстаёт: у автора ещё старое имя
+        UserModel.objects.using(REPLICA).bulk_create(
+            UserModel.objects.using("default").all()
+        )
+        UserModel.objects.using(REPLICA).filter(pk=cls.author.pk).update(
+            first_name="Stale"
+        )
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def author_profile(self, client=None):
+        client = client or self.client
+        response = client.get(f"/api/users/{self.author.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.author_profile()["first_name"], "Stale")
+
+    def test_writer_reads_primary_until_pin_expires(self):
+        response = self.client.post(f"/api/users/{self.author.pk}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(
+            SubscriptionModel.objects.using("default")
+            .filter(user=self.reader, author=self.author)
+            .exists()
+        )
+
+        # Закрепление лежит в общем кэше и видно любому воркеру
+        profile = self.author_profile()
+        self.assertEqual(profile["first_name"], "Author")
+        self.assertTrue(profile["is_subscribed"])
+        self.assertEqual(len(caches["pins"]._cache), 1)
+
+        # Другие пользователи по-прежнему читают реплику
+        anonymous = self.client_class()
+        self.assertEqual(
+            self.author_profile(anonymous)["first_name"], "Stale"
+        )
+
+        caches["pins"].clear()
+        self.assertEqual(self.author_profile()["first_name"], "Stale")
+
+    def test_incidental_write_in_safe_request_does_not_pin(self):
+        # Версии списка ещё нет на реплике: GET создаёт её в основной БД
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(caches["pins"]._cache), 0)
+        self.assertEqual(self.author_profile()["first_name"], "Stale")
+
+
+class PinCacheCheckTests(SimpleTestCase):
+
+    @override_settings(
+        CACHES=CACHES, REPLICA_DATABASES=[], REPLICA_PIN_CACHE_ALIAS="pins"
+    )
+    def test_without_replicas_any_cache_is_accepted(self):
+        check_pin_cache()
+
+    @override_settings(
+        CACHES=CACHES, REPLICA_DATABASES=[REPLICA],
+        REPLICA_PIN_CACHE_ALIAS="pins",
+    )
+    def test_replicas_require_shared_pin_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_pin_cache()
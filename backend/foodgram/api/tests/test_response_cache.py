@@ -0,0 +1,144 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from api.cache import cached_response
+from recipes.ingredient_index import bump_catalog_version
+
+from .factories import create_ingredients, create_recipe, create_user
+
+# Ингредиенты рецептов читаются только при построении ответа
+INGREDIENTS_TABLE = '"recipes_recipeingredientmodel"'
+
+
+class ResponseCacheTests(APITestCase):
+    """Ответы анонимам кэшируются по версиям данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.ingredient, = create_ingredients(1)
+        cls.recipe = create_recipe(cls.author, "soup", [cls.ingredient])
+
+    def setUp(self):
+        caches[settings.RECIPE_CACHE_ALIAS].clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        built = any(INGREDIENTS_TABLE in query["sql"] for query in queries)
+        return response.json(), built
+
+    def assert_cached(self, url):
+        data, built = self.get(url)
+        self.assertTrue(built)
+        cached_data, built = self.get(url)
+        self.assertFalse(built)
+        self.assertEqual(cached_data, data)
+        return data
+
+    def test_list_and_detail_are_cached(self):
+        self.assert_cached("/api/recipes/")
+        self.assert_cached(f"/api/recipes/{self.recipe.pk}/")
+
+    def test_query_params_are_part_of_the_key(self):
+        self.assert_cached("/api/recipes/?limit=1")
+        _, built = self.get("/api/recipes/?limit=2")
+        self.assertTrue(built)
+
+    def test_recipe_change_invalidates(self):
+        list_url = "/api/recipes/"
+        detail_url = f"/api/recipes/{self.recipe.pk}/"
+        self.assert_cached(list_url)
+        self.assert_cached(detail_url)
+
+        self.recipe.name = "stew"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        data, built = self.get(list_url)
+        self.assertTrue(built)
+        self.assertEqual(data["results"][0]["name"], "stew")
+        data, built = self.get(detail_url)
+        self.assertTrue(built)
+        self.assertEqual(data["name"], "stew")
+
+    def test_catalog_change_invalidates(self):
+        url = f"/api/recipes/{self.recipe.pk}/"
+        self.assert_cached(url)
+        self.ingredient.name = "salt"
+        self.ingredient.save()
+        data, built = self.get(url)
+        self.assertTrue(built)
+        self.assertEqual(data["ingredients"][0]["name"], "salt")
+
+        _, built = self.get(url)
+        self.assertFalse(built)
+        bump_catalog_version()
+        _, built = self.get(url)
+        self.assertTrue(built)
+
+    def test_authenticated_responses_are_not_cached(self):
+        self.client.force_authenticate(create_user("viewer"))
+        url = f"/api/recipes/{self.recipe.pk}/"
+        self.get(url)
+        _, built = self.get(url)
+        self.assertTrue(built)
+
+
+class CachedResponseLockTests(SimpleTestCase):
+    """Одновременные промахи строят ответ один раз"""
+
+    key = "responses:test"
+
+    def setUp(self):
+        self.cache = caches[settings.RECIPE_CACHE_ALIAS]
+        self.cache.clear()
+        self.build = mock.Mock(return_value=Response({"built": True}))
+
+    def test_builds_once_and_releases_lock(self):
+        self.assertEqual(cached_response(self.key, self.build).data,
+                         {"built": True})
+        self.assertEqual(cached_response(self.key, self.build).data,
+                         {"built": True})
+        self.build.assert_called_once()
+        self.assertIsNone(self.cache.get(f"{self.key}:lock"))
+
+    def test_lock_is_released_on_error(self):
+        self.build.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            cached_response(self.key, self.build)
+        self.assertIsNone(self.cache.get(f"{self.key}:lock"))
+
+    def test_errors_are_not_cached(self):
+        self.build.return_value = Response(status=404)
+        cached_response(self.key, self.build)
+        cached_response(self.key, self.build)
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_waits_for_response_of_lock_holder(self):
+        self.cache.add(f"{self.key}:lock", 1)
+
+        def holder_finishes(seconds):
+            self.cache.set(self.key, {"built": "elsewhere"})
+
+        with mock.patch("api.cache.time.sleep", side_effect=holder_finishes):
+            response = cached_response(self.key, self.build)
+        self.assertEqual(response.data, {"built": "elsewhere"})
+        self.build.assert_not_called()
+
+    @mock.patch("api.cache.LOCK_WAIT_TIMEOUT", 0.1)
+    @mock.patch("api.cache.LOCK_POLL_INTERVAL", 0.01)
+    def test_builds_itself_when_lock_holder_is_slow(self):
+        self.cache.add(f"{self.key}:lock", 1)
+        self.assertEqual(cached_response(self.key, self.build).data,
+                         {"built": True})
+        self.build.assert_called_once()
+        # Чужую блокировку не снимает
+        self.assertEqual(self.cache.get(f"{self.key}:lock"), 1)
@@ -0,0 +1,151 @@
+from unittest import skipUnless
+
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from recipes.models import RecipeModel
+from recipes.search import (
+    BaseSearchBackend,
+    PostgresSearchBackend,
+    SqliteSearchBackend,
+    get_search_backend,
+)
+
+from .factories import create_ingredients, create_recipe, create_user
+
+
+class RecipeSearchTests(APITestCase):
+    """
+    Поиск через API на бэкенде текущей БД: FTS5 на SQLite, tsvector на
+    PostgreSQL
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        tomato, cls.basil = create_ingredients(2, prefix="tomato")
+        cls.in_name = create_recipe(cls.author, "tomato soup")
+        cls.in_text = create_recipe(cls.author, "pasta")
+        RecipeModel.objects.filter(pk=cls.in_text.pk).update(
+            text="pasta with tomato sauce"
+        )
+        cls.in_ingredients = create_recipe(cls.author, "salad", [tomato])
+        cls.unrelated = create_recipe(cls.author, "pancakes")
+        get_search_backend().rebuild()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            "/api/recipes/", {"search": query, "limit": 50, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_backend_matches_database(self):
+        backends = {
+            "sqlite": SqliteSearchBackend,
+            "postgresql": PostgresSearchBackend,
+        }
+        self.assertIsInstance(
+            get_search_backend(),
+            backends.get(connection.vendor, BaseSearchBackend),
+        )
+
+    def test_ranked_by_field_weight(self):
+        self.assertEqual(
+            self.search("tomato"),
+            [self.in_name.pk, self.in_text.pk, self.in_ingredients.pk],
+        )
+
+    def test_prefix_and_case_folding(self):
+        self.assertEqual(
+            self.search("TOMA")[0], self.in_name.pk
+        )
+        self.assertEqual(self.search("pancake"), [self.unrelated.pk])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search("tomato soup"), [self.in_name.pk])
+        self.assertEqual(self.search("tomato pancakes"), [])
+
+    def test_operators_in_query_are_plain_words(self):
+        self.assertEqual(self.search('soup" OR "pancakes'), [])
+        self.assertEqual(self.search("*"), self.search(""))
+
+    def test_cursor_is_rejected(self):
+        response = self.client.get("/api/recipes/?search=tomato&cursor=")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.data)
+
+    def test_document_follows_recipe_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.author, "borscht")
+        self.assertEqual(self.search("borscht"), [recipe.pk])
+
+        recipe.name = recipe.text = "goulash"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.search("borscht"), [])
+        self.assertEqual(self.search("goulash"), [recipe.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(self.search("goulash"), [])
+
+    def test_document_follows_ingredient_rename(self):
+        salad = create_recipe(self.author, "green salad", [self.basil])
+        get_search_backend().update_documents([salad.pk])
+        self.basil.name = "rucola"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basil.save()
+        self.assertEqual(self.search("rucola"), [salad.pk])
+        self.assertNotIn(salad.pk, self.search("tomato"))
+
+
+class FallbackSearchTests(APITestCase):
+    """Поиск без полнотекстового индекса для остальных СУБД"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        cls.soup = create_recipe(author, "tomato soup")
+        cls.salad = create_recipe(
+            author, "salad", create_ingredients(1, prefix="tomato")
+        )
+
+    def test_icontains_on_name_text_and_ingredients(self):
+        backend = BaseSearchBackend(connection)
+        found = backend.search(RecipeModel.objects.all(), "TOMATO")
+        self.assertEqual(
+            set(found.values_list("pk", flat=True)),
+            {self.soup.pk, self.salad.pk},
+        )
+        self.assertFalse(backend.search(RecipeModel.objects.all(), "soup pie"))
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+class PostgresSearchQueryTests(APITestCase):
+
+    def test_prefix_query_and_rank(self):
+        queryset = PostgresSearchBackend(connection).search(
+            RecipeModel.objects.all(), "tomato soup"
+        )
+        sql = str(queryset.query)
+        self.assertIn("to_tsquery", sql)
+        self.assertIn("ts_rank", sql)
+        self.assertEqual(
+            queryset.query.order_by, ("-search_rank", "id")
+        )
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite only")
+class SqliteSearchQueryTests(APITestCase):
+
+    def test_prefix_query_and_rank(self):
+        queryset = SqliteSearchBackend(connection).search(
+            RecipeModel.objects.all(), 'tomato "soup'
+        )
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn("bm25", sql)
+        self.assertIn('"tomato"* "soup"*', params)
+        self.assertEqual(
+            queryset.query.order_by, ("-search_rank", "id")
+        )
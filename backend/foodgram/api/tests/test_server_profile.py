@@ -0,0 +1,73 @@
+import importlib
+from asyncio import iscoroutinefunction
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches, resolve
+
+import api.urls
+import foodgram.urls
+import recipes.urls
+from api.authentication import token_cache
+from recipes.short_links import encode_recipe_id
+
+from .factories import create_recipe, create_token, create_user
+
+# Корневой модуль перезагружается последним: его include хранят
+# распознаватели вложенных модулей
+URLCONFS = (api.urls, recipes.urls, foodgram.urls)
+
+
+class ServerProfileRoutingTests(SimpleTestCase):
+
+    def tearDown(self):
+        self.reload_urls()
+
+    @staticmethod
+    def reload_urls():
+        for module in URLCONFS:
+            importlib.reload(module)
+        clear_url_caches()
+
+    def resolved_views(self, profile):
+        with override_settings(SERVER_PROFILE=profile):
+            self.reload_urls()
+            return [
+                resolve(path).func
+                for path in (
+                    "/api/ingredients/",
+                    "/api/recipes/1/",
+                    f"/s/{encode_recipe_id(1)}/",
+                )
+            ]
+
+    def test_wsgi_serves_sync_views(self):
+        for view in self.resolved_views("wsgi"):
+            self.assertFalse(iscoroutinefunction(view), view)
+
+    def test_asgi_serves_async_views(self):
+        for view in self.resolved_views("asgi"):
+            self.assertTrue(iscoroutinefunction(view), view)
+
+
+class AsyncTokenReadTests(TestCase):
+    """Асинхронное чтение с пользователем из кэша токенов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.key = create_token(cls.user)
+        cls.recipe = create_recipe(create_user("author"), "soup")
+
+    def setUp(self):
+        token_cache.clear()
+        with override_settings(SERVER_PROFILE="asgi"):
+            ServerProfileRoutingTests.reload_urls()
+        self.addCleanup(ServerProfileRoutingTests.reload_urls)
+
+    async def test_cached_token_user_in_event_loop(self):
+        headers = {"Authorization": f"Token {self.key}"}
+        url = f"/api/recipes/{self.recipe.pk}/"
+        for _ in range(2):
+            response = await self.async_client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()["is_favorited"])
@@ -0,0 +1,56 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import ShoppingCart
+
+from .factories import create_ingredients, create_recipe, create_user
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class DownloadShoppingCartTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer")
+        author = create_user("author")
+        salt, pepper, sugar = create_ingredients(3)
+        soup = create_recipe(author, "soup", [salt, pepper])
+        stew = create_recipe(author, "stew", [salt])
+        create_recipe(author, "cake", [sugar])
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in (stew, soup)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_file_sums_amounts(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="shopping_list.txt"',
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[2], "User: viewer")
+        start = lines.index("Ingredients:")
+        self.assertEqual(lines[start + 1:start + 4], [
+            "1. Ingredient 0 - 20 g",
+            "2. Ingredient 1 - 10 g",
+            "",
+        ])
+        start = lines.index("Recipes:")
+        self.assertEqual(lines[start + 1:start + 4], [
+            "- soup (Author: Author Test)",
+            "- stew (Author: Author Test)",
+            "",
+        ])
+
+    def test_empty_cart(self):
+        self.client.force_authenticate(create_user("other"))
+        self.assertEqual(self.client.get(URL).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(URL).status_code, 401)
@@ -0,0 +1,77 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import SubscriptionModel
+
+from .factories import create_recipe, create_user
+
+
+class SubscriptionRecipesLimitTests(APITestCase):
+    """recipes_limit ограничивает рецепты каждого автора в подписках"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [create_user(f"author{number}") for number in range(3)]
+        # Рецепты создаются не в порядке названий
+        cls.names = {
+            author.pk: [
+                create_recipe(author, f"{author.username} {letter}").name
+                for letter in "dbeac"
+            ]
+            for author in cls.authors
+        }
+        cls.viewer = create_user("viewer")
+        cls.single_viewer = create_user("single")
+        SubscriptionModel.objects.bulk_create(
+            [SubscriptionModel(user=cls.viewer, author=author)
+             for author in cls.authors]
+            + [SubscriptionModel(user=cls.single_viewer,
+                                 author=cls.authors[0])]
+        )
+
+    def get_subscriptions(self, user, query=""):
+        self.client.force_authenticate(user)
+        response = self.client.get(f"/api/users/subscriptions/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def count_queries(self, user, query):
+        self.get_subscriptions(user, query)
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_subscriptions(user, query)
+        return len(queries)
+
+    def test_limit_keeps_name_order(self):
+        results = self.get_subscriptions(self.viewer, "?recipes_limit=2")
+        self.assertEqual(len(results), len(self.authors))
+        for row in results:
+            self.assertEqual(
+                [recipe["name"] for recipe in row["recipes"]],
+                sorted(self.names[row["id"]])[:2],
+            )
+            self.assertEqual(row["recipes_count"], 5)
+
+    def test_without_limit_returns_all_recipes(self):
+        for query in ("", "?recipes_limit=abc", "?recipes_limit=-1"):
+            results = self.get_subscriptions(self.viewer, query)
+            self.assertEqual(
+                [len(row["recipes"]) for row in results], [5, 5, 5], query
+            )
+
+    def test_zero_limit(self):
+        results = self.get_subscriptions(self.viewer, "?recipes_limit=0")
+        self.assertEqual([row["recipes"] for row in results], [[], [], []])
+
+    def test_query_count_is_constant(self):
+        counts = {
+            (user.username, limit): self.count_queries(
+                user, f"?recipes_limit={limit}"
+            )
+            for user in (self.single_viewer, self.viewer)
+            for limit in (1, 5)
+        }
+        self.assertEqual(len(set(counts.values())), 1, counts)
@@ -0,0 +1,45 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import FavoriteRecipeModel, ShoppingCart
+
+from .factories import create_recipe, create_user
+
+
+class ViewerRelationsTests(APITestCase):
+    """Флаги связей пользователя читаются из БД в каждом запросе"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user("viewer")
+        cls.recipe = create_recipe(create_user("author"), "soup")
+
+    def test_relations_written_elsewhere_are_visible(self):
+        self.client.force_authenticate(self.viewer)
+        url = f"/api/recipes/{self.recipe.pk}/"
+        response = self.client.get(url)
+        self.assertFalse(response.json()["is_favorited"])
+
+        # bulk_create без сигналов: так выглядит запись из другого процесса
+        FavoriteRecipeModel.objects.bulk_create(
+            [FavoriteRecipeModel(user=self.viewer, recipe=self.recipe)]
+        )
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=self.viewer, recipe=self.recipe)]
+        )
+        response = self.client.get(url)
+        self.assertTrue(response.json()["is_favorited"])
+        self.assertTrue(response.json()["is_in_shopping_cart"])
+
+    def test_subscription_flags_come_from_viewer_relations(self):
+        self.client.force_authenticate(self.viewer)
+        author = self.recipe.author
+        response = self.client.post(f"/api/users/{author.pk}/subscribe/")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["is_subscribed"])
+
+        response = self.client.get("/api/users/subscriptions/")
+        self.assertEqual(
+            [(row["id"], row["is_subscribed"])
+             for row in response.json()["results"]],
+            [(author.pk, True)],
+        )
@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views.users import UserViewset
-from api.views.ingredients import IngredientViewSet
-from api.views.recipes import RecipeViewSet
+from api.views.ingredients import IngredientViewSet, ingredient_list
+from api.views.recipes import RecipeViewSet, recipe_detail
+from api.metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r"users", UserViewset, basename="users")
@@ -12,5 +14,18 @@ router.register(r"recipes", RecipeViewSet, basename="recipes")
 
 urlpatterns = [
     path("auth/", include("djoser.urls.authtoken")),
+    path("metrics/", metrics_view, name="metrics"),
+]
+
+if settings.SERVER_PROFILE == "asgi":
+    # Асинхронные варианты маршрутов роутера: стоят раньше и перекрывают
+    # их. Под WSGI каждый такой запрос шёл бы через async_to_sync и был бы
+    # медленнее синхронного вьюсета
+    urlpatterns += [
+        path("ingredients/", ingredient_list, name="ingredients-list"),
+        path("recipes/<int:pk>/", recipe_detail, name="recipes-detail"),
+    ]
+
+urlpatterns += [
     path("", include(router.urls)),
 ]
@@ -0,0 +1,69 @@
+from django.utils.functional import cached_property
+
+from recipes.models import FavoriteRecipeModel, ShoppingCart, SubscriptionModel
+
+# Атрибут, модель связи и поле id
+RELATIONS = (
+    ("followed_author_ids", SubscriptionModel, "author_id"),
+    ("favorite_recipe_ids", FavoriteRecipeModel, "recipe_id"),
+    ("cart_recipe_ids", ShoppingCart, "recipe_id"),
+)
+
+
+class ViewerRelations:
+    """
+    Связи текущего пользователя: на кого он подписан, что у него в
+    избранном и в корзине.
+
+    Каждое множество id загружается лениво одним запросом на весь запрос
+    к API, поэтому сериализаторы проверяют принадлежность за O(1) без
+    запроса на каждую строку. Между запросами множества не хранятся.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def _load(self, queryset, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        # Фильтр по id: пользователю из кэша токенов не нужна загрузка
+        return frozenset(
+            queryset.filter(user_id=self.user.pk).values_list(field, flat=True)
+        )
+
+    async def aload(self):
+        """
+        Загружает все множества асинхронным ORM, чтобы сериализаторы затем
+        работали в цикле событий без обращений к БД.
+        """
+        for attribute, model, field in RELATIONS:
+            if not self.user.is_authenticated:
+                ids = frozenset()
+            else:
+                ids = frozenset([
+                    pk async for pk in model.objects
+                    .filter(user_id=self.user.pk)
+                    .values_list(field, flat=True)
+                ])
+            self.__dict__[attribute] = ids
+
+    @cached_property
+    def followed_author_ids(self):
+        return self._load(SubscriptionModel.objects, "author_id")
+
+    @cached_property
+    def favorite_recipe_ids(self):
+        return self._load(FavoriteRecipeModel.objects, "recipe_id")
+
+    @cached_property
+    def cart_recipe_ids(self):
+        return self._load(ShoppingCart.objects, "recipe_id")
+
+
+def get_viewer_relations(request):
+    """Возвращает связи пользователя запроса, создавая их один раз на запрос"""
+    relations = getattr(request, "_viewer_relations", None)
+    if relations is None or relations.user is not request.user:
+        relations = ViewerRelations(request.user)
+        request._viewer_relations = relations
+    return relations
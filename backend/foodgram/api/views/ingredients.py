@@ -1,10 +1,16 @@
+from functools import partial
+
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from recipes.ingredient_index import get_catalog_version, ingredient_index
 from recipes.models import IngredientModel
 from api.serializers.ingredients import IngredientSerializer
 from api.filters import FilterIngredientModel
+from api.asynchronous import async_read_view, json_response
+from api.conditional import aconditional_response, conditional_response
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -14,3 +20,39 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = FilterIngredientModel
     pagination_class = None
+    replica_reads = True
+
+    def _search(self, name):
+        # Поиск по началу названия обслуживается индексом в памяти, без БД
+        return Response(ingredient_index.search(name))
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name", "")
+        return conditional_response(
+            request, partial(self._search, name), (ingredient_index.version,)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            (get_catalog_version(),),
+        )
+
+
+async def search_ingredients(request):
+    """Асинхронный list: поиск по началу названия в индексе в памяти"""
+    rows, version = await ingredient_index.asearch(request.GET.get("name", ""))
+
+    async def build_response():
+        return json_response(rows)
+
+    return await aconditional_response(request, build_response, (version,))
+
+
+ingredient_list = async_read_view(
+    IngredientViewSet.as_view(
+        {"get": "list"}, basename="ingredients", detail=False
+    ),
+    search_ingredients,
+)
@@ -1,8 +1,11 @@
 from datetime import datetime
+from functools import partial
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
-from django.http import Http404, FileResponse
-from django.db.models import Sum
+from django.http import Http404, StreamingHttpResponse
+from django.db.models import Prefetch, Sum
 
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
@@ -11,26 +14,130 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 
-from recipes.models import RecipeModel, FavoriteRecipeModel, ShoppingCart
-from api.serializers.recipes import ReadRecipeSerializer, WriteRecipeSerializer
+from recipes.ingredient_index import CATALOG_VERSION_KEY
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.relations import add_recipes, remove_recipes
+from recipes.versions import (
+    LIST_VERSION_KEY,
+    aget_versions,
+    get_versions,
+    recipe_version,
+    viewer_version_key,
+)
+from recipes.models import (
+    RecipeModel,
+    RecipeIngredientModel,
+    FavoriteRecipeModel,
+    ShoppingCart,
+)
+from api.serializers.recipes import (
+    ReadRecipeSerializer,
+    RecipeIdsSerializer,
+    WriteRecipeSerializer,
+)
 from api.serializers.users import ShortRecipeSerializer
 from api.permissions import ReadOnlyOrIsAuthor
 from api.pagination import PaginationClass
 from api.filters import FilterRecipeModel
+from api.asynchronous import async_read_view, authenticate, json_response
+from api.cache import acached_data, cached_response, response_cache_key
+from api.conditional import aconditional_response, conditional_response
+from api.viewer import get_viewer_relations
+
+
+READ_ACTIONS = ('list', 'retrieve', 'pantry')
+
+
+def _updated_at(pk):
+    """
+    Запрос времени изменения рецепта pk. Для pk, который не может быть id,
+    Http404, как у get_object_or_404 в DRF
+    """
+    try:
+        return (
+            RecipeModel.objects
+            .filter(pk=pk)
+            .values_list('updated_at', flat=True)
+        )
+    except (TypeError, ValueError, DjangoValidationError):
+        raise Http404
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = RecipeModel.objects.all()
     filterset_class = FilterRecipeModel
     pagination_class = PaginationClass
+    cursor_ordering = ("name", "id")
+    replica_reads = True
     filter_backends = [DjangoFilterBackend]
     permission_classes = [ReadOnlyOrIsAuthor]
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in READ_ACTIONS:
             return ReadRecipeSerializer
         return WriteRecipeSerializer
 
+    def get_cursor_ordering(self):
+        params = self.request.query_params
+        if self.cursor_ordering is None:
+            return None
+        # Найденные рецепты упорядочены по релевантности, а не по ключу
+        # курсора: страницы по нему перемешали бы выдачу
+        if params.get('search') and 'cursor' in params:
+            raise ValidationError(
+                {'cursor': 'Cursor pagination is not supported with search.'}
+            )
+        if params.get('ordering') == 'trending':
+            return ('-trending_score', 'trending_id')
+        return self.cursor_ordering
+
+    def _version_keys(self, *keys):
+        """Ключи версий ответа: для пользователя ещё и версия его связей"""
+        user = self.request.user
+        if user.is_authenticated:
+            keys += (viewer_version_key(user.pk),)
+        return keys
+
+    def _build_response(self, request, build_response, versions):
+        # Ответы анонимам не зависят от пользователя и кэшируются по версиям
+        if request.user.is_authenticated:
+            return build_response()
+        return cached_response(
+            response_cache_key(request, *versions), build_response
+        )
+
+    def list(self, request, *args, **kwargs):
+        versions = get_versions(
+            *self._version_keys(LIST_VERSION_KEY, CATALOG_VERSION_KEY)
+        )
+        return conditional_response(
+            request,
+            partial(
+                self._build_response,
+                request,
+                partial(super().list, request, *args, **kwargs),
+                versions[:2],
+            ),
+            versions,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        updated_at = _updated_at(kwargs["pk"]).first()
+        build_response = partial(super().retrieve, request, *args, **kwargs)
+        if updated_at is None:
+            return build_response()
+
+        versions = (recipe_version(updated_at),) + get_versions(
+            *self._version_keys(CATALOG_VERSION_KEY)
+        )
+        return conditional_response(
+            request,
+            partial(
+                self._build_response, request, build_response, versions[:2]
+            ),
+            versions,
+        )
+
     def perform_create(self, serializer):
         user = self.request.user
         if not user.is_authenticated:
@@ -79,63 +186,210 @@ class RecipeViewSet(viewsets.ModelViewSet):
                                             ShoppingCart,
                                             "Recipe is already in shopping cart")
 
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def download_shopping_cart(self, request):
-        user = request.user
-        recipes = RecipeModel.objects.filter(shoppingcart_relations__user=user)
-        if not recipes.exists():
-            raise ValidationError({'errors': 'Shopping cart is empty'})
+    def _modify_recipe_relations(self, request, relation_model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+
+        if request.method == 'POST':
+            statuses = add_recipes(relation_model, request.user, recipe_ids)
+        else:
+            statuses = remove_recipes(relation_model, request.user, recipe_ids)
+        return Response({
+            'results': [
+                {'id': recipe_id, 'status': statuses[recipe_id]}
+                for recipe_id in recipe_ids
+            ]
+        })
+
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite/bulk',
+            url_name='favorite-bulk', permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        """Добавляет в избранное или убирает из него несколько рецептов"""
+        return self._modify_recipe_relations(request, FavoriteRecipeModel)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/bulk', url_name='shopping-cart-bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        """Добавляет в корзину или убирает из неё несколько рецептов"""
+        return self._modify_recipe_relations(request, ShoppingCart)
 
-        aggregated_ingredients = (
-            recipes.values('ingredients__name', 'ingredients__measurement_unit')
-            .annotate(total_amount=Sum('recipe_ingredients__amount'))
-            .order_by('ingredients__name')
+    @action(detail=False, methods=['get'], cursor_ordering=None)
+    def pantry(self, request):
+        """
+        Рецепты по убыванию доли ингредиентов, которые уже есть у
+        пользователя
+        """
+        try:
+            pantry_ids = [
+                int(ingredient_id)
+                for value in request.query_params.getlist('ingredients')
+                for ingredient_id in value.split(',')
+                if ingredient_id
+            ]
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ingredient ids must be integers.'}
+            )
+        if not pantry_ids:
+            raise ValidationError(
+                {'ingredients': 'Please fill in this field.'}
+            )
+
+        page = self.paginate_queryset(
+            recipe_ingredient_index.coverage(pantry_ids)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page]
         )
+        results = []
+        for recipe_id, share in page:
+            if recipe_id not in recipes:
+                continue
+            item = self.get_serializer(recipes[recipe_id]).data
+            item['pantry_coverage'] = round(share, 4)
+            results.append(item)
+        return self.get_paginated_response(results)
 
+    @staticmethod
+    def _render_shopping_list(username, ingredients, recipes):
+        """Построчно формирует текст списка покупок"""
         current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        lines = [
-            "Foodgram - Shopping Cart",
-            f"Date: {current_time} UTC",
-            f"User: {user.username}",
-            "",
-            "Ingredients:",
-        ]
-
-        for idx, ingredient in enumerate(aggregated_ingredients, start=1):
-            lines.append(
-                f"{idx}. {ingredient['ingredients__name'].title()} - "
-                f"{ingredient['total_amount']} "
-                f"{ingredient['ingredients__measurement_unit']}"
-            )
+        yield "Foodgram - Shopping Cart\n"
+        yield f"Date: {current_time} UTC\n"
+        yield f"User: {username}\n"
+        yield "\n"
+        yield "Ingredients:\n"
+
+        for idx, (name, unit, total_amount) in enumerate(ingredients, start=1):
+            yield f"{idx}. {name.title()} - {total_amount} {unit}\n"
+
+        yield "\n"
+        yield "Recipes:\n"
 
-        lines.extend([
-            "",
-            "Recipes:",
-        ])
+        for name, first_name, last_name in recipes:
+            full_name = f"{first_name} {last_name}".strip()
+            yield f"- {name} (Author: {full_name})\n"
 
-        for recipe in recipes:
-            lines.append(f"- {recipe.name} (Author: {recipe.author.get_full_name()})")
+        yield "\n"
+        yield f"Foodgram - Your cooking helper © {datetime.now().year}"
 
-        lines.extend([
-            "",
-            f"Foodgram - Your cooking helper © {datetime.now().year}"
-        ])
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def download_shopping_cart(self, request):
+        user = request.user
+        recipes = list(
+            RecipeModel.objects
+            .filter(shoppingcart_relations__user=user)
+            .values_list('name', 'author__first_name', 'author__last_name')
+        )
+        if not recipes:
+            raise ValidationError({'errors': 'Shopping cart is empty'})
 
-        content = "\n".join(lines)
+        # Выборка читается здесь, пока действует выбор БД для запроса:
+        # тело ответа отдаётся уже после выхода из представления
+        aggregated_ingredients = list(
+            RecipeIngredientModel.objects
+            .filter(recipe__shoppingcart_relations__user=user)
+            .values_list('ingredient__name', 'ingredient__measurement_unit')
+            .annotate(total_amount=Sum('amount'))
+            .order_by('ingredient__name')
+        )
 
-        return FileResponse(
-            content,
-            as_attachment=True,
-            filename='shopping_list.txt',
+        response = StreamingHttpResponse(
+            self._render_shopping_list(
+                user.username, aggregated_ingredients, recipes
+            ),
             content_type='text/plain; charset=utf-8',
         )
+        response['Content-Disposition'] = (
+            'attachment; filename="shopping_list.txt"'
+        )
+        return response
 
     def get_queryset(self):
         qs = super().get_queryset()
-        user = self.request.user
+        if self.action not in READ_ACTIONS:
+            return qs
+
+        qs = qs.select_related('author').prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredientModel.objects.select_related(
+                    'ingredient'
+                ),
+            )
+        )
         param = self.request.query_params.get('is_in_shopping_cart')
 
-        if param and param.lower() in ('1', 'true') and user.is_authenticated:
-            qs = qs.filter(shoppingcart_relations__user=user)
+        if (
+            param
+            and param.lower() in ('1', 'true')
+            and self.request.user.is_authenticated
+        ):
+            qs = qs.filter(
+                shoppingcart_relations__user=self.request.user.pk
+            )
 
         return qs
+
+
+async def retrieve_recipe(request, pk):
+    """
+    Асинхронный retrieve с теми же ETag и кэшем ответов, что у вьюсета.
+    Запросы с параметрами (фильтры вьюсета) и несуществующие рецепты
+    обслуживает синхронный путь.
+    """
+    if request.GET:
+        return None
+    updated_at = await _updated_at(pk).afirst()
+    if updated_at is None:
+        return None
+    drf_request = await authenticate(request)
+    if drf_request is None:
+        return None
+
+    user = drf_request.user
+    view = RecipeViewSet(
+        request=drf_request, action='retrieve', args=(), kwargs={'pk': pk},
+        format_kwarg=None,
+    )
+    keys = (CATALOG_VERSION_KEY,)
+    if user.is_authenticated:
+        keys += (viewer_version_key(user.pk),)
+    versions = (recipe_version(updated_at),) + await aget_versions(*keys)
+
+    async def build_data():
+        try:
+            recipe = await view.get_queryset().aget(pk=pk)
+        except RecipeModel.DoesNotExist:
+            raise Http404
+        # Сериализатор работает в цикле событий: связи загружаются заранее
+        await get_viewer_relations(drf_request).aload()
+        return view.get_serializer(recipe).data
+
+    async def build_response():
+        if user.is_authenticated:
+            return json_response(await build_data())
+        return json_response(await acached_data(
+            response_cache_key(drf_request, *versions[:2]), build_data
+        ))
+
+    return await aconditional_response(
+        request, build_response, versions, user_id=user.pk
+    )
+
+
+recipe_detail = async_read_view(
+    RecipeViewSet.as_view(
+        {
+            'get': 'retrieve',
+            'put': 'update',
+            'patch': 'partial_update',
+            'delete': 'destroy',
+        },
+        basename='recipes',
+        detail=True,
+    ),
+    retrieve_recipe,
+)
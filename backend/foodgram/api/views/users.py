@@ -1,4 +1,6 @@
 from djoser.views import UserViewSet as DjoserUserViewSet
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import action
@@ -7,9 +9,12 @@ from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 
 from api.pagination import PaginationClass
+from api.serializers.recipes import ReadRecipeSerializer
 from api.serializers.users import (ProfileUserSerializer,
                                    AvatarUserSerializer, RecipesWithUserSerializer)
-from recipes.models import UserModel, SubscriptionModel
+from recipes.feed import merged_feed, popular_author_ids
+from recipes.models import (FeedEntryModel, UserModel, SubscriptionModel,
+                            RecipeModel, RecipeIngredientModel)
 
 
 class UserViewset(DjoserUserViewSet):
@@ -21,6 +26,9 @@ class UserViewset(DjoserUserViewSet):
     serializer_class = ProfileUserSerializer
     permission_classes = [AllowAny]
     pagination_class = PaginationClass
+    cursor_ordering = ("username", "id")
+    cursor_only = False
+    replica_reads = True
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def me(self, request):
@@ -53,6 +61,35 @@ class UserViewset(DjoserUserViewSet):
 
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def _get_recipes_limit(self):
+        try:
+            recipes_limit = int(self.request.query_params["recipes_limit"])
+        except (KeyError, ValueError):
+            return None
+        return recipes_limit if recipes_limit >= 0 else None
+
+    def _with_recipes(self, users_qs):
+        """
+        Добавляет к авторам первые recipes_limit рецептов.
+        Ограничение применяется в БД оконной функцией ROW_NUMBER по автору,
+        поэтому число запросов не зависит ни от числа авторов, ни от числа
+        их рецептов.
+        """
+        recipes_qs = RecipeModel.objects.all()
+        recipes_limit = self._get_recipes_limit()
+        if recipes_limit is not None:
+            recipes_qs = recipes_qs.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F("author_id"),
+                    order_by=(F("name").asc(), F("id").asc()),
+                )
+            ).filter(row_number__lte=recipes_limit)
+
+        return users_qs.prefetch_related(
+            Prefetch("recipes", queryset=recipes_qs, to_attr="limited_recipes")
+        )
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated],
@@ -60,13 +97,52 @@ class UserViewset(DjoserUserViewSet):
         pagination_class=PaginationClass,
     )
     def subscriptions(self, request):
-        subscribed_qs = (UserModel.objects
-                         .filter(authors__user=request.user)
-                         .prefetch_related("recipes"))
+        subscribed_qs = self._with_recipes(
+            UserModel.objects.filter(authors__user=request.user)
+        )
         page = self.paginate_queryset(subscribed_qs)
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        serializer_class=ReadRecipeSerializer,
+        cursor_ordering=("-recipe_id",),
+        cursor_only=True,
+    )
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок, от новых к старым.
+        Читается из материализованной ленты по индексу (user, recipe).
+        Рецепты популярных авторов в ленту не рассылаются и добавляются к
+        ней при чтении.
+        """
+        ingredients = RecipeIngredientModel.objects.select_related(
+            "ingredient"
+        )
+        author_ids = popular_author_ids(request.user.pk)
+        if author_ids:
+            recipes = self.paginate_queryset(
+                merged_feed(request.user.pk, author_ids)
+                .select_related("author")
+                .prefetch_related(
+                    Prefetch("recipe_ingredients", queryset=ingredients)
+                )
+            )
+        else:
+            entries = self.paginate_queryset(
+                FeedEntryModel.objects
+                .filter(user=request.user)
+                .select_related("recipe__author")
+                .prefetch_related(Prefetch(
+                    "recipe__recipe_ingredients", queryset=ingredients
+                ))
+            )
+            recipes = [entry.recipe for entry in entries]
+        serializer = self.get_serializer(recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=["post", "delete"],
@@ -75,10 +151,12 @@ class UserViewset(DjoserUserViewSet):
     )
     def subscribe(self, request, id=None):
 
-        author = get_object_or_404(UserModel, id=id)
         user = request.user
 
         if request.method == "POST":
+            author = get_object_or_404(
+                self._with_recipes(UserModel.objects), id=id
+            )
             if user == author:
                 raise ValidationError("You cannot subscribe to yourself.")
 
@@ -91,6 +169,7 @@ class UserViewset(DjoserUserViewSet):
             serializer = self.get_serializer(author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+        author = get_object_or_404(UserModel, id=id)
         subscription = get_object_or_404(SubscriptionModel, user=user, author=author)
         subscription.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
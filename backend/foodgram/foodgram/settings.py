@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -29,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.instrumentation.RequestMetricsMiddleware",
+    "api.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,6 +62,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
+# Профиль сервера из gunicorn.conf.py: асинхронные представления горячих
+# маршрутов подключаются только под ASGI
+SERVER_PROFILE = os.getenv("SERVER_PROFILE", "wsgi")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -68,12 +76,49 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "postgres"),
     }
 }
+# Реплики только для чтения: хосты через запятую, остальные параметры
+# подключения как у основной БД
+_replica_hosts = [
+    host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()
+]
+REPLICA_DATABASES = [f"replica_{number}" for number in range(len(_replica_hosts))]
+for _alias, _host in zip(REPLICA_DATABASES, _replica_hosts):
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "HOST": _host,
+        "TEST": {"MIRROR": "default"},
+    }
 # DATABASES = {
 #     "default": {
 #         "ENGINE": "django.db.backends.sqlite3",
 #         "NAME": BASE_DIR / "db.sqlite3",
-#     }
+#     },
+#     # Копия db.sqlite3 вместо реплики для проверки маршрутизации
+#     "replica_0": {
+#         "ENGINE": "django.db.backends.sqlite3",
+#         "NAME": BASE_DIR / "replica.sqlite3",
+#     },
 # }
+# REPLICA_DATABASES = ["replica_0"]
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+# Сколько секунд после записи чтения пользователя идут в основную БД.
+# Закрепления хранятся в кэше, общем для всех воркеров: следующий запрос
+# пользователя может попасть в другой процесс
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+REPLICA_PIN_CACHE_ALIAS = os.getenv("REPLICA_PIN_CACHE_ALIAS", "default")
+
+# Кэш по умолчанию в памяти процесса. Для нескольких воркеров задаётся
+# общий кэш (CACHE_BACKEND=django.core.cache.backends.memcached.
+# PyMemcacheCache, CACHE_LOCATION=host:port): его требуют кэш токенов
+# AUTH_TOKEN_CACHE_ALIAS и закрепления за основной БД при репликах
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,7 +153,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -131,6 +176,60 @@ DJOSER = {
 
 AUTH_USER_MODEL = "recipes.UserModel"
 
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv("IMAGE_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 2))
+
+INGREDIENT_INDEX_TTL = int(os.getenv("INGREDIENT_INDEX_TTL", 300))
+# Как часто процесс сверяет версию справочника ингредиентов с БД (секунды)
+INGREDIENT_VERSION_CHECK_INTERVAL = float(
+    os.getenv("INGREDIENT_VERSION_CHECK_INTERVAL", 1)
+)
+
+RECIPE_INDEX_TTL = int(os.getenv("RECIPE_INDEX_TTL", 600))
+RECIPE_INDEX_SYNC_INTERVAL = float(os.getenv("RECIPE_INDEX_SYNC_INTERVAL", 1))
+
+# Карта id рецептов для коротких ссылок: полная перестройка и догрузка новых
+SHORT_LINK_INDEX_TTL = int(os.getenv("SHORT_LINK_INDEX_TTL", 600))
+SHORT_LINK_SYNC_INTERVAL = float(os.getenv("SHORT_LINK_SYNC_INTERVAL", 1))
+
+RECIPE_SEARCH_CONFIG = os.getenv("RECIPE_SEARCH_CONFIG", "russian")
+
+RECIPE_CACHE_ALIAS = os.getenv("RECIPE_CACHE_ALIAS", "default")
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(os.getenv("RECIPE_RESPONSE_CACHE_TIMEOUT", 300))
+
+# Лента подписок: авторы с числом подписчиков больше FEED_FANOUT_LIMIT
+# не рассылают рецепты при публикации, их рецепты подтягиваются при чтении
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 5000))
+FEED_BACKFILL_SIZE = int(os.getenv("FEED_BACKFILL_SIZE", 100))
+FEED_BATCH_SIZE = 1000
+
+# Популярные рецепты: период полураспада веса события, окно полного
+# пересчёта и оценка, ниже которой рецепт выпадает из таблицы
+TRENDING_HALF_LIFE = timedelta(hours=int(os.getenv("TRENDING_HALF_LIFE_HOURS", 24)))
+TRENDING_WINDOW = timedelta(days=int(os.getenv("TRENDING_WINDOW_DAYS", 14)))
+TRENDING_MIN_SCORE = 0.01
+
+# Кэш токенов аутентификации: LRU процесса на AUTH_TOKEN_CACHE_SIZE
+# записей с коротким сроком AUTH_TOKEN_LOCAL_TTL (столько секунд токен,
+# отозванный в другом воркере, ещё принимается) и, если задан
+# AUTH_TOKEN_CACHE_ALIAS, общий для всех воркеров кэш на AUTH_TOKEN_CACHE_TTL
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+AUTH_TOKEN_LOCAL_TTL = int(os.getenv("AUTH_TOKEN_LOCAL_TTL", 5))
+AUTH_TOKEN_CACHE_ALIAS = os.getenv("AUTH_TOKEN_CACHE_ALIAS") or None
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", 300))
+
+# Метрики запросов: доля запросов с подсчётом SQL, порог медленного запроса
+# в миллисекундах и число одинаковых запросов, считающееся повтором (N+1)
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", 0.01))
+REQUEST_METRICS_SLOW_MS = float(os.getenv("REQUEST_METRICS_SLOW_MS", 500))
+REQUEST_METRICS_DUPLICATE_THRESHOLD = int(
+    os.getenv("REQUEST_METRICS_DUPLICATE_THRESHOLD", 3)
+)
+
+# Токен доступа к /api/metrics/ для Prometheus (кроме сотрудников)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
 APPEND_SLASH = True
 
 LOGGING = {
@@ -143,7 +242,11 @@ LOGGING = {
     'loggers': {
         'django': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
+        },
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
         },
     },
 }
@@ -0,0 +1,29 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+# SERVER_PROFILE=asgi запускает то же приложение через foodgram.asgi на
+# воркерах uvicorn: асинхронные представления не занимают поток на время
+# ожидания, и один процесс держит тысячи медленных соединений
+PROFILES = {
+    "wsgi": ("foodgram.wsgi:application", "sync"),
+    "asgi": ("foodgram.asgi:application", "uvicorn_worker.UvicornWorker"),
+}
+
+wsgi_app, worker_class = PROFILES[os.getenv("SERVER_PROFILE", "wsgi")]
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY", 3))
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска не должны попасть в новые суммы
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.safestring import mark_safe
 from django.contrib.auth.admin import UserAdmin
 
+from .cooking_time import get_cooking_time_histogram
 from .models import (
     UserModel,
     SubscriptionModel,
@@ -16,72 +18,56 @@ from .models import (
 class RecipesCountMixin:
     """Mixin providing recipes count functionality"""
 
-    @admin.display(description="рецепты")
+    @admin.display(description="рецепты", ordering="recipes_count")
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
-class UserHasRecipesFilter(admin.SimpleListFilter):
-    title = "presence of recipes"
-    parameter_name = "has_recipes"
-    field = "recipes"
-    lookups_choices = (
-        ("yes", "Есть рецепты"),
-        ("no", "Нет рецептов"),
-    )
+class CounterPresenceFilter(admin.SimpleListFilter):
+    """Базовый фильтр по денормализованному счётчику пользователя"""
+
+    field = None
+    lookups_choices = ()
 
     def lookups(self, request, model_admin):
         return self.lookups_choices
 
     def queryset(self, request, queryset):
         if self.value() == "yes":
-            return queryset.filter(
-                **{f"{self.field}__isnull": False}
-            ).distinct()
+            return queryset.filter(**{f"{self.field}__gt": 0})
         if self.value() == "no":
-            return queryset.filter(**{f"{self.field}__isnull": True})
+            return queryset.filter(**{self.field: 0})
+
+
+class UserHasRecipesFilter(CounterPresenceFilter):
+    title = "presence of recipes"
+    parameter_name = "has_recipes"
+    field = "recipes_count"
+    lookups_choices = (
+        ("yes", "Есть рецепты"),
+        ("no", "Нет рецептов"),
+    )
 
 
-class UserHasFollowersFilter(admin.SimpleListFilter):
+class UserHasFollowersFilter(CounterPresenceFilter):
     title = "presence of followers"
     parameter_name = "has_followers"
+    field = "followers_count"
     lookups_choices = (
         ("yes", "Есть подписчики"),
         ("no", "Нет подписчиков"),
     )
 
-    def lookups(self, request, model_admin):
-        return self.lookups_choices
 
-    def queryset(self, request, queryset):
-        if self.value() == "yes":
-            return queryset.filter(
-                **{f"{self.field}__isnull": False}
-            ).distinct()
-        if self.value() == "no":
-            return queryset.filter(**{f"{self.field}__isnull": True})
-
-
-class UserHasSubscriptionsFilter(admin.SimpleListFilter):
+class UserHasSubscriptionsFilter(CounterPresenceFilter):
     title = "presence of subscriptions"
     parameter_name = "has_subscriptions"
-    field = "followers"
+    field = "following_count"
     lookups_choices = (
         ("yes", "Есть подписки"),
         ("no", "Нет подписок"),
     )
 
-    def lookups(self, request, model_admin):
-        return self.lookups_choices
-
-    def queryset(self, request, queryset):
-        if self.value() == "yes":
-            return queryset.filter(
-                **{f"{self.field}__isnull": False}
-            ).distinct()
-        if self.value() == "no":
-            return queryset.filter(**{f"{self.field}__isnull": True})
-
 
 @admin.register(UserModel)
 class UserAdminClass(UserAdmin, RecipesCountMixin):
@@ -154,13 +140,13 @@ class UserAdminClass(UserAdmin, RecipesCountMixin):
             return f'<img src="{obj.avatar.url}" width="50" height="50" />'
         return ""
 
-    @admin.display(description="Followers")
+    @admin.display(description="Followers", ordering="followers_count")
     def get_number_of_followers(self, user_obj):
-        return user_obj.authors.count()
+        return user_obj.followers_count
 
-    @admin.display(description="Subscriptions")
+    @admin.display(description="Subscriptions", ordering="following_count")
     def get_number_of_following(self, user_obj):
-        return user_obj.followers.count()
+        return user_obj.following_count
 
 
 @admin.register(SubscriptionModel)
@@ -177,56 +163,38 @@ class FilterOfTimeOfCooking(admin.SimpleListFilter):
 
     title = "время приготовления"
     parameter_name = "cooking_time"
-    _thresholds = None
 
     def lookups(self, request, model_admin):
-        cooking_times = [r.cooking_time for r in RecipeModel.objects.all()]
-
-        if not cooking_times:
+        histogram = get_cooking_time_histogram()
+        if histogram is None:
             return []
 
-        min_time = min(cooking_times)
-        max_time = max(cooking_times)
-
-        if max_time - min_time <= 5:
-            return []
-
-        time_range = max_time - min_time
-        self._thresholds = (
-            min_time + time_range // 3,
-            min_time + (2 * time_range) // 3,
-        )
-        threshold1, threshold2 = self._thresholds
-
-        quick = medium = long = 0
-        for t in cooking_times:
-            if t < threshold1:
-                quick += 1
-            elif t < threshold2:
-                medium += 1
-            else:
-                long += 1
-
+        threshold1, threshold2 = histogram["thresholds"]
         return [
-            ("quick", f"до {threshold1} мин ({quick})"),
-            ("medium", f"от {threshold1} до {threshold2} мин ({medium})"),
-            ("long", f"от {threshold2} мин и больше ({long})"),
+            ("quick", f"до {threshold1} мин ({histogram['quick']})"),
+            (
+                "medium",
+                f"от {threshold1} до {threshold2} мин "
+                f"({histogram['medium']})",
+            ),
+            ("long", f"от {threshold2} мин и больше ({histogram['long']})"),
         ]
 
     def queryset(self, request, queryset):
-        if not self.value() or not self._thresholds:
+        histogram = get_cooking_time_histogram()
+        if not self.value() or histogram is None:
             return queryset
 
-        threshold1, threshold2 = self._thresholds
+        threshold1, threshold2 = histogram["thresholds"]
 
         if self.value() == "quick":
-            return queryset.filter(cooking_time__lte=threshold1)
+            return queryset.filter(cooking_time__lt=threshold1)
         if self.value() == "medium":
             return queryset.filter(
-                cooking_time__gt=threshold1, cooking_time__lte=threshold2
+                cooking_time__gte=threshold1, cooking_time__lt=threshold2
             )
         if self.value() == "long":
-            return queryset.filter(cooking_time__gt=threshold2)
+            return queryset.filter(cooking_time__gte=threshold2)
         return queryset
 
 
@@ -256,10 +224,16 @@ class AdminRecipeModel(admin.ModelAdmin):
     )
     inlines = (RecipeIngredientInline,)
     list_filter = (FilterOfTimeOfCooking, "author")
+    list_select_related = ("author",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            "recipe_ingredients__ingredient"
+        )
 
-    @admin.display(description="favorites")
+    @admin.display(description="favorites", ordering="favorites_count")
     def get_favorites_count(self, obj):
-        return obj.favoriterecipemodel_relations.count()
+        return obj.favorites_count
 
     @admin.display(description="ingredients")
     @mark_safe
@@ -289,6 +263,11 @@ class AdminIngredientModel(admin.ModelAdmin, RecipesCountMixin):
     search_fields = ("name", "measurement_unit")
     list_display = ("name", "measurement_unit", "get_recipes_count")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_count=Count("recipes")
+        )
+
 
 @admin.register(FavoriteRecipeModel, ShoppingCart)
 class RecipeUserRelationAdminModel(admin.ModelAdmin):
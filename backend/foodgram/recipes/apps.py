@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "recipes"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        # Обработчики регистрируются при импорте модулей
+        from .signals import (  # noqa: F401
+            counters,
+            feed,
+            images,
+            indexes,
+            search,
+            versions,
+        )
+
+        post_migrate.connect(search.create_search_index, sender=self)
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q, Subquery
+
+from .models import RecipeModel
+
+HISTOGRAM_CACHE_KEY = "recipes:cooking-time-histogram"
+HISTOGRAM_CACHE_TIMEOUT = 300
+# Минимальный разброс времени, при котором рецепты делятся на группы
+MIN_TIME_RANGE = 5
+
+
+def _calculate_histogram():
+    recipes = RecipeModel.objects.order_by()
+    min_time = Subquery(
+        recipes.order_by("cooking_time").values("cooking_time")[:1]
+    )
+    max_time = Subquery(
+        recipes.order_by("-cooking_time").values("cooking_time")[:1]
+    )
+    threshold1 = min_time + (max_time - min_time) / 3
+    threshold2 = min_time + (max_time - min_time) * 2 / 3
+
+    stats = recipes.aggregate(
+        min_time=Min("cooking_time"),
+        max_time=Max("cooking_time"),
+        quick=Count("pk", filter=Q(cooking_time__lt=threshold1)),
+        medium=Count(
+            "pk",
+            filter=Q(
+                cooking_time__gte=threshold1, cooking_time__lt=threshold2
+            ),
+        ),
+        long=Count("pk", filter=Q(cooking_time__gte=threshold2)),
+    )
+    if stats["min_time"] is None:
+        return None
+
+    time_range = stats["max_time"] - stats["min_time"]
+    if time_range <= MIN_TIME_RANGE:
+        return None
+
+    stats["thresholds"] = (
+        stats["min_time"] + time_range // 3,
+        stats["min_time"] + (2 * time_range) // 3,
+    )
+    return stats
+
+
+def get_cooking_time_histogram():
+    """
+    Возвращает границы групп времени приготовления и число рецептов в них.
+
+    Считается одним агрегирующим запросом и кэшируется до изменения рецептов.
+    Возвращает None, если рецептов нет или разброс времени слишком мал.
+    """
+    histogram = cache.get(HISTOGRAM_CACHE_KEY)
+    if histogram is None:
+        histogram = _calculate_histogram() or {}
+        cache.set(HISTOGRAM_CACHE_KEY, histogram, HISTOGRAM_CACHE_TIMEOUT)
+    return histogram or None
+
+
+def invalidate_cooking_time_histogram():
+    cache.delete(HISTOGRAM_CACHE_KEY)
@@ -0,0 +1,54 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    FavoriteRecipeModel,
+    RecipeModel,
+    ShoppingCart,
+    SubscriptionModel,
+    UserModel,
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик строки на delta средствами БД"""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """Изменяет счётчик нескольких строк на delta одним запросом"""
+    if not delta or not pks:
+        return
+    rows = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        # Не даём счётчику уйти в минус при рассинхронизации
+        rows = rows.filter(**{f"{field}__gte": -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def _count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def recount_all():
+    """Пересчитывает все денормализованные счётчики по связанным таблицам"""
+    recipes = RecipeModel.objects.update(
+        favorites_count=_count_subquery(FavoriteRecipeModel, "recipe"),
+        shopping_carts_count=_count_subquery(ShoppingCart, "recipe"),
+    )
+    users = UserModel.objects.update(
+        recipes_count=_count_subquery(RecipeModel, "author"),
+        followers_count=_count_subquery(SubscriptionModel, "author"),
+        following_count=_count_subquery(SubscriptionModel, "user"),
+    )
+    return recipes, users
@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import FeedEntryModel, RecipeModel, SubscriptionModel, UserModel
+
+
+def _insert(entries):
+    FeedEntryModel.objects.bulk_create(
+        entries, batch_size=settings.FEED_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def is_popular(followers_count):
+    """Рецепты популярных авторов не рассылаются, а подтягиваются при чтении"""
+    return followers_count > settings.FEED_FANOUT_LIMIT
+
+
+def _recent_recipe_ids(author_id, limit):
+    recipe_ids = (RecipeModel.objects
+                  .filter(author_id=author_id)
+                  .order_by("-pk")
+                  .values_list("pk", flat=True))
+    return recipe_ids[:limit] if limit else recipe_ids
+
+
+def fan_out_recipe(recipe_id, author_id):
+    """
+    Добавляет новый рецепт в ленты всех подписчиков автора, если автор
+    не популярный.
+    """
+    followers_count = (UserModel.objects
+                       .filter(pk=author_id)
+                       .values_list("followers_count", flat=True)
+                       .first())
+    if followers_count is None or is_popular(followers_count):
+        return
+    follower_ids = (SubscriptionModel.objects
+                    .filter(author_id=author_id)
+                    .values_list("user_id", flat=True)
+                    .iterator(chunk_size=settings.FEED_BATCH_SIZE))
+    batch = []
+    for user_id in follower_ids:
+        batch.append(FeedEntryModel(
+            user_id=user_id, recipe_id=recipe_id, author_id=author_id
+        ))
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            _insert(batch)
+            batch = []
+    _insert(batch)
+
+
+def backfill_subscription(user_id, author_id, limit=None):
+    """Добавляет в ленту подписчика последние рецепты автора"""
+    if limit is None:
+        limit = settings.FEED_BACKFILL_SIZE
+    _insert([
+        FeedEntryModel(
+            user_id=user_id, recipe_id=recipe_id, author_id=author_id
+        )
+        for recipe_id in _recent_recipe_ids(author_id, limit)
+    ])
+
+
+def remove_subscription(user_id, author_id):
+    FeedEntryModel.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def popular_author_ids(user_id):
+    """Популярные авторы из подписок пользователя"""
+    return list(
+        SubscriptionModel.objects
+        .filter(user_id=user_id,
+                author__followers_count__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list("author_id", flat=True)
+    )
+
+
+def merged_feed(user_id, author_ids):
+    """
+    Рецепты ленты вместе с рецептами популярных авторов author_ids. Они
+    объединяются при чтении, а не записываются в ленту, поэтому чтение
+    ленты ничего не меняет в БД и может идти с реплики. recipe_id совпадает
+    с полем записи ленты, так что курсоры обоих вариантов ленты общие.
+    """
+    return (RecipeModel.objects
+            .filter(Q(pk__in=FeedEntryModel.objects
+                      .filter(user_id=user_id)
+                      .values("recipe_id"))
+                    | Q(author_id__in=author_ids))
+            .annotate(recipe_id=F("pk")))
+
+
+def rebuild_feeds(user_ids=None, per_author=None):
+    """
+    Пересобирает ленты указанных (или всех) пользователей по подпискам.
+    per_author ограничивает число последних рецептов каждого автора.
+    Возвращает число созданных записей.
+    """
+    entries = FeedEntryModel.objects.all()
+    subscriptions = SubscriptionModel.objects.order_by()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        subscriptions = subscriptions.filter(user_id__in=user_ids)
+    entries.delete()
+
+    followers = defaultdict(list)
+    pairs = subscriptions.values_list("author_id", "user_id").iterator(
+        chunk_size=settings.FEED_BATCH_SIZE
+    )
+    for author_id, user_id in pairs:
+        followers[author_id].append(user_id)
+
+    total = 0
+    batch = []
+    for author_id, follower_ids in followers.items():
+        recipe_ids = list(_recent_recipe_ids(author_id, per_author))
+        for user_id in follower_ids:
+            for recipe_id in recipe_ids:
+                batch.append(FeedEntryModel(
+                    user_id=user_id, recipe_id=recipe_id, author_id=author_id
+                ))
+            if len(batch) >= settings.FEED_BATCH_SIZE:
+                _insert(batch)
+                total += len(batch)
+                batch = []
+    _insert(batch)
+    return total + len(batch)
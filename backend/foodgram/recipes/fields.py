@@ -0,0 +1,51 @@
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+
+from .images import IMAGE_VARIANTS, delete_variants, variant_name
+
+
+class VariantImageFieldFile(ImageFieldFile):
+    """Файл изображения с доступом к уменьшенным вариантам"""
+
+    @property
+    def variants_ready(self):
+        return getattr(self.instance, self.field.variants_field)
+
+    def variant_url(self, variant):
+        """URL варианта, либо оригинала, пока варианты ещё не созданы"""
+        if variant not in IMAGE_VARIANTS:
+            raise ValueError(f"Unknown image variant: {variant}")
+        if self.variants_ready:
+            return self.storage.url(variant_name(self.name, variant))
+        return self.url
+
+    def delete(self, save=True):
+        if self.name:
+            delete_variants(self.storage, self.name)
+        super().delete(save=save)
+
+
+class VariantImageField(models.ImageField):
+    """
+    Поле изображения, для которого создаются варианты разных размеров.
+    Готовность вариантов хранится в булевом поле модели variants_field,
+    чтобы ссылки на них строились без обращения к хранилищу. При загрузке
+    нового файла флаг сбрасывается.
+    """
+
+    attr_class = VariantImageFieldFile
+
+    def __init__(self, *args, variants_field, **kwargs):
+        self.variants_field = variants_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["variants_field"] = self.variants_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            setattr(model_instance, self.variants_field, False)
+        return super().pre_save(model_instance, add)
@@ -0,0 +1,124 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Название варианта -> максимальные ширина и высота
+IMAGE_VARIANTS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+VARIANT_FORMAT = "WEBP"
+VARIANT_EXTENSION = "webp"
+VARIANT_QUALITY = 80
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGE_VARIANT_WORKERS", 2),
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def variant_name(name, variant):
+    """
+    Путь к варианту изображения: каталог variants/<имя оригинала>/ рядом с
+    оригиналом. Имя оригинала уникально в хранилище, поэтому варианты
+    разных файлов не пересекаются, даже если их имена отличаются только
+    расширением.
+    """
+    directory, filename = posixpath.split(name)
+    return posixpath.join(
+        directory, "variants", filename, f"{variant}.{VARIANT_EXTENSION}"
+    )
+
+
+def _render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.Resampling.LANCZOS)
+    if variant.mode not in ("RGB", "RGBA"):
+        variant = variant.convert(
+            "RGBA" if "A" in variant.getbands() else "RGB"
+        )
+    buffer = BytesIO()
+    variant.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(storage, name):
+    """
+    Создаёт все варианты изображения, заменяя оставшиеся от прежнего файла
+    с тем же именем. Возвращает True, если варианты созданы.
+    """
+    try:
+        with storage.open(name, "rb") as original:
+            image = ImageOps.exif_transpose(Image.open(original))
+            image.load()
+        for variant, size in IMAGE_VARIANTS.items():
+            path = variant_name(name, variant)
+            storage.delete(path)
+            storage.save(path, ContentFile(_render_variant(image, size)))
+    except Exception:
+        logger.exception("Failed to generate image variants for %s", name)
+        return False
+    return True
+
+
+def mark_variants_ready(model, pk, field_name, name):
+    """
+    Отмечает варианты изображения объекта готовыми. False, если файл
+    объекта успели заменить, пока создавались варианты.
+    """
+    flag = model._meta.get_field(field_name).variants_field
+    updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+        **{flag: True}
+    )
+    return bool(updated)
+
+
+def _generate_and_mark(model, pk, field_name, storage, name, on_ready):
+    try:
+        if (generate_variants(storage, name)
+                and mark_variants_ready(model, pk, field_name, name)
+                and on_ready is not None):
+            on_ready(pk)
+    except Exception:
+        logger.exception("Failed to mark image variants of %s", name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(field_file, on_ready=None):
+    """
+    Ставит генерацию вариантов в пул потоков после фиксации транзакции.
+    Когда варианты готовы, у объекта выставляется флаг готовности и
+    вызывается on_ready(pk), чтобы сбросить ответы со ссылкой на оригинал.
+    """
+    if not field_file:
+        return
+    instance, field = field_file.instance, field_file.field
+    args = (
+        type(instance), instance.pk, field.name,
+        field_file.storage, field_file.name, on_ready,
+    )
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_and_mark, *args)
+    )
+
+
+def delete_variants(storage, name):
+    for variant in IMAGE_VARIANTS:
+        storage.delete(variant_name(name, variant))
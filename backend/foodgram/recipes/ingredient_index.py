@@ -0,0 +1,140 @@
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import IngredientModel
+from .versions import aget_versions, bump_versions, get_versions
+
+CATALOG_VERSION_KEY = "ingredients:catalog"
+
+# Символ, который больше любого другого: верхняя граница диапазона префикса
+_PREFIX_UPPER_BOUND = "\U0010ffff"
+
+
+def get_catalog_version():
+    """Возвращает текущую версию справочника ингредиентов (время в нс)"""
+    return get_versions(CATALOG_VERSION_KEY)[0]
+
+
+async def aget_catalog_version():
+    return (await aget_versions(CATALOG_VERSION_KEY))[0]
+
+
+def bump_catalog_version():
+    """Меняет версию справочника ингредиентов"""
+    return bump_versions(CATALOG_VERSION_KEY)[CATALOG_VERSION_KEY]
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для поиска по началу названия.
+
+    Хранит отсортированный по названию в нижнем регистре список ингредиентов
+    и отвечает на запросы ``istartswith`` двоичным поиском без обращения к БД.
+    Индекс строится лениво при первом запросе и перестраивается, когда
+    меняется версия справочника в БД или истекает ``INGREDIENT_INDEX_TTL``.
+    Версия сверяется с БД не чаще раза в
+    ``INGREDIENT_VERSION_CHECK_INTERVAL`` секунд.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = None
+        self._rows = None
+        self._version = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "INGREDIENT_INDEX_TTL", 300)
+
+    def _version_checked(self):
+        interval = getattr(settings, "INGREDIENT_VERSION_CHECK_INTERVAL", 1)
+        now = time.monotonic()
+        return (self._keys is not None
+                and now - self._checked_at < interval
+                and now - self._built_at <= self.ttl)
+
+    def _is_stale(self, version):
+        return (self._keys is None
+                or self._version != version
+                or time.monotonic() - self._built_at > self.ttl)
+
+    def build(self, version=None):
+        if version is None:
+            version = get_catalog_version()
+        rows = sorted(
+            (
+                {"id": pk, "name": name, "measurement_unit": unit}
+                for pk, name, unit in IngredientModel.objects.values_list(
+                    "id", "name", "measurement_unit"
+                ).order_by()
+            ),
+            key=lambda row: (row["name"].lower(), row["name"], row["id"]),
+        )
+        keys = [row["name"].lower() for row in rows]
+        with self._lock:
+            self._keys, self._rows = keys, rows
+            self._version = version
+            self._built_at = self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = self._rows = None
+        bump_catalog_version()
+
+    def _snapshot(self):
+        if not self._version_checked():
+            version = get_catalog_version()
+            if self._is_stale(version):
+                self.build(version)
+            self._checked_at = time.monotonic()
+        with self._lock:
+            return self._keys or [], self._rows or []
+
+    @property
+    def version(self):
+        """Версия справочника, по которой построен текущий индекс"""
+        self._snapshot()
+        return self._version
+
+    def all(self):
+        return list(self._snapshot()[1])
+
+    def search(self, prefix):
+        keys, rows = self._snapshot()
+        return self._match(keys, rows, prefix)
+
+    async def asearch(self, prefix):
+        """
+        search для асинхронных представлений: индекс перестраивается вне
+        цикла событий. Возвращает найденные строки и версию индекса.
+        """
+        if not self._version_checked():
+            version = await aget_catalog_version()
+            if self._is_stale(version):
+                await sync_to_async(self.build)(version)
+            self._checked_at = time.monotonic()
+        with self._lock:
+            keys, rows = self._keys or [], self._rows or []
+            version = self._version
+        return self._match(keys, rows, prefix), version
+
+    @staticmethod
+    def _match(keys, rows, prefix):
+        if not prefix:
+            return list(rows)
+        prefix = prefix.lower()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + _PREFIX_UPPER_BOUND, lo=start)
+        return rows[start:end]
+
+
+ingredient_index = IngredientIndex()
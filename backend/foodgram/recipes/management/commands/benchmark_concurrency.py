@@ -0,0 +1,220 @@
+import asyncio
+import json
+import resource
+import statistics
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from recipes.management.commands.benchmark_endpoints import percentile
+from recipes.models import IngredientModel, RecipeModel
+
+
+class Command(BaseCommand):
+    help = ("Load a running server with many idle slow-client connections and "
+            "concurrent read requests; run against the WSGI and the ASGI "
+            "profile to compare them")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--idle", type=int, default=1000,
+            help="Connections that send headers slowly and never finish "
+                 "a request",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=50,
+            help="Clients sending requests back to back",
+        )
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument("--timeout", type=float, default=10.0)
+        parser.add_argument(
+            "--path", action="append", default=[],
+            help="Request path, may be repeated; defaults to ingredient "
+                 "search, recipe detail and short link",
+        )
+        parser.add_argument("--label", default="", help="Stored in the report")
+        parser.add_argument("--output", help="Write the JSON report to a file")
+
+    def _default_paths(self):
+        recipe_id = RecipeModel.objects.order_by("pk").values_list(
+            "pk", flat=True
+        ).first()
+        ingredient = IngredientModel.objects.order_by("pk").values_list(
+            "name", flat=True
+        ).first()
+        if recipe_id is None or ingredient is None:
+            raise CommandError(
+                "Database has no recipes or ingredients, pass --path"
+            )
+        return [
+            f"/api/ingredients/?name={ingredient[:2]}",
+            f"/api/recipes/{recipe_id}/",
+            reverse("recipes:short-link-redirect", args=[recipe_id]),
+        ]
+
+    @staticmethod
+    def _raise_file_limit(needed):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < needed:
+            target = (
+                needed if hard == resource.RLIM_INFINITY
+                else min(needed, hard)
+            )
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+    async def _hold_idle(self, host, port, stop, stats):
+        """
+        Медленный клиент: открывает запрос и шлёт по заголовку раз в
+        секунду
+        """
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            stats["idle_refused"] += 1
+            return
+        stats["idle_opened"] += 1
+        try:
+            writer.write(f"GET / HTTP/1.1\r\nHost: {host}\r\n".encode())
+            while not stop.is_set():
+                await writer.drain()
+                try:
+                    await asyncio.wait_for(stop.wait(), 1)
+                except asyncio.TimeoutError:
+                    writer.write(b"X-Idle: 1\r\n")
+                if reader.at_eof():
+                    raise ConnectionResetError
+            stats["idle_alive"] += 1
+        except OSError:
+            stats["idle_dropped"] += 1
+        finally:
+            writer.close()
+
+    async def _request(self, host, port, path):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    async def _client(
+        self, number, host, port, paths, deadline, timeout, samples
+    ):
+        index = number
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    self._request(host, port, path), timeout
+                )
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                samples[path]["errors"] += 1
+                continue
+            samples[path]["times"].append(time.perf_counter() - started)
+            if status >= 400:
+                samples[path]["errors"] += 1
+
+    async def _run(self, options, host, port, paths):
+        stop = asyncio.Event()
+        stats = defaultdict(int)
+        idle = [
+            asyncio.create_task(self._hold_idle(host, port, stop, stats))
+            for _ in range(options["idle"])
+        ]
+        # Нагрузка начинается, когда медленные клиенты уже подключились
+        await asyncio.sleep(min(2.0, 0.5 + options["idle"] / 2000))
+
+        samples = defaultdict(lambda: {"times": [], "errors": 0})
+        started = time.monotonic()
+        await asyncio.gather(*(
+            self._client(
+                number, host, port, paths, started + options["duration"],
+                options["timeout"], samples,
+            )
+            for number in range(options["concurrency"])
+        ))
+        elapsed = time.monotonic() - started
+
+        stop.set()
+        await asyncio.gather(*idle)
+        return samples, stats, elapsed
+
+    @staticmethod
+    def _round_ms(statistic, times, *args):
+        return round(statistic(times, *args), 3) if times else None
+
+    def _report(self, options, samples, stats, elapsed):
+        endpoints = {}
+        all_times = []
+        errors = 0
+        for path, sample in sorted(samples.items()):
+            times = [value * 1000 for value in sample["times"]]
+            all_times += times
+            errors += sample["errors"]
+            endpoints[path] = {
+                "requests": len(times),
+                "errors": sample["errors"],
+                "p50_ms": self._round_ms(percentile, times, 0.5),
+                "p95_ms": self._round_ms(percentile, times, 0.95),
+            }
+        return {
+            "meta": {
+                "label": options["label"],
+                "url": options["url"],
+                "idle": options["idle"],
+                "concurrency": options["concurrency"],
+                "duration": options["duration"],
+            },
+            "throughput_rps": round(len(all_times) / elapsed, 1),
+            "requests": len(all_times),
+            "errors": errors,
+            "p50_ms": self._round_ms(percentile, all_times, 0.5),
+            "p95_ms": self._round_ms(percentile, all_times, 0.95),
+            "p99_ms": self._round_ms(percentile, all_times, 0.99),
+            "mean_ms": self._round_ms(statistics.fmean, all_times),
+            "idle_connections": {
+                "opened": stats["idle_opened"],
+                "alive_at_end": stats["idle_alive"],
+                "dropped": stats["idle_dropped"],
+                "refused": stats["idle_refused"],
+            },
+            "endpoints": endpoints,
+        }
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--url must be an http:// address")
+        paths = options["path"] or self._default_paths()
+        self._raise_file_limit(options["idle"] + options["concurrency"] + 256)
+
+        samples, stats, elapsed = asyncio.run(
+            self._run(options, url.hostname, url.port or 80, paths)
+        )
+        report = self._report(options, samples, stats, elapsed)
+
+        output = json.dumps(
+            report, indent=2, sort_keys=True, ensure_ascii=False
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['requests']} requests, "
+                f"{report['throughput_rps']} rps, "
+                f"report written to {options['output']}"
+            ))
+        else:
+            self.stdout.write(output)
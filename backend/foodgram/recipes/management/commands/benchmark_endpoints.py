@@ -0,0 +1,466 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.models import (
+    FavoriteRecipeModel,
+    IngredientModel,
+    RecipeModel,
+    ShoppingCart,
+    SubscriptionModel,
+    UserModel,
+)
+
+# Изображение 1x1 PNG для запросов, создающих рецепт или аватар
+PIXEL = ("data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ"
+         "AAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==")
+
+# Маршруты djoser, требующие писем или одноразовых токенов, не измеряются
+EXCLUDED_ROUTES = {
+    ("users-activation", "POST"): "email activation flow",
+    ("users-resend-activation", "POST"): "email activation flow",
+    ("users-reset-password", "POST"): "sends email",
+    ("users-reset-password-confirm", "POST"): "needs a one-time uid/token",
+    ("users-reset-username", "POST"): "sends email",
+    ("users-reset-username-confirm", "POST"): "needs a one-time uid/token",
+    ("users-set-username", "POST"): "changes the login of the benchmark user",
+    ("users-list", "POST"): "signup creates a new user on every run",
+    ("users-detail", "PUT"): (
+        "djoser profile update is not used by the frontend"
+    ),
+    ("users-detail", "PATCH"): (
+        "djoser profile update is not used by the frontend"
+    ),
+    ("users-detail", "DELETE"): "deletes the benchmark user",
+}
+
+
+def percentile(values, share):
+    """Значение по методу ближайшего ранга"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def api_routes(patterns, prefix=""):
+    """Пары (имя маршрута, HTTP-метод) для всех маршрутов api/urls.py"""
+    routes = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            routes |= api_routes(pattern.url_patterns)
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, "actions", None)
+        if actions:
+            methods = actions.keys()
+        else:
+            view_class = getattr(callback, "view_class", None) or getattr(
+                callback, "cls", None
+            )
+            methods = [
+                method for method in ("get", "post", "put", "patch", "delete")
+                if view_class is not None and hasattr(view_class, method)
+            ]
+        for method in methods:
+            routes.add((pattern.name, method.upper()))
+    return routes
+
+
+class Step:
+    """Один измеряемый запрос сценария"""
+
+    def __init__(self, route, method, path, data=None, auth="user",
+                 expect=(200,)):
+        self.route = route
+        self.method = method
+        self.path = path
+        self.data = data
+        self.auth = auth
+        self.expect = expect
+
+    @property
+    def key(self):
+        if self.auth is None:
+            return f"{self.method} {self.route} (anonymous)"
+        return f"{self.method} {self.route}"
+
+
+class Command(BaseCommand):
+    help = ("Measure latency percentiles, query counts and allocations "
+            "of every API route and write them as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--prefix", default="bench",
+            help="Username prefix of users created by seed_benchmark_data",
+        )
+        parser.add_argument(
+            "--cold-cache", action="store_true",
+            help="Clear caches before every measured request",
+        )
+        parser.add_argument(
+            "--only", help="Measure only routes containing this text",
+        )
+        parser.add_argument("--output", help="File for the JSON report")
+        parser.add_argument(
+            "--compare", help="Previous JSON report to compare with",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=1.2,
+            help="p50 ratio above which a route is reported as slower",
+        )
+
+    def _context(self, prefix):
+        users = list(
+            UserModel.objects
+            .filter(username__startswith=f"{prefix}_")
+            .order_by("-following_count", "pk")[:2]
+        )
+        if len(users) < 2 or not RecipeModel.objects.exists():
+            raise CommandError(
+                "Not enough data, run seed_benchmark_data first"
+            )
+        viewer, other = users
+
+        popular_recipes = list(
+            RecipeModel.objects.order_by("-favorites_count", "pk")
+            .values_list("pk", flat=True)[:20]
+        )
+        favorites = set(
+            FavoriteRecipeModel.objects.filter(user=viewer)
+            .values_list("recipe_id", flat=True)
+        )
+        cart = set(
+            ShoppingCart.objects.filter(user=viewer)
+            .values_list("recipe_id", flat=True)
+        )
+        followed = set(
+            SubscriptionModel.objects.filter(user=viewer)
+            .values_list("author_id", flat=True)
+        )
+        free_recipes = [
+            pk for pk in popular_recipes
+            if pk not in favorites and pk not in cart
+        ]
+        author = (UserModel.objects
+                  .exclude(pk__in=followed | {viewer.pk})
+                  .order_by("-followers_count", "pk")
+                  .first())
+        ingredient_ids = list(
+            IngredientModel.objects
+            .filter(recipe_ingredients__isnull=False)
+            .order_by("pk").distinct()
+            .values_list("pk", flat=True)[:12]
+        )
+        if not cart:
+            ShoppingCart.objects.create(
+                user=viewer, recipe_id=popular_recipes[0]
+            )
+        return {
+            "viewer": viewer,
+            "other": other,
+            "password": f"{prefix}-password",
+            "recipe": popular_recipes[0],
+            "free_recipes": free_recipes[:5],
+            "author": author,
+            "ingredients": ingredient_ids,
+        }
+
+    def _scenarios(self, context):
+        """Сценарии возвращают данные в исходное состояние после прохода"""
+        recipe = context["recipe"]
+        free = context["free_recipes"]
+        author = context["author"]
+        ingredients = context["ingredients"]
+        pantry = ",".join(str(pk) for pk in ingredients)
+        new_recipe = {
+            "name": "Benchmark recipe",
+            "text": "Benchmark",
+            "cooking_time": 10,
+            "image": PIXEL,
+            "ingredients": [
+                {"id": pk, "amount": 10} for pk in ingredients[:8]
+            ],
+        }
+        recipe_update = dict(new_recipe, name="Benchmark recipe 2")
+        del recipe_update["image"]
+
+        scenarios = [
+            [Step("api-root", "GET", "/api/")],
+            [Step("users-list", "GET", "/api/users/", auth=None)],
+            [Step("users-list", "GET", "/api/users/?limit=50")],
+            [Step("users-detail", "GET",
+                  f"/api/users/{context['other'].pk}/")],
+            [Step("users-me", "GET", "/api/users/me/")],
+            [Step("users-subscriptions", "GET", "/api/users/subscriptions/")],
+            [Step("users-subscriptions", "GET",
+                  "/api/users/subscriptions/?recipes_limit=3&limit=20")],
+            [Step("ingredients-list", "GET", "/api/ingredients/?name=%D1%81")],
+            [Step("ingredients-detail", "GET",
+                  f"/api/ingredients/{ingredients[0]}/")],
+            [Step("recipes-list", "GET", "/api/recipes/", auth=None)],
+            [Step("recipes-list", "GET", "/api/recipes/")],
+            [Step("recipes-list", "GET",
+                  "/api/recipes/?limit=50&is_favorited=1")],
+            [Step("recipes-list", "GET",
+                  "/api/recipes/?search=%D1%81%D1%83%D0%BF")],
+            [Step("recipes-list", "GET", f"/api/recipes/?author={author.pk}")],
+            [Step("recipes-detail", "GET", f"/api/recipes/{recipe}/",
+                  auth=None)],
+            [Step("recipes-detail", "GET", f"/api/recipes/{recipe}/")],
+            [Step("recipes-get-link-to-recipe", "GET",
+                  f"/api/recipes/{recipe}/get-link/")],
+            [Step("recipes-pantry", "GET",
+                  f"/api/recipes/pantry/?ingredients={pantry}")],
+            [Step("recipes-download-shopping-cart", "GET",
+                  "/api/recipes/download_shopping_cart/")],
+            [
+                Step("recipes-favorite", "POST",
+                     f"/api/recipes/{free[0]}/favorite/", expect=(201,)),
+                Step("recipes-favorite", "DELETE",
+                     f"/api/recipes/{free[0]}/favorite/", expect=(204,)),
+            ],
+            [
+                Step("recipes-shopping-cart", "POST",
+                     f"/api/recipes/{free[0]}/shopping_cart/", expect=(201,)),
+                Step("recipes-shopping-cart", "DELETE",
+                     f"/api/recipes/{free[0]}/shopping_cart/", expect=(204,)),
+            ],
+            [
+                Step("recipes-favorite-bulk", "POST",
+                     "/api/recipes/favorite/bulk/", {"recipes": free}),
+                Step("recipes-favorite-bulk", "DELETE",
+                     "/api/recipes/favorite/bulk/", {"recipes": free}),
+            ],
+            [
+                Step("recipes-shopping-cart-bulk", "POST",
+                     "/api/recipes/shopping_cart/bulk/", {"recipes": free}),
+                Step("recipes-shopping-cart-bulk", "DELETE",
+                     "/api/recipes/shopping_cart/bulk/", {"recipes": free}),
+            ],
+            [
+                Step("users-subscribe", "POST",
+                     f"/api/users/{author.pk}/subscribe/", expect=(201,)),
+                Step("users-subscribe", "DELETE",
+                     f"/api/users/{author.pk}/subscribe/", expect=(204,)),
+            ],
+            [
+                Step("users-avatar", "PUT", "/api/users/me/avatar/",
+                     {"avatar": PIXEL}),
+                Step("users-avatar", "DELETE", "/api/users/me/avatar/",
+                     expect=(204,)),
+            ],
+            [
+                Step("recipes-list", "POST", "/api/recipes/", new_recipe,
+                     expect=(201,)),
+                Step("recipes-detail", "PATCH", "/api/recipes/{created}/",
+                     recipe_update),
+                Step("recipes-detail", "PUT", "/api/recipes/{created}/",
+                     new_recipe),
+                Step("recipes-detail", "DELETE", "/api/recipes/{created}/",
+                     expect=(204,)),
+            ],
+            [
+                Step("users-set-password", "POST",
+                     "/api/users/set_password/", {
+                         "current_password": context["password"],
+                         "new_password": context["password"],
+                     }, expect=(204,)),
+            ],
+            [
+                Step("login", "POST", "/api/auth/token/login/", {
+                    "email": context["other"].email,
+                    "password": context["password"],
+                }, auth=None),
+                Step("logout", "POST", "/api/auth/token/logout/", auth="login",
+                     expect=(204,)),
+            ],
+        ]
+        return scenarios
+
+    def _request(self, client, step, state, cold_cache):
+        path = step.path.format(**state)
+        headers = {}
+        if step.auth == "user":
+            headers["HTTP_AUTHORIZATION"] = f"Token {state['token']}"
+        elif step.auth == "login":
+            headers["HTTP_AUTHORIZATION"] = f"Token {state['login_token']}"
+        if cold_cache:
+            for cache in caches.all():
+                cache.clear()
+            token_cache.clear()
+
+        method = getattr(client, step.method.lower())
+        kwargs = dict(headers)
+        if step.data is not None:
+            kwargs.update(
+                data=json.dumps(step.data), content_type="application/json"
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = method(path, **kwargs)
+            if getattr(response, "streaming", False):
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+
+        if response.status_code not in step.expect:
+            raise CommandError(
+                f"{step.key} {path} answered {response.status_code}: "
+                f"{response.content[:200]!r}"
+            )
+        if step.route == "recipes-list" and step.method == "POST":
+            state["created"] = response.json()["id"]
+        if step.route == "login":
+            state["login_token"] = response.json()["auth_token"]
+        return elapsed, len(queries)
+
+    def _run(self, scenarios, state, options):
+        client = Client()
+        samples = {}
+        for scenario in scenarios:
+            for iteration in range(options["warmup"] + options["iterations"]):
+                for step in scenario:
+                    elapsed, queries = self._request(
+                        client, step, state, options["cold_cache"]
+                    )
+                    if iteration < options["warmup"]:
+                        continue
+                    sample = samples.setdefault(
+                        (step.key, step.path),
+                        {"route": step.route, "method": step.method,
+                         "times": [], "queries": []},
+                    )
+                    sample["times"].append(elapsed)
+                    sample["queries"].append(queries)
+
+            # Отдельный проход с tracemalloc, чтобы он не искажал время
+            for step in scenario:
+                tracemalloc.start()
+                try:
+                    self._request(client, step, state, options["cold_cache"])
+                    current, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                sample = samples[(step.key, step.path)]
+                sample["alloc_kib"] = current / 1024
+                sample["peak_kib"] = peak / 1024
+        return samples
+
+    def _report(self, samples, options, covered, uncovered):
+        endpoints = {}
+        for (key, path), sample in samples.items():
+            times = [value * 1000 for value in sample["times"]]
+            endpoints[f"{key} {path}"] = {
+                "route": sample["route"],
+                "method": sample["method"],
+                "path": path,
+                "p50_ms": round(percentile(times, 0.5), 3),
+                "p95_ms": round(percentile(times, 0.95), 3),
+                "mean_ms": round(statistics.fmean(times), 3),
+                "queries": int(statistics.median(sample["queries"])),
+                "alloc_kib": round(sample["alloc_kib"], 1),
+                "peak_kib": round(sample["peak_kib"], 1),
+            }
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "iterations": options["iterations"],
+                "warmup": options["warmup"],
+                "cold_cache": options["cold_cache"],
+                "recipes": RecipeModel.objects.count(),
+                "users": UserModel.objects.count(),
+            },
+            "endpoints": endpoints,
+            "routes_covered": len(covered),
+            "routes_excluded": {
+                f"{method} {name}": reason
+                for (name, method), reason in sorted(EXCLUDED_ROUTES.items())
+            },
+            "routes_uncovered": sorted(
+                f"{method} {name}" for name, method in uncovered
+            ),
+        }
+
+    def _compare(self, report, baseline_path, threshold):
+        with open(baseline_path, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["endpoints"]
+        regressions = 0
+        for name, current in sorted(report["endpoints"].items()):
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            ratio = (
+                current["p50_ms"] / previous["p50_ms"]
+                if previous["p50_ms"] else 1
+            )
+            queries = current["queries"] - previous["queries"]
+            line = (
+                f"{name}: p50 x{ratio:.2f}, "
+                f"queries {previous['queries']} -> {current['queries']}"
+            )
+            if ratio > threshold or queries > 0:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            elif ratio < 1 / threshold or queries < 0:
+                self.stdout.write(self.style.SUCCESS(line))
+        return regressions
+
+    def handle(self, *args, **options):
+        from api.urls import urlpatterns
+
+        context = self._context(options["prefix"])
+        token, _ = Token.objects.get_or_create(user=context["viewer"])
+        state = {"token": token.key}
+
+        scenarios = self._scenarios(context)
+        if options["only"]:
+            scenarios = [
+                scenario for scenario in scenarios
+                if any(options["only"] in step.route for step in scenario)
+            ]
+        routes = api_routes(urlpatterns)
+        covered = {
+            (step.route, step.method)
+            for scenario in scenarios for step in scenario
+        }
+        uncovered = routes - covered - EXCLUDED_ROUTES.keys()
+
+        samples = self._run(scenarios, state, options)
+        report = self._report(samples, options, covered, uncovered)
+
+        output = json.dumps(
+            report, indent=2, sort_keys=True, ensure_ascii=False
+        )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f"Report for {len(report['endpoints'])} endpoints "
+                f"written to {options['output']}"
+            ))
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            regressions = self._compare(
+                report, options["compare"], options["threshold"]
+            )
+            if regressions:
+                raise CommandError(f"Regressions: {regressions}")
@@ -0,0 +1,86 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import IngredientModel
+
+
+class Command(BaseCommand):
+    help = ("Compare ingredient prefix search through the ORM "
+            "and through the in-memory index")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file_path",
+            type=str,
+            nargs="?",
+            default="data/ingredients.json",
+            help="JSON file whose names are used to build search prefixes",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of passes over the prefixes",
+        )
+
+    def _prefixes(self, file_path):
+        with open(file_path, "r", encoding="utf-8") as file:
+            names = [item["name"].lower() for item in json.load(file)]
+        prefixes = set()
+        for name in names:
+            for length in (1, 2, 3, 5):
+                prefixes.add(name[:length])
+        return sorted(prefixes)
+
+    def _measure(self, search, prefixes, repeat):
+        found = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for prefix in prefixes:
+                found += len(search(prefix))
+        elapsed = time.perf_counter() - started
+        return elapsed, found
+
+    def handle(self, *args, **options):
+        if not IngredientModel.objects.exists():
+            self.stdout.write(self.style.ERROR(
+                "Ingredient table is empty, run install_ingredients first"
+            ))
+            return
+
+        prefixes = self._prefixes(options["file_path"])
+        repeat = options["repeat"]
+        total = len(prefixes) * repeat
+
+        def orm_search(prefix):
+            return list(
+                IngredientModel.objects
+                .filter(name__istartswith=prefix)
+                .values("id", "name", "measurement_unit")
+            )
+
+        index = IngredientIndex()
+        build_started = time.perf_counter()
+        index.build()
+        build_time = time.perf_counter() - build_started
+
+        orm_time, orm_found = self._measure(orm_search, prefixes, repeat)
+        index_time, index_found = self._measure(index.search, prefixes, repeat)
+
+        self.stdout.write(f"Prefixes: {len(prefixes)}, lookups: {total}")
+        self.stdout.write(f"Index build: {build_time * 1000:.1f} ms")
+        self.stdout.write(
+            f"ORM:   {orm_time * 1000:.1f} ms total, "
+            f"{orm_time / total * 1e6:.1f} us/lookup, {orm_found} rows"
+        )
+        self.stdout.write(
+            f"Index: {index_time * 1000:.1f} ms total, "
+            f"{index_time / total * 1e6:.1f} us/lookup, {index_found} rows"
+        )
+        if index_time:
+            self.stdout.write(self.style.SUCCESS(
+                f"Speedup: x{orm_time / index_time:.1f}"
+            ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_variants, mark_variants_ready
+from recipes.signals.images import IMAGE_FIELDS, IMAGE_VARIANTS_READY
+
+
+class Command(BaseCommand):
+    help = ("Generate size variants for recipe images and avatars "
+            "that do not have them yet")
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for model, field_name in IMAGE_FIELDS.items():
+            field = model._meta.get_field(field_name)
+            rows = (
+                model.objects
+                .filter(**{field.variants_field: False})
+                .exclude(**{f"{field_name}__isnull": True})
+                .exclude(**{field_name: ""})
+                .values_list("pk", field_name)
+            )
+            for pk, name in rows.iterator():
+                if not generate_variants(field.storage, name):
+                    failed += 1
+                    continue
+                if mark_variants_ready(model, pk, field_name, name):
+                    IMAGE_VARIANTS_READY[model](pk)
+                generated += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated variants for {generated} images, {failed} failed"
+        ))
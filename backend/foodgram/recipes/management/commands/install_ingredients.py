@@ -1,54 +1,212 @@
+import csv
 import json
+import time
+from itertools import islice
+from pathlib import Path
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from recipes.ingredient_index import ingredient_index
 from recipes.models import IngredientModel
 
+READ_CHUNK_SIZE = 64 * 1024
+JSON_WHITESPACE = " \t\r\n"
+# Символы, которыми может продолжаться число: 1 из "1." — ещё не значение
+JSON_NUMBER_TAIL = frozenset("0123456789.eE+-")
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """Лениво читает элементы JSON-массива верхнего уровня из файла"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    expecting = "["
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+            pos += 1
+
+        if pos == len(buffer) or expecting == "more":
+            if eof:
+                raise json.JSONDecodeError(
+                    "Unexpected end of data", buffer, pos
+                )
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            if expecting == "more":
+                expecting = "value"
+            continue
+
+        char = buffer[pos]
+        if expecting == "[":
+            if char != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            pos += 1
+            expecting = "value_or_end"
+        elif expecting == "separator":
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", buffer, pos
+                )
+            pos += 1
+            expecting = "value"
+        elif char == "]" and expecting == "value_or_end":
+            return
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                expecting = "more"
+                continue
+            if not eof and (
+                end == len(buffer) or buffer[end] in JSON_NUMBER_TAIL
+            ):
+                # Значение могло оборваться на границе блока
+                expecting = "more"
+                continue
+            yield item
+            pos = end
+            expecting = "separator"
+
+
+def iter_json_ingredients(file):
+    for item in iter_json_array(file):
+        yield item["name"], item["measurement_unit"]
+
+
+def iter_csv_ingredients(file):
+    for row in csv.reader(file):
+        if len(row) < 2:
+            continue
+        if row[0].strip().lower() == "name":
+            continue
+        yield row[0], row[1]
+
+
+READERS = {
+    "json": iter_json_ingredients,
+    "csv": iter_csv_ingredients,
+}
+
 
 class Command(BaseCommand):
-    help = "Import ingredients from a JSON file"
+    help = "Import ingredients from a JSON or CSV file"
 
     def add_arguments(self, parser):
-        parser.add_argument("file_path", type=str, help="JSON file path")
+        parser.add_argument(
+            "file_path", type=str, help="JSON or CSV file path"
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="File format, detected from the extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of ingredients written per database round trip",
+        )
 
-    def handle(self, *args, **options):
-        file_path = options["file_path"]
+    def _import_batch(self, batch):
+        """Вставляет новые и обновляет изменённые ингредиенты пакета"""
+        units = {}
+        for name, unit in batch:
+            units[name.strip().lower()] = unit.strip().lower()
+        skipped = len(batch) - len(units)
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-
-            with transaction.atomic():
-                ingredients = [
-                    IngredientModel(
-                        name=item["name"].lower(),
-                        measurement_unit=item["measurement_unit"].lower(),
-                    )
-                    for item in data
-                ]
+        existing = dict(
+            IngredientModel.objects
+            .filter(name__in=units)
+            .values_list("name", "measurement_unit")
+        )
+        new = [
+            IngredientModel(name=name, measurement_unit=unit)
+            for name, unit in units.items()
+            if name not in existing
+        ]
+        changed = [
+            IngredientModel(name=name, measurement_unit=unit)
+            for name, unit in units.items()
+            if name in existing and existing[name] != unit
+        ]
+        skipped += len(units) - len(new) - len(changed)
 
-                IngredientModel.objects.bulk_create(
-                    ingredients,
-                    ignore_conflicts=True,
-                )
+        with transaction.atomic():
+            IngredientModel.objects.bulk_create(new, ignore_conflicts=True)
+            IngredientModel.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=["measurement_unit"],
+            )
+        return len(new), len(changed), skipped
+
+    def handle(self, *args, **options):
+        file_path = options["file_path"]
+        batch_size = options["batch_size"]
+        file_format = (
+            options["format"] or Path(file_path).suffix.lstrip(".").lower()
+        )
 
-            total_amount_ingredients = len(ingredients)
+        if file_format not in READERS:
             self.stdout.write(
-                self.style.SUCCESS(
-                    f"✅ Loaded {total_amount_ingredients} ingredients successfully"
+                self.style.ERROR(
+                    f"Unsupported file format: {file_format or '?'}"
                 )
             )
+            return
+        if batch_size < 1:
+            self.stdout.write(self.style.ERROR("Batch size must be positive"))
+            return
+
+        inserted = updated = skipped = 0
+        started = time.perf_counter()
+        try:
+            with open(file_path, "r", encoding="utf-8", newline="") as file:
+                rows = READERS[file_format](file)
+                while batch := list(islice(rows, batch_size)):
+                    batch_inserted, batch_updated, batch_skipped = (
+                        self._import_batch(batch)
+                    )
+                    inserted += batch_inserted
+                    updated += batch_updated
+                    skipped += batch_skipped
 
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f"Oops! We couldn’t find {file_path}"))
+            return
         except json.JSONDecodeError:
             self.stdout.write(
                 self.style
                 .ERROR(f"We couldn't read {file_path} - "
                        f"it's not in the correct JSON format.")
             )
+            return
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"Error loading ingredients: {str(e)}")
             )
+            return
+        finally:
+            if inserted or updated:
+                # bulk_create не отправляет сигналы, поэтому сбрасываем
+                # индекс явно
+                ingredient_index.invalidate()
+
+        elapsed = time.perf_counter() - started
+        processed = inserted + updated + skipped
+        throughput = processed / elapsed if elapsed else processed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Loaded ingredients: {inserted} inserted, "
+                f"{updated} updated, "
+                f"{skipped} skipped ({processed} rows in {elapsed:.2f} s, "
+                f"{throughput:.0f} rows/s)"
+            )
+        )
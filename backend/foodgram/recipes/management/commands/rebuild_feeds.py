@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = "Rebuild subscription feeds from subscriptions and recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="user_ids",
+            help="Rebuild only the feed of this user id (repeatable)",
+        )
+        parser.add_argument(
+            "--per-author", type=int, default=None,
+            help="Keep only the latest N recipes of every followed author",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_feeds(options["user_ids"], options["per_author"])
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Created {total} feed entries")
+        )
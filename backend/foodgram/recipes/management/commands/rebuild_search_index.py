@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of all recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default", help="Database alias to rebuild"
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options["database"])
+        with transaction.atomic(using=options["database"]):
+            backend.create_index()
+            total = backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Indexed {total} recipes for full-text search"
+            )
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = "Recalculate denormalized recipe and user counters"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes, users = recount_all()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Recounted {recipes} recipes and {users} users"
+            )
+        )
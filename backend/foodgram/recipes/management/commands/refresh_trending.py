@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+from recipes.versions import bump_recipe_versions
+
+
+class Command(BaseCommand):
+    help = ("Add favorites and cart additions since the previous run "
+            "to the precomputed trending scores")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Recompute all scores from events within TRENDING_WINDOW",
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_trending(full=options["full"])
+        if updated:
+            # Закэшированные списки рецептов могли быть отсортированы по оценке
+            bump_recipe_versions()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Updated trending scores of {updated} recipes"
+            )
+        )
@@ -0,0 +1,281 @@
+import io
+import random
+import time
+from bisect import bisect_left
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.counters import recount_all
+from recipes.images import generate_variants
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (
+    FavoriteRecipeModel,
+    IngredientModel,
+    RecipeIngredientModel,
+    RecipeModel,
+    ShoppingCart,
+    SubscriptionModel,
+    UserModel,
+)
+from recipes.search import get_search_backend
+from recipes.versions import bump_recipe_versions
+
+ADJECTIVES = (
+    "Домашний", "Быстрый", "Пряный", "Летний", "Сытный", "Лёгкий",
+    "Праздничный", "Деревенский", "Томлёный", "Запечённый",
+)
+# Избранное и корзина заполняются событиями за этот период
+EVENTS_PERIOD = timedelta(days=30)
+DISHES = ("суп", "салат", "пирог", "рагу", "омлет", "плов", "соус", "гратен")
+
+
+class ZipfSampler:
+    """
+    Выбор элементов с вероятностью, обратно пропорциональной рангу в
+    степени exponent: немногие элементы популярны, остальные — хвост.
+    """
+
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / (rank ** exponent) for rank in range(1, len(self.items) + 1)
+        ))
+
+    def sample(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect_left(self.cum_weights, point)]
+
+    def sample_unique(self, count):
+        """До count различных элементов, не больше размера выборки"""
+        count = min(count, len(self.items))
+        chosen = {}
+        # Ограничение попыток защищает от долгого добора хвоста при большой s
+        for _ in range(count * 20):
+            if len(chosen) == count:
+                break
+            item = self.sample()
+            chosen[item] = None
+        return list(chosen)
+
+
+class Command(BaseCommand):
+    help = ("Generate users, subscriptions, recipes, favorites and cart items "
+            "with Zipf-like popularity for performance measurements")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8,
+            help="Average number of ingredients per recipe",
+        )
+        parser.add_argument("--subscriptions-per-user", type=int, default=10)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--cart-per-user", type=int, default=5)
+        parser.add_argument(
+            "--zipf", type=float, default=1.1,
+            help="Popularity skew exponent, 0 gives a uniform distribution",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--seed", type=int, default=42,
+            help="Random seed; equal seeds give identical data sets",
+        )
+        parser.add_argument(
+            "--prefix", default="bench",
+            help="Username prefix of generated users",
+        )
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete previously generated users and their data first",
+        )
+
+    def _bulk_create(self, model, objects, batch_size, **kwargs):
+        created = 0
+        for start in range(0, len(objects), batch_size):
+            batch = objects[start:start + batch_size]
+            model.objects.bulk_create(batch, batch_size=batch_size, **kwargs)
+            created += len(batch)
+        return created
+
+    def _placeholder_image(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), (214, 160, 96)).save(buffer, "JPEG")
+        recipe_image = RecipeModel._meta.get_field("image")
+        storage = recipe_image.storage
+        name = storage.save(
+            recipe_image.generate_filename(None, "benchmark.jpg"),
+            ContentFile(buffer.getvalue()),
+        )
+        generate_variants(storage, name)
+        return name
+
+    def _create_users(self, options):
+        prefix = options["prefix"]
+        password = make_password(f"{prefix}-password")
+        users = [
+            UserModel(
+                username=f"{prefix}_{index}",
+                email=f"{prefix}_{index}@example.com",
+                first_name="Bench",
+                last_name=f"User {index}",
+                password=password,
+            )
+            for index in range(options["users"])
+        ]
+        self._bulk_create(UserModel, users, options["batch_size"])
+        return list(
+            UserModel.objects
+            .filter(username__startswith=f"{prefix}_")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def _create_recipes(self, options, rng, author_ids, ingredients):
+        authors = ZipfSampler(author_ids, options["zipf"], rng)
+        ingredient_sampler = ZipfSampler(
+            [pk for pk, _ in ingredients], options["zipf"], rng
+        )
+        names = dict(ingredients)
+        image = self._placeholder_image()
+        average = options["ingredients_per_recipe"]
+        batch_size = options["batch_size"]
+
+        recipe_count = rows = 0
+        for start in range(0, options["recipes"], batch_size):
+            size = min(batch_size, options["recipes"] - start)
+            compositions = [
+                ingredient_sampler.sample_unique(
+                    max(1, int(rng.gauss(average, average / 3)))
+                )
+                for _ in range(size)
+            ]
+            recipes = RecipeModel.objects.bulk_create([
+                RecipeModel(
+                    author_id=authors.sample(),
+                    name=(f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} "
+                          f"{names[composition[0]].split()[0]}")[:256],
+                    text=", ".join(names[pk] for pk in composition),
+                    cooking_time=max(1, int(rng.lognormvariate(3.2, 0.6))),
+                    image=image,
+                    image_variants_ready=True,
+                )
+                for composition in compositions
+            ])
+            recipe_ingredients = [
+                RecipeIngredientModel(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe, composition in zip(recipes, compositions)
+                for ingredient_id in composition
+            ]
+            rows += self._bulk_create(
+                RecipeIngredientModel, recipe_ingredients, batch_size
+            )
+            recipe_count += len(recipes)
+        return recipe_count, rows
+
+    def _create_relations(self, model, rng, user_ids, target_ids, per_user,
+                          target_field, zipf, batch_size):
+        """Связи пользователей с популярными объектами, без связей с собой"""
+        if not target_ids or per_user <= 0:
+            return 0
+        sampler = ZipfSampler(target_ids, zipf, rng)
+        timestamped = any(
+            field.name == "created_at" for field in model._meta.fields
+        )
+        now = timezone.now()
+        objects = []
+        for user_id in user_ids:
+            count = rng.randint(0, per_user * 2)
+            for target_id in sampler.sample_unique(count):
+                if target_field == "author_id" and target_id == user_id:
+                    continue
+                relation = model(user_id=user_id, **{target_field: target_id})
+                if timestamped:
+                    relation.created_at = now - rng.random() * EVENTS_PERIOD
+                objects.append(relation)
+        return self._bulk_create(
+            model, objects, batch_size, ignore_conflicts=True
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        ingredients = list(
+            IngredientModel.objects.order_by("pk").values_list("pk", "name")
+        )
+        if not ingredients:
+            raise CommandError(
+                "Ingredient table is empty, run install_ingredients first"
+            )
+        # Популярность ингредиента не должна совпадать с порядком в справочнике
+        rng.shuffle(ingredients)
+
+        if options["clear"]:
+            deleted, _ = UserModel.objects.filter(
+                username__startswith=f"{options['prefix']}_"
+            ).delete()
+            self.stdout.write(f"Deleted objects: {deleted}")
+        elif UserModel.objects.filter(
+            username__startswith=f"{options['prefix']}_"
+        ).exists():
+            raise CommandError(
+                f"Users with prefix {options['prefix']!r} already exist, "
+                f"use --clear or another --prefix"
+            )
+
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            user_ids = self._create_users(options)
+            recipe_count, rows = self._create_recipes(
+                options, rng, user_ids, ingredients
+            )
+            recipe_ids = list(
+                RecipeModel.objects
+                .filter(author_id__in=user_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            # Популярность рецепта не зависит от порядка создания
+            rng.shuffle(recipe_ids)
+            subscriptions = self._create_relations(
+                SubscriptionModel, rng, user_ids, user_ids,
+                options["subscriptions_per_user"], "author_id",
+                options["zipf"], batch_size,
+            )
+            favorites = self._create_relations(
+                FavoriteRecipeModel, rng, user_ids, recipe_ids,
+                options["favorites_per_user"], "recipe_id",
+                options["zipf"], batch_size,
+            )
+            carts = self._create_relations(
+                ShoppingCart, rng, user_ids, recipe_ids,
+                options["cart_per_user"], "recipe_id",
+                options["zipf"], batch_size,
+            )
+
+        # bulk_create не отправляет сигналы: пересчитываем производные данные
+        recount_all()
+        get_search_backend().rebuild()
+        ingredient_index.invalidate()
+        bump_recipe_versions()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Users: {len(user_ids)}, recipes: {recipe_count}, "
+            f"recipe ingredients: {rows}, subscriptions: {subscriptions}, "
+            f"favorites: {favorites}, cart items: {carts}"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f} s"))
@@ -1,14 +1,26 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.core.validators import MinValueValidator, RegexValidator
 
+from .fields import VariantImageField
+
 
 class UserModel(AbstractUser):
     """Пользовательская модель пользователя"""
 
     first_name = models.CharField("First Name", max_length=150)
     last_name = models.CharField("Last Name", max_length=150)
-    avatar = models.ImageField("Avatar", upload_to="avatars/", blank=True, null=True)
+    avatar = VariantImageField(
+        "Avatar",
+        upload_to="avatars/",
+        blank=True,
+        null=True,
+        variants_field="avatar_variants_ready",
+    )
+    avatar_variants_ready = models.BooleanField(
+        "Avatar variants ready", default=False, editable=False
+    )
     email = models.EmailField("Email", unique=True, max_length=254)
     username = models.CharField(
         "Username",
@@ -23,13 +35,28 @@ class UserModel(AbstractUser):
         ],
     )
 
+    recipes_count = models.PositiveIntegerField(
+        "Recipes count", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Followers count", default=0, editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        "Following count", default=0, editable=False
+    )
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
     class Meta:
         verbose_name = "user"
         verbose_name_plural = "users"
-        ordering = ["username"]
+        ordering = ["username", "id"]
+        indexes = [
+            models.Index(
+                fields=["username", "id"], name="user_username_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.email
@@ -101,14 +128,33 @@ class RecipeModel(models.Model):
         verbose_name="Ingredients",
     )
     cooking_time = models.PositiveIntegerField(
-        "Cooking time (minutes)", validators=[MinValueValidator(1)]
+        "Cooking time (minutes)",
+        validators=[MinValueValidator(1)],
+        db_index=True,
+    )
+    image = VariantImageField(
+        "Image", upload_to="recipes/", variants_field="image_variants_ready"
+    )
+    image_variants_ready = models.BooleanField(
+        "Image variants ready", default=False, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        "Favorites count", default=0, editable=False
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        "In shopping carts count", default=0, editable=False
+    )
+    updated_at = models.DateTimeField(
+        "Updated at", auto_now=True, db_index=True
     )
-    image = models.ImageField("Image", upload_to="recipes/")
 
     class Meta:
         verbose_name = "recipe"
         verbose_name_plural = "recipes"
-        ordering = ("name",)
+        ordering = ("name", "id")
+        indexes = [
+            models.Index(fields=["name", "id"], name="recipe_name_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -140,6 +186,46 @@ class RecipeIngredientModel(models.Model):
         return f"{self.ingredient} - {self.amount} {self.ingredient.measurement_unit}"
 
 
+class FeedEntryModel(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан пользователь.
+    Лента читается по уникальному индексу (user, recipe) в порядке убывания
+    id рецепта, то есть от новых рецептов к старым.
+    """
+
+    user = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Reader",
+    )
+    recipe = models.ForeignKey(
+        RecipeModel,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Recipe",
+    )
+    author = models.ForeignKey(
+        UserModel,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Author",
+    )
+
+    class Meta:
+        verbose_name = "feed entry"
+        verbose_name_plural = "feed entries"
+        ordering = ("user", "-recipe")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_feed_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} for {self.user}"
+
+
 class RecipeUserRelationModel(models.Model):
     """Абстрактная модель отношений пользователя с рецептом"""
 
@@ -155,6 +241,9 @@ class RecipeUserRelationModel(models.Model):
         related_name="%(class)s_relations",
         verbose_name="Recipe",
     )
+    created_at = models.DateTimeField(
+        "Created at", default=timezone.now, editable=False, db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -170,7 +259,7 @@ class RecipeUserRelationModel(models.Model):
 class FavoriteRecipeModel(RecipeUserRelationModel):
     """Любимые рецепты пользователя"""
 
-    class Meta:
+    class Meta(RecipeUserRelationModel.Meta):
         verbose_name = "favorite recipe"
         verbose_name_plural = "favorite recipes"
 
@@ -178,6 +267,67 @@ class FavoriteRecipeModel(RecipeUserRelationModel):
 class ShoppingCart(RecipeUserRelationModel):
     """Элементы корзины пользователя"""
 
-    class Meta:
+    class Meta(RecipeUserRelationModel.Meta):
         verbose_name = "shopping cart item"
         verbose_name_plural = "shopping cart items"
+
+
+class TrendingScoreModel(models.Model):
+    """
+    Предрассчитанная популярность рецепта с экспоненциальным затуханием.
+    score хранится приведённым к моменту TrendingStateModel.epoch, поэтому
+    порядок рецептов по score совпадает с порядком по текущей популярности.
+    """
+
+    recipe = models.OneToOneField(
+        RecipeModel,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending",
+        verbose_name="Recipe",
+    )
+    score = models.FloatField("Score")
+
+    class Meta:
+        verbose_name = "trending score"
+        verbose_name_plural = "trending scores"
+        indexes = [
+            models.Index(
+                fields=["-score", "recipe"], name="trending_score_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe}: {self.score:.3f}"
+
+
+class TrendingStateModel(models.Model):
+    """Состояние пересчёта популярности: точка отсчёта и учтённые события"""
+
+    epoch = models.DateTimeField("Score epoch")
+    watermark = models.DateTimeField("Events processed until", null=True)
+
+    class Meta:
+        verbose_name = "trending state"
+        verbose_name_plural = "trending state"
+
+    def __str__(self):
+        return f"epoch {self.epoch:%Y-%m-%d %H:%M}, watermark {self.watermark}"
+
+
+class DataVersionModel(models.Model):
+    """
+    Версия данных (время последнего изменения в наносекундах) для ETag и
+    ключей кэша ответов. Хранится в БД, поэтому изменение в любом процессе
+    или команде сразу видно всем воркерам.
+    """
+
+    key = models.CharField("Key", max_length=64, primary_key=True)
+    version = models.BigIntegerField("Version")
+
+    class Meta:
+        verbose_name = "data version"
+        verbose_name_plural = "data versions"
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import RecipeIngredientModel, RecipeModel
+
+# Запас по времени при догрузке изменений: транзакция могла зафиксироваться
+# позже, чем был выставлен updated_at рецепта
+SYNC_GRACE_PERIOD = timedelta(seconds=5)
+EMPTY_POSTING = array("q")
+
+
+class RecipeIngredientIndex:
+    """
+    Инвертированный индекс «ингредиент -> рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится компактный массив id рецептов, для
+    каждого рецепта — кортеж id его ингредиентов. Пересечения множеств и
+    подсчёт доли имеющихся ингредиентов выполняются без запросов к БД.
+
+    Индекс обновляется точечно после сохранения рецептов в этом процессе,
+    раз в RECIPE_INDEX_SYNC_INTERVAL секунд догружает рецепты, изменённые
+    другими процессами (по updated_at), и полностью перестраивается раз в
+    RECIPE_INDEX_TTL секунд, чтобы забыть рецепты, удалённые в других
+    процессах.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = None
+        self._recipes = {}
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._watermark = None
+
+    def build(self):
+        started = timezone.now()
+        postings = defaultdict(lambda: array("q"))
+        recipes = defaultdict(list)
+        rows = (RecipeIngredientModel.objects
+                .order_by()
+                .values_list("recipe_id", "ingredient_id")
+                .iterator(chunk_size=10000))
+        for recipe_id, ingredient_id in rows:
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+
+        with self._lock:
+            self._postings = dict(postings)
+            self._recipes = {
+                recipe_id: tuple(ingredient_ids)
+                for recipe_id, ingredient_ids in recipes.items()
+            }
+            self._built_at = self._synced_at = time.monotonic()
+            self._watermark = started
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            posting = self._postings.get(ingredient_id)
+            if posting is not None:
+                try:
+                    posting.remove(recipe_id)
+                except ValueError:
+                    pass
+
+    def refresh_recipes(self, recipe_ids):
+        """Перечитывает из БД ингредиенты указанных рецептов"""
+        if self._postings is None or not recipe_ids:
+            return
+        ingredients = defaultdict(list)
+        rows = (RecipeIngredientModel.objects
+                .filter(recipe_id__in=recipe_ids)
+                .order_by()
+                .values_list("recipe_id", "ingredient_id"))
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].append(ingredient_id)
+
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+            for recipe_id, ingredient_ids in ingredients.items():
+                self._recipes[recipe_id] = tuple(ingredient_ids)
+                for ingredient_id in ingredient_ids:
+                    posting = self._postings.setdefault(
+                        ingredient_id, array("q")
+                    )
+                    posting.append(recipe_id)
+
+    def remove_recipes(self, recipe_ids):
+        if self._postings is None:
+            return
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+
+    def _sync(self):
+        now = time.monotonic()
+        if (
+            self._postings is None
+            or now - self._built_at > settings.RECIPE_INDEX_TTL
+        ):
+            self.build()
+            return
+        if now - self._synced_at < settings.RECIPE_INDEX_SYNC_INTERVAL:
+            return
+
+        watermark = timezone.now()
+        changed = list(
+            RecipeModel.objects
+            .filter(updated_at__gte=self._watermark - SYNC_GRACE_PERIOD)
+            .values_list("pk", flat=True)
+        )
+        self.refresh_recipes(changed)
+        with self._lock:
+            self._synced_at = now
+            self._watermark = watermark
+
+    def matching(self, include=(), exclude=()):
+        """
+        Возвращает id рецептов, содержащих все ингредиенты include (None,
+        если include пуст), и id рецептов хотя бы с одним из exclude.
+        """
+        self._sync()
+        with self._lock:
+            included = None
+            if include:
+                postings = sorted(
+                    (self._postings.get(ingredient_id, EMPTY_POSTING)
+                     for ingredient_id in set(include)),
+                    key=len,
+                )
+                included = set(postings[0])
+                for posting in postings[1:]:
+                    if not included:
+                        break
+                    included.intersection_update(posting)
+
+            excluded = set()
+            for ingredient_id in set(exclude):
+                excluded.update(
+                    self._postings.get(ingredient_id, EMPTY_POSTING)
+                )
+        return included, excluded
+
+    def coverage(self, pantry):
+        """
+        Ранжирует рецепты по доле их ингредиентов, имеющихся в pantry:
+        по убыванию доли, затем числа совпавших ингредиентов, затем по id.
+        """
+        self._sync()
+        counts = Counter()
+        buckets = defaultdict(list)
+        with self._lock:
+            for ingredient_id in set(pantry):
+                counts.update(self._postings.get(ingredient_id, EMPTY_POSTING))
+            for recipe_id, count in counts.items():
+                ingredient_ids = self._recipes.get(recipe_id)
+                if ingredient_ids:
+                    buckets[count, len(ingredient_ids)].append(recipe_id)
+        # Различных долей немного, поэтому сортируются группы, а не рецепты
+        ranked = sorted(
+            buckets.items(),
+            key=lambda bucket: (-bucket[0][0] / bucket[0][1], -bucket[0][0]),
+        )
+        return PantryRanking(
+            [
+                (count / size, sorted(recipe_ids))
+                for (count, size), recipe_ids in ranked
+            ]
+        )
+
+
+class PantryRanking:
+    """
+    Упорядоченный список пар (id рецепта, доля) для пагинации.
+    Пары создаются только для запрошенного среза.
+    """
+
+    def __init__(self, buckets):
+        self._recipe_ids = []
+        self._bounds = []
+        self._shares = []
+        for share, recipe_ids in buckets:
+            self._recipe_ids.extend(recipe_ids)
+            self._bounds.append(len(self._recipe_ids))
+            self._shares.append(share)
+
+    def __len__(self):
+        return len(self._recipe_ids)
+
+    def _share(self, position):
+        return self._shares[bisect_right(self._bounds, position)]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            return [(self._recipe_ids[i], self._share(i)) for i in positions]
+        if index < 0:
+            index += len(self)
+        return self._recipe_ids[index], self._share(index)
+
+
+def id_set(ids, using):
+    """
+    Подзапрос с id из ids для фильтра pk__in. Набор передаётся одним
+    параметром (JSON для SQLite, массив для PostgreSQL), поэтому длинный
+    список не упирается в лимит параметров запроса.
+    """
+    ids = sorted(ids)
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        return RawSQL("SELECT value FROM json_each(%s)", [json.dumps(ids)])
+    if vendor == "postgresql":
+        return RawSQL("SELECT unnest(%s::bigint[])", [ids])
+    return ids
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
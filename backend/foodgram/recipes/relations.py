@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .counters import change_counters
+from .models import RecipeModel
+from .signals.counters import COUNTERS
+from .versions import bump_viewer_version
+
+CREATED = "created"
+EXISTS = "exists"
+DELETED = "deleted"
+NOT_FOUND = "not_found"
+
+
+def _change_counters(relation_model, recipe_ids, delta):
+    for model, _, counter_field in COUNTERS[relation_model]:
+        change_counters(model, recipe_ids, counter_field, delta)
+
+
+def add_recipes(relation_model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину пользователя.
+
+    Одним запросом проверяет существование рецептов и уже имеющиеся связи,
+    вторым вставляет недостающие. bulk_create не отправляет сигналы,
+    поэтому счётчики и версия пользователя обновляются здесь же — только
+    для строк, которые действительно вставил этот вызов.
+    Возвращает словарь id рецепта -> статус.
+    """
+    related = relation_model.objects.filter(user=user, recipe=OuterRef("pk"))
+    found = dict(
+        RecipeModel.objects
+        .filter(pk__in=recipe_ids)
+        .order_by()
+        .values_list("pk", Exists(related))
+    )
+    new_ids = [pk for pk in recipe_ids if found.get(pk) is False]
+
+    created = set()
+    if new_ids:
+        # Общая метка времени отличает строки этого вызова от строк, которые
+        # параллельный запрос вставил между проверкой и вставкой
+        created_at = timezone.now()
+        with transaction.atomic():
+            relation_model.objects.bulk_create(
+                [
+                    relation_model(
+                        user=user, recipe_id=pk, created_at=created_at
+                    )
+                    for pk in new_ids
+                ],
+                ignore_conflicts=True,
+            )
+            created = set(
+                relation_model.objects
+                .filter(
+                    user=user, recipe_id__in=new_ids, created_at=created_at
+                )
+                .values_list("recipe_id", flat=True)
+            )
+            _change_counters(relation_model, created, 1)
+            if created:
+                transaction.on_commit(lambda: bump_viewer_version(user.pk))
+
+    return {
+        pk: (
+            NOT_FOUND if pk not in found
+            else CREATED if pk in created
+            else EXISTS
+        )
+        for pk in recipe_ids
+    }
+
+
+def remove_recipes(relation_model, user, recipe_ids):
+    """
+    Убирает рецепты из избранного или корзины пользователя.
+
+    Связи блокируются до конца транзакции, поэтому параллельный запрос не
+    удалит их второй раз. delete() удаляет их одним DELETE, а счётчики и
+    версию пользователя обновляют сигналы удалённых строк.
+    Возвращает словарь id рецепта -> статус.
+    """
+    relations = relation_model.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    )
+
+    with transaction.atomic():
+        present = set(
+            relations.select_for_update().values_list("recipe_id", flat=True)
+        )
+        if present:
+            relations.filter(recipe_id__in=present).delete()
+
+    return {pk: DELETED if pk in present else NOT_FOUND for pk in recipe_ids}
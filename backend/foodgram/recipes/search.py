@@ -0,0 +1,212 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import IngredientModel, RecipeIngredientModel, RecipeModel
+
+SEARCH_TABLE = "recipes_recipe_search"
+WORD_RE = re.compile(r"\w+")
+
+
+class BaseSearchBackend:
+    """Полнотекстовый поиск рецептов по названию, описанию и ингредиентам"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def tables(self):
+        return {
+            "recipe": RecipeModel._meta.db_table,
+            "recipe_ingredient": RecipeIngredientModel._meta.db_table,
+            "ingredient": IngredientModel._meta.db_table,
+            "search": SEARCH_TABLE,
+        }
+
+    def create_index(self):
+        """Создаёт структуры поиска, если их ещё нет"""
+
+    def update_documents(self, recipe_ids):
+        """Пересчитывает поисковые документы указанных рецептов"""
+
+    def delete_documents(self, recipe_ids):
+        """Удаляет поисковые документы указанных рецептов"""
+
+    def rebuild(self):
+        """Пересчитывает поисковые документы всех рецептов"""
+        ids = list(RecipeModel.objects.values_list("pk", flat=True))
+        self.delete_documents(ids)
+        self.update_documents(ids)
+        return len(ids)
+
+    def search(self, queryset, query):
+        """Оставляет найденные рецепты, отсортированные по релевантности"""
+        words = WORD_RE.findall(query)
+        if not words:
+            return queryset
+        condition = Q()
+        for word in words:
+            condition &= (Q(name__icontains=word)
+                          | Q(text__icontains=word)
+                          | Q(ingredients__name__icontains=word))
+        return queryset.filter(condition).distinct()
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Хранимый tsvector с GIN-индексом"""
+
+    @property
+    def config(self):
+        return settings.RECIPE_SEARCH_CONFIG
+
+    def create_index(self):
+        tables = self.tables()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {tables['search']} ("
+                f"recipe_id bigint PRIMARY KEY "
+                f"REFERENCES {tables['recipe']} (id) ON DELETE CASCADE, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {tables['search']}_document_idx "
+                f"ON {tables['search']} USING GIN (document)"
+            )
+
+    def update_documents(self, recipe_ids):
+        if not recipe_ids:
+            return
+        tables = self.tables()
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tables['search']} (recipe_id, document) "
+                f"SELECT r.id, "
+                f"setweight(to_tsvector(%s, r.name), 'A') || "
+                f"setweight(to_tsvector(%s, r.text), 'B') || "
+                f"setweight(to_tsvector("
+                f"%s, coalesce(string_agg(i.name, ' '), '')), 'C') "
+                f"FROM {tables['recipe']} r "
+                f"LEFT JOIN {tables['recipe_ingredient']} ri "
+                f"ON ri.recipe_id = r.id "
+                f"LEFT JOIN {tables['ingredient']} i "
+                f"ON i.id = ri.ingredient_id "
+                f"WHERE r.id = ANY(%s) GROUP BY r.id "
+                f"ON CONFLICT (recipe_id) "
+                f"DO UPDATE SET document = EXCLUDED.document",
+                [self.config, self.config, self.config, list(recipe_ids)],
+            )
+
+    def delete_documents(self, recipe_ids):
+        if not recipe_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE recipe_id = ANY(%s)",
+                [list(recipe_ids)],
+            )
+
+    def search(self, queryset, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return queryset
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        recipe_table = self.tables()["recipe"]
+        rank = RawSQL(
+            f"SELECT ts_rank(s.document, to_tsquery(%s, %s)) "
+            f"FROM {SEARCH_TABLE} s "
+            f"WHERE s.recipe_id = {recipe_table}.id",
+            [self.config, tsquery],
+            output_field=FloatField(),
+        )
+        matches = RawSQL(
+            f"SELECT recipe_id FROM {SEARCH_TABLE} "
+            f"WHERE document @@ to_tsquery(%s, %s)",
+            [self.config, tsquery],
+        )
+        return (queryset
+                .filter(pk__in=matches)
+                .annotate(search_rank=rank)
+                .order_by("-search_rank", "id"))
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """Виртуальная таблица FTS5, строки которой совпадают с id рецептов"""
+
+    # Веса столбцов name, text, ingredients для bm25
+    weights = (10.0, 3.0, 1.0)
+
+    def create_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(name, text, ingredients, "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def update_documents(self, recipe_ids):
+        if not recipe_ids:
+            return
+        tables = self.tables()
+        recipe_ids = list(recipe_ids)
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        self.delete_documents(recipe_ids)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, name, text, ingredients) "
+                f"SELECT r.id, r.name, r.text, "
+                f"coalesce(group_concat(i.name, ' '), '') "
+                f"FROM {tables['recipe']} r "
+                f"LEFT JOIN {tables['recipe_ingredient']} ri "
+                f"ON ri.recipe_id = r.id "
+                f"LEFT JOIN {tables['ingredient']} i "
+                f"ON i.id = ri.ingredient_id "
+                f"WHERE r.id IN ({placeholders}) GROUP BY r.id",
+                recipe_ids,
+            )
+
+    def delete_documents(self, recipe_ids):
+        if not recipe_ids:
+            return
+        recipe_ids = list(recipe_ids)
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+                recipe_ids,
+            )
+
+    def search(self, queryset, query):
+        words = WORD_RE.findall(query)
+        if not words:
+            return queryset
+        # Каждое слово в кавычках — как префикс, без операторов FTS5 из ввода
+        match = " ".join(f'"{word}"*' for word in words)
+        recipe_table = self.tables()["recipe"]
+        weights = ", ".join(str(weight) for weight in self.weights)
+        rank = RawSQL(
+            f"SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {recipe_table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        matches = RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [match],
+        )
+        return (queryset
+                .filter(pk__in=matches)
+                .annotate(search_rank=rank)
+                .order_by("-search_rank", "id"))
+
+
+BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SqliteSearchBackend,
+}
+
+
+def get_search_backend(using="default"):
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, BaseSearchBackend)(connection)
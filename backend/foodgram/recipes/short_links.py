@@ -0,0 +1,212 @@
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from math import gcd
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import RecipeModel
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+CODE_LENGTH = 7
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+# Ссылки вида /s/<id>/, выданные до появления кодов, продолжают работать
+# для любых id, которые помещаются в bigint
+LEGACY_ID_MAX_LENGTH = 18
+# Насколько id может превышать известный максимум, чтобы его стоило искать
+# в БД: новые рецепты других процессов. Коды-подделки дают случайные id
+# далеко за этой границей и отклоняются без запроса
+NEW_ID_WINDOW = 10_000
+_DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+
+
+@lru_cache(maxsize=None)
+def _permutation():
+    """
+    Множитель, обратный к нему и сдвиг перестановки id -> (id * a + b) mod
+    CODE_SPACE. Выводятся из SECRET_KEY, поэтому коды не угадываются по
+    соседним id, но остаются стабильными между перезапусками.
+    """
+    digest = hashlib.sha256(
+        f"short-links:{settings.SECRET_KEY}".encode()
+    ).digest()
+    multiplier = int.from_bytes(digest[:8], "big") % CODE_SPACE | 1
+    while gcd(multiplier, CODE_SPACE) != 1:
+        multiplier += 2
+    offset = int.from_bytes(digest[8:16], "big") % CODE_SPACE
+    return multiplier, pow(multiplier, -1, CODE_SPACE), offset
+
+
+def encode_recipe_id(recipe_id):
+    """Короткий код рецепта из CODE_LENGTH символов base62"""
+    if not 0 < recipe_id < CODE_SPACE:
+        raise ValueError(f"Recipe id out of short code range: {recipe_id}")
+    multiplier, _, offset = _permutation()
+    value = (recipe_id * multiplier + offset) % CODE_SPACE
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode_short_code(code):
+    """id рецепта по короткому коду; ValueError для неверного кода"""
+    if len(code) != CODE_LENGTH:
+        raise ValueError(f"Invalid short code: {code}")
+    value = 0
+    for char in code:
+        if char not in _DIGITS:
+            raise ValueError(f"Invalid short code: {code}")
+        value = value * len(ALPHABET) + _DIGITS[char]
+    _, inverse, offset = _permutation()
+    recipe_id = (value - offset) * inverse % CODE_SPACE
+    if recipe_id == 0:
+        raise ValueError(f"Invalid short code: {code}")
+    return recipe_id
+
+
+class ShortCodeConverter:
+    """
+    Конвертер пути: код из base62 в id рецептов-кандидатов и id рецепта в
+    код. reverse() с id рецепта сразу даёт ссылку с кодом.
+
+    Старая ссылка с id из CODE_LENGTH цифр неотличима от кода из одних
+    цифр, поэтому для неё кандидатов два: сначала рецепт по коду, затем
+    рецепт с таким id.
+    """
+
+    regex = (
+        f"[0-9a-zA-Z]{{{CODE_LENGTH}}}|[0-9]{{1,{LEGACY_ID_MAX_LENGTH}}}"
+    )
+
+    def to_python(self, value):
+        if len(value) != CODE_LENGTH:
+            return (int(value),)
+        if not value.isdigit():
+            return (decode_short_code(value),)
+        try:
+            return decode_short_code(value), int(value)
+        except ValueError:
+            return (int(value),)
+
+    def to_url(self, value):
+        return encode_recipe_id(int(value))
+
+
+class RecipeIdBitmap:
+    """
+    Битовая карта существующих id рецептов в памяти процесса: бит на id,
+    около 125 КБ на миллион рецептов.
+
+    Рецепты этого процесса отмечаются сразу после фиксации. Рецепты других
+    процессов догружаются по id больше известного максимума раз в
+    SHORT_LINK_SYNC_INTERVAL секунд, а id немногим выше максимума, которых
+    ещё нет в карте, проверяются в БД. Удаления в других процессах
+    учитываются при полной перестройке раз в SHORT_LINK_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bits = None
+        self._max_synced_id = 0
+        self._built_at = 0.0
+        self._synced_at = 0.0
+
+    def _set(self, recipe_id):
+        byte = recipe_id >> 3
+        if byte >= len(self._bits):
+            # Запас при росте, чтобы новые рецепты не копировали карту
+            # каждый раз
+            reserve = len(self._bits) // 4
+            self._bits.extend(bytes(byte - len(self._bits) + 1 + reserve))
+        self._bits[byte] |= 1 << (recipe_id & 7)
+
+    def build(self):
+        recipe_ids = list(
+            RecipeModel.objects.order_by()
+            .values_list("pk", flat=True)
+            .iterator()
+        )
+        max_id = max(recipe_ids, default=0)
+        with self._lock:
+            self._bits = bytearray((max_id >> 3) + 1)
+            for recipe_id in recipe_ids:
+                self._set(recipe_id)
+            self._max_synced_id = max_id
+            self._built_at = self._synced_at = time.monotonic()
+
+    def _sync_new(self):
+        recipe_ids = list(
+            RecipeModel.objects
+            .filter(pk__gt=self._max_synced_id)
+            .order_by()
+            .values_list("pk", flat=True)
+        )
+        with self._lock:
+            for recipe_id in recipe_ids:
+                self._set(recipe_id)
+            self._max_synced_id = max(recipe_ids, default=self._max_synced_id)
+            self._synced_at = time.monotonic()
+
+    def _stale(self):
+        now = time.monotonic()
+        if (self._bits is None
+                or now - self._built_at > settings.SHORT_LINK_INDEX_TTL):
+            return self.build
+        if now - self._synced_at > settings.SHORT_LINK_SYNC_INTERVAL:
+            return self._sync_new
+        return None
+
+    def _lookup(self, recipe_id):
+        """True/False, если ответ известен по карте, иначе None"""
+        with self._lock:
+            byte = recipe_id >> 3
+            if (byte < len(self._bits)
+                    and self._bits[byte] >> (recipe_id & 7) & 1):
+                return True
+            newest = self._max_synced_id + NEW_ID_WINDOW
+            if not self._max_synced_id < recipe_id <= newest:
+                return False
+        return None
+
+    def contains(self, recipe_id):
+        refresh = self._stale()
+        if refresh is not None:
+            refresh()
+        found = self._lookup(recipe_id)
+        if found is None:
+            found = RecipeModel.objects.filter(pk=recipe_id).exists()
+            if found:
+                self.add(recipe_id)
+        return found
+
+    async def acontains(self, recipe_id):
+        refresh = self._stale()
+        if refresh is not None:
+            await sync_to_async(refresh)()
+        found = self._lookup(recipe_id)
+        if found is None:
+            found = await RecipeModel.objects.filter(pk=recipe_id).aexists()
+            if found:
+                self.add(recipe_id)
+        return found
+
+    def add(self, recipe_id):
+        if self._bits is None:
+            return
+        with self._lock:
+            self._set(recipe_id)
+
+    def discard(self, recipe_id):
+        if self._bits is None:
+            return
+        with self._lock:
+            byte = recipe_id >> 3
+            if byte < len(self._bits):
+                self._bits[byte] &= ~(1 << (recipe_id & 7)) & 0xFF
+
+
+recipe_id_bitmap = RecipeIdBitmap()
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+
+from ..counters import change_counter
+from ..models import (
+    FavoriteRecipeModel,
+    RecipeModel,
+    ShoppingCart,
+    SubscriptionModel,
+    UserModel,
+)
+
+# Модель связи -> список (модель счётчика, поле внешнего ключа, поле счётчика)
+COUNTERS = {
+    RecipeModel: [(UserModel, "author_id", "recipes_count")],
+    FavoriteRecipeModel: [(RecipeModel, "recipe_id", "favorites_count")],
+    ShoppingCart: [(RecipeModel, "recipe_id", "shopping_carts_count")],
+    SubscriptionModel: [
+        (UserModel, "author_id", "followers_count"),
+        (UserModel, "user_id", "following_count"),
+    ],
+}
+
+
+def _update_counters(sender, instance, delta):
+    for model, fk_field, counter_field in COUNTERS[sender]:
+        change_counter(
+            model, getattr(instance, fk_field), counter_field, delta
+        )
+
+
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    """Увеличивает счётчики при создании связи"""
+    if created and not raw:
+        _update_counters(sender, instance, 1)
+
+
+def decrement_counters(sender, instance, **kwargs):
+    """Уменьшает счётчики при удалении связи"""
+    _update_counters(sender, instance, -1)
+
+
+for counted_model in COUNTERS:
+    post_save.connect(increment_counters, sender=counted_model)
+    post_delete.connect(decrement_counters, sender=counted_model)
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..feed import backfill_subscription, fan_out_recipe, remove_subscription
+from ..models import RecipeModel, SubscriptionModel
+
+
+@receiver(post_save, sender=RecipeModel)
+def fan_out_to_feeds(sender, instance, created, raw=False, **kwargs):
+    """Рассылает новый рецепт в ленты подписчиков после фиксации"""
+    if not created or raw:
+        return
+    recipe_id, author_id = instance.pk, instance.author_id
+    transaction.on_commit(lambda: fan_out_recipe(recipe_id, author_id))
+
+
+@receiver(post_save, sender=SubscriptionModel)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика"""
+    if created and not raw:
+        backfill_subscription(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=SubscriptionModel)
+def clear_feed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты бывшего подписчика"""
+    remove_subscription(instance.user_id, instance.author_id)
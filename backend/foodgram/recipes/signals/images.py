@@ -0,0 +1,49 @@
+from django.db.models.signals import post_save
+
+from ..images import schedule_variants
+from ..models import RecipeModel, UserModel
+from ..versions import bump_recipe_versions
+
+# Модель -> поле изображения, для которого создаются варианты
+IMAGE_FIELDS = {
+    RecipeModel: "image",
+    UserModel: "avatar",
+}
+
+
+def recipe_image_variants_ready(recipe_id):
+    """Ответы с рецептом ссылались на оригинал изображения"""
+    bump_recipe_versions([recipe_id])
+
+
+def avatar_variants_ready(user_id):
+    """Ответы с рецептами автора ссылались на оригинал аватара"""
+    recipe_ids = list(
+        RecipeModel.objects
+        .filter(author_id=user_id)
+        .values_list("pk", flat=True)
+    )
+    if recipe_ids:
+        bump_recipe_versions(recipe_ids)
+
+
+# Модель -> действие после создания вариантов её изображения
+IMAGE_VARIANTS_READY = {
+    RecipeModel: recipe_image_variants_ready,
+    UserModel: avatar_variants_ready,
+}
+
+
+def schedule_image_variants(sender, instance, raw=False, update_fields=None,
+                            **kwargs):
+    """Запускает фоновую генерацию вариантов нового изображения"""
+    field_name = IMAGE_FIELDS[sender]
+    if raw or (update_fields is not None and field_name not in update_fields):
+        return
+    field_file = getattr(instance, field_name)
+    if field_file and not field_file.variants_ready:
+        schedule_variants(field_file, IMAGE_VARIANTS_READY[sender])
+
+
+for image_model in IMAGE_FIELDS:
+    post_save.connect(schedule_image_variants, sender=image_model)
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import RecipeModel
+from ..recipe_index import recipe_ingredient_index
+from ..short_links import recipe_id_bitmap
+
+
+@receiver(post_save, sender=RecipeModel)
+def refresh_recipe_ingredient_index(sender, instance, raw=False, **kwargs):
+    """Обновляет инвертированный индекс ингредиентов после фиксации"""
+    if raw:
+        return
+    recipe_ids = [instance.pk]
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.refresh_recipes(recipe_ids)
+    )
+
+
+@receiver(post_delete, sender=RecipeModel)
+def remove_from_recipe_ingredient_index(sender, instance, **kwargs):
+    recipe_ids = [instance.pk]
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.remove_recipes(recipe_ids)
+    )
+
+
+@receiver(post_save, sender=RecipeModel)
+def add_to_recipe_id_bitmap(sender, instance, created, raw=False, **kwargs):
+    """Короткая ссылка нового рецепта работает сразу после фиксации"""
+    if created and not raw:
+        recipe_id = instance.pk
+        transaction.on_commit(lambda: recipe_id_bitmap.add(recipe_id))
+
+
+@receiver(post_delete, sender=RecipeModel)
+def remove_from_recipe_id_bitmap(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: recipe_id_bitmap.discard(recipe_id))
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import IngredientModel, RecipeIngredientModel, RecipeModel
+from ..search import get_search_backend
+
+
+@receiver(post_save, sender=RecipeModel)
+def update_recipe_search_document(sender, instance, using, raw=False,
+                                  **kwargs):
+    """Пересчитывает поисковый документ рецепта после фиксации транзакции"""
+    if raw:
+        return
+    recipe_ids = [instance.pk]
+    transaction.on_commit(
+        lambda: get_search_backend(using).update_documents(recipe_ids),
+        using=using,
+    )
+
+
+@receiver(post_delete, sender=RecipeModel)
+def delete_recipe_search_document(sender, instance, using, **kwargs):
+    get_search_backend(using).delete_documents([instance.pk])
+
+
+@receiver(post_save, sender=IngredientModel)
+def update_ingredient_search_documents(sender, instance, created, using,
+                                       **kwargs):
+    """Обновляет документы рецептов с переименованным ингредиентом"""
+    if created:
+        return
+    recipe_ids = list(
+        RecipeIngredientModel.objects
+        .using(using)
+        .filter(ingredient=instance)
+        .values_list("recipe_id", flat=True)
+    )
+    transaction.on_commit(
+        lambda: get_search_backend(using).update_documents(recipe_ids),
+        using=using,
+    )
+
+
+def create_search_index(sender, using, **kwargs):
+    """Создаёт таблицу полнотекстового поиска после миграций"""
+    get_search_backend(using).create_index()
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..cooking_time import invalidate_cooking_time_histogram
+from ..ingredient_index import ingredient_index
+from ..models import (
+    FavoriteRecipeModel,
+    IngredientModel,
+    RecipeModel,
+    ShoppingCart,
+    SubscriptionModel,
+    UserModel,
+)
+from ..versions import bump_recipe_versions, bump_viewer_version
+
+# Поля пользователя, которые выводятся в рецептах его авторства
+AUTHOR_PROFILE_FIELDS = {
+    "email", "username", "first_name", "last_name", "avatar"
+}
+
+
+@receiver([post_save, post_delete], sender=IngredientModel)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сбрасывает индекс ингредиентов при изменении справочника"""
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=RecipeModel)
+def invalidate_recipe_statistics(sender, **kwargs):
+    """Сбрасывает кэш гистограммы времени приготовления"""
+    invalidate_cooking_time_histogram()
+
+
+@receiver([post_save, post_delete], sender=RecipeModel)
+def invalidate_recipe_responses(sender, instance, update_fields=None,
+                                **kwargs):
+    """Сбрасывает закэшированные ответы с рецептом после фиксации транзакции"""
+    # Версия сохранённого рецепта — его updated_at, который save() уже
+    # обновил, если он не исключён через update_fields
+    recipe_ids = []
+    if update_fields is not None and "updated_at" not in update_fields:
+        recipe_ids = [instance.pk]
+    transaction.on_commit(lambda: bump_recipe_versions(recipe_ids))
+
+
+@receiver(post_save, sender=UserModel)
+def invalidate_author_responses(sender, instance, created, update_fields=None,
+                                **kwargs):
+    """Сбрасывает закэшированные рецепты автора при изменении его профиля"""
+    if created or (update_fields is not None
+                   and not AUTHOR_PROFILE_FIELDS.intersection(update_fields)):
+        return
+    recipe_ids = list(instance.recipes.values_list("pk", flat=True))
+    if recipe_ids:
+        transaction.on_commit(lambda: bump_recipe_versions(recipe_ids))
+
+
+@receiver([post_save, post_delete], sender=FavoriteRecipeModel)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=SubscriptionModel)
+def invalidate_viewer_responses(sender, instance, **kwargs):
+    """Меняет версию связей пользователя с рецептами и авторами"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_viewer_version(user_id))
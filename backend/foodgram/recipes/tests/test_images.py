@@ -0,0 +1,154 @@
+from concurrent.futures import Future
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.images import variant_name
+from recipes.models import RecipeModel, UserModel
+
+GENERATE_VARIANTS = "recipes.images.generate_variants"
+
+
+def image_file(name, color, size, image_format):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, image_format)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class ImmediateExecutor:
+    """Выполняет задачи сразу, чтобы тест видел результат генерации"""
+
+    def submit(self, function, *args):
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        patches = [
+            mock.patch(
+                "recipes.images.get_executor", return_value=ImmediateExecutor()
+            ),
+            # Соединение теста живёт внутри транзакции и не закрывается
+            mock.patch("recipes.images.close_old_connections"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.author = UserModel.objects.create_user(
+            username="author", email="author@example.com", password="x"
+        )
+
+    def create_recipe(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = RecipeModel.objects.create(
+                author=self.author,
+                name="soup",
+                text="text",
+                cooking_time=5,
+                image=upload,
+            )
+        recipe.refresh_from_db()
+        return recipe
+
+    def open_variant(self, recipe, variant):
+        path = variant_name(recipe.image.name, variant)
+        with recipe.image.storage.open(path) as file:
+            image = Image.open(file)
+            image.load()
+        return image
+
+    def test_variant_names_keep_extension(self):
+        self.assertNotEqual(
+            variant_name("recipes/temp.png", "card"),
+            variant_name("recipes/temp.jpeg", "card"),
+        )
+
+    def test_variants_of_same_stem_do_not_collide(self):
+        red = self.create_recipe(
+            image_file("temp.png", (255, 0, 0), (50, 50), "PNG")
+        )
+        blue = self.create_recipe(
+            image_file("temp.jpeg", (0, 0, 255), (900, 900), "JPEG")
+        )
+        self.assertTrue(red.image_variants_ready)
+        self.assertTrue(blue.image_variants_ready)
+
+        card = self.open_variant(blue, "card")
+        self.assertEqual(card.size, (480, 480))
+        red_value, _, blue_value = card.convert("RGB").getpixel((10, 10))
+        self.assertGreater(blue_value, 200)
+        self.assertLess(red_value, 50)
+        self.assertEqual(self.open_variant(red, "card").size, (50, 50))
+
+    def test_stale_variants_are_replaced(self):
+        storage = RecipeModel._meta.get_field("image").storage
+        storage.save(
+            variant_name("recipes/fresh.png", "card"),
+            image_file("card.webp", (255, 0, 0), (10, 10), "WEBP"),
+        )
+        recipe = self.create_recipe(
+            image_file("fresh.png", (0, 255, 0), (600, 300), "PNG")
+        )
+        self.assertEqual(recipe.image.name, "recipes/fresh.png")
+        self.assertEqual(self.open_variant(recipe, "card").size, (480, 240))
+
+    def test_urls_fall_back_until_variants_are_ready(self):
+        with mock.patch(GENERATE_VARIANTS, return_value=False):
+            recipe = self.create_recipe(
+                image_file("slow.png", (0, 0, 0), (20, 20), "PNG")
+            )
+        self.assertFalse(recipe.image_variants_ready)
+        self.assertEqual(recipe.image.variant_url("card"), recipe.image.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.image_variants_ready)
+        self.assertTrue(
+            recipe.image.variant_url("card").endswith("/card.webp")
+        )
+
+    def test_new_upload_resets_flag_and_bumps_version(self):
+        recipe = self.create_recipe(
+            image_file("first.png", (0, 0, 0), (20, 20), "PNG")
+        )
+        updated_at = recipe.updated_at
+        with mock.patch(GENERATE_VARIANTS, return_value=False):
+            recipe.image = image_file(
+                "second.png", (9, 9, 9), (20, 20), "PNG"
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.save()
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.image_variants_ready)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        ready = RecipeModel.objects.get(pk=recipe.pk)
+        self.assertTrue(ready.image_variants_ready)
+        self.assertGreater(ready.updated_at, updated_at)
+
+    def test_command_generates_missing_variants(self):
+        with mock.patch(GENERATE_VARIANTS, return_value=False):
+            recipe = self.create_recipe(
+                image_file("late.png", (0, 0, 0), (20, 20), "PNG")
+            )
+        self.assertFalse(recipe.image_variants_ready)
+
+        call_command("generate_image_variants", stdout=StringIO())
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.image_variants_ready)
+        self.assertEqual(self.open_variant(recipe, "thumbnail").size, (20, 20))
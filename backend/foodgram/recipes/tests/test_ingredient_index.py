@@ -0,0 +1,115 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from recipes.ingredient_index import IngredientIndex, bump_catalog_version
+from recipes.models import IngredientModel
+
+NAMES = ["salt", "Salted butter", "sugar", "соль", "Сахар"]
+
+
+def create_ingredients(names):
+    return IngredientModel.objects.bulk_create(
+        IngredientModel(name=name, measurement_unit="g") for name in names
+    )
+
+
+def names(rows):
+    return [row["name"] for row in rows]
+
+
+@override_settings(INGREDIENT_VERSION_CHECK_INTERVAL=60)
+class IngredientIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(NAMES)
+
+    def setUp(self):
+        self.index = IngredientIndex(ttl=60)
+
+    def test_prefix_match_ignores_case(self):
+        self.assertEqual(names(self.index.search("SAL")),
+                         ["salt", "Salted butter"])
+        self.assertEqual(names(self.index.search("salte")),
+                         ["Salted butter"])
+        self.assertEqual(names(self.index.search("С")), ["Сахар", "соль"])
+        self.assertEqual(self.index.search("pepper"), [])
+
+    def test_empty_prefix_returns_all_sorted(self):
+        self.assertEqual(
+            names(self.index.search("")),
+            sorted(NAMES, key=str.lower),
+        )
+
+    def test_rows_match_serializer_fields(self):
+        salt = IngredientModel.objects.get(name="salt")
+        self.assertEqual(self.index.search("salt")[0], {
+            "id": salt.pk, "name": "salt", "measurement_unit": "g",
+        })
+
+    def test_search_does_not_query_database(self):
+        self.index.search("s")
+        with self.assertNumQueries(0):
+            self.index.search("su")
+
+    def test_rebuilds_after_catalog_version_change(self):
+        self.index.search("s")
+        create_ingredients(["saffron"])
+        bump_catalog_version()
+        # Версия сверяется с БД не чаще INGREDIENT_VERSION_CHECK_INTERVAL
+        self.assertNotIn("saffron", names(self.index.search("sa")))
+        with override_settings(INGREDIENT_VERSION_CHECK_INTERVAL=0):
+            self.assertIn("saffron", names(self.index.search("sa")))
+
+    def test_rebuilds_after_ttl(self):
+        self.index.search("s")
+        create_ingredients(["saffron"])
+        self.index._ttl = -1
+        self.assertIn("saffron", names(self.index.search("sa")))
+
+
+@override_settings(INGREDIENT_VERSION_CHECK_INTERVAL=0)
+class IngredientSearchApiTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(NAMES)
+
+    def search(self, name):
+        response = self.client.get("/api/ingredients/", {"name": name})
+        self.assertEqual(response.status_code, 200)
+        return names(response.json())
+
+    def test_ingredient_change(self):
+        self.assertEqual(self.search("pe"), [])
+        salt = IngredientModel.objects.get(name="salt")
+        salt.name = "pepper"
+        salt.save()
+        self.assertEqual(self.search("pe"), ["pepper"])
+        salt.delete()
+        self.assertEqual(self.search("pe"), [])
+
+    def test_import(self):
+        self.assertEqual(self.search("pe"), [])
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "ingredients.json"
+            path.write_text(json.dumps([
+                {"name": "Pepper", "measurement_unit": "G"},
+                {"name": "salt", "measurement_unit": "kg"},
+            ]))
+            call_command("install_ingredients", str(path), stdout=StringIO())
+        self.assertEqual(self.search("pe"), ["pepper"])
+        self.assertEqual(
+            self.client.get("/api/ingredients/", {"name": "salt"}).json()[0],
+            {
+                "id": IngredientModel.objects.get(name="salt").pk,
+                "name": "salt",
+                "measurement_unit": "kg",
+            },
+        )
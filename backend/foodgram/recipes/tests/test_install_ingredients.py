@@ -0,0 +1,56 @@
+import json
+from io import StringIO
+
+from django.test import SimpleTestCase
+
+from recipes.management.commands.install_ingredients import iter_json_array
+
+DOCUMENTS = [
+    "[]",
+    " [ ] ",
+    "[1.5e3]",
+    "[-0.25E-2, 1e+2, 0, 12]",
+    '["a", "b\\"c", "\\u0441\\u043e\\u043b\\u044c"]',
+    '[true, false, null]',
+    '[{"name": "salt", "measurement_unit": "g"}, [1, [2]]]',
+    '[\n  {"name": "соль",\n   "measurement_unit": "г"}\n]\n',
+]
+
+INVALID_DOCUMENTS = [
+    "",
+    "{}",
+    "[1",
+    "[1,",
+    "[1 2]",
+    "[1.]",
+    '["salt]',
+    "[tru]",
+]
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """Разбор по блокам не зависит от того, где проходят их границы"""
+
+    def parse(self, document, chunk_size):
+        return list(iter_json_array(StringIO(document), chunk_size))
+
+    def test_any_chunk_size(self):
+        for document in DOCUMENTS:
+            for chunk_size in range(1, len(document) + 2):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    self.assertEqual(
+                        self.parse(document, chunk_size), json.loads(document)
+                    )
+
+    def test_invalid_documents(self):
+        for document in INVALID_DOCUMENTS:
+            for chunk_size in range(1, len(document) + 2):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(json.JSONDecodeError):
+                        self.parse(document, chunk_size)
+
+    def test_reads_lazily(self):
+        file = StringIO("[1, 2, " + "3, " * 1000 + "4]")
+        items = iter_json_array(file, chunk_size=4)
+        self.assertEqual([next(items), next(items)], [1, 2])
+        self.assertLess(file.tell(), 20)
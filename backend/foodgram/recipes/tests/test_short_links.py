@@ -0,0 +1,148 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from recipes.models import RecipeModel, UserModel
+from recipes.short_links import (
+    CODE_LENGTH,
+    CODE_SPACE,
+    NEW_ID_WINDOW,
+    ShortCodeConverter,
+    _permutation,
+    decode_short_code,
+    encode_recipe_id,
+    recipe_id_bitmap,
+)
+
+
+class ShortCodeTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        for recipe_id in (1, 2, 61, 62, 12345, 10 ** 9, CODE_SPACE - 1):
+            code = encode_recipe_id(recipe_id)
+            self.assertEqual(len(code), CODE_LENGTH)
+            self.assertTrue(code.isalnum())
+            self.assertEqual(decode_short_code(code), recipe_id)
+
+    def test_neighbouring_ids_get_unrelated_codes(self):
+        codes = [encode_recipe_id(recipe_id) for recipe_id in range(1, 50)]
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertEqual(len({code[:4] for code in codes}), len(codes))
+
+    def test_invalid_codes(self):
+        for code in ("", "abc", "abcdefgh", "abc-efg"):
+            with self.assertRaises(ValueError):
+                decode_short_code(code)
+        for recipe_id in (0, -1, CODE_SPACE):
+            with self.assertRaises(ValueError):
+                encode_recipe_id(recipe_id)
+
+    def test_codes_depend_on_secret_key(self):
+        code = encode_recipe_id(42)
+        with override_settings(SECRET_KEY="another secret"):
+            _permutation.cache_clear()
+            try:
+                self.assertNotEqual(encode_recipe_id(42), code)
+            finally:
+                _permutation.cache_clear()
+        self.assertEqual(encode_recipe_id(42), code)
+
+    def test_converter_candidates(self):
+        converter = ShortCodeConverter()
+        code = encode_recipe_id(42)
+        self.assertEqual(converter.to_python(code), (42,))
+        self.assertEqual(converter.to_python("123456"), (123456,))
+        self.assertEqual(converter.to_python("12345678"), (12345678,))
+        # Семь цифр — и код, и id старой ссылки
+        self.assertEqual(
+            converter.to_python("1234567"),
+            (decode_short_code("1234567"), 1234567),
+        )
+        self.assertEqual(converter.to_url(42), code)
+
+
+class ShortLinkRedirectTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = UserModel.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="password-123",
+        )
+        cls.recipe = RecipeModel.objects.create(
+            author=author,
+            name="soup",
+            text="text",
+            cooking_time=10,
+            image="recipes/test.png",
+            image_variants_ready=True,
+        )
+
+    def setUp(self):
+        recipe_id_bitmap.build()
+
+    def test_get_link_returns_code(self):
+        self.client.force_login(self.recipe.author)
+        response = self.client.get(f"/api/recipes/{self.recipe.pk}/get-link/")
+        self.assertEqual(response.status_code, 200)
+        code = encode_recipe_id(self.recipe.pk)
+        self.assertTrue(response.json()["short-link"].endswith(f"/s/{code}/"))
+
+    def test_code_redirects_to_recipe(self):
+        response = self.client.get(
+            reverse("recipes:short-link-redirect", args=[self.recipe.pk])
+        )
+        self.assertRedirects(
+            response,
+            f"/recipes/{self.recipe.pk}/",
+            fetch_redirect_response=False,
+        )
+
+    def test_legacy_numeric_link_redirects(self):
+        response = self.client.get(f"/s/{self.recipe.pk}/")
+        self.assertRedirects(
+            response,
+            f"/recipes/{self.recipe.pk}/",
+            fetch_redirect_response=False,
+        )
+
+    def test_legacy_links_with_long_ids_redirect(self):
+        for recipe_id in (1_234_567, 12_345_678):
+            with self.captureOnCommitCallbacks(execute=True):
+                RecipeModel.objects.create(
+                    pk=recipe_id,
+                    author=self.recipe.author,
+                    name=f"recipe {recipe_id}",
+                    text="text",
+                    cooking_time=10,
+                    image="recipes/test.png",
+                    image_variants_ready=True,
+                )
+            response = self.client.get(f"/s/{recipe_id}/")
+            self.assertRedirects(
+                response,
+                f"/recipes/{recipe_id}/",
+                fetch_redirect_response=False,
+            )
+
+    def test_unknown_recipe_is_not_found_without_query(self):
+        missing_id = self.recipe.pk + NEW_ID_WINDOW + 1
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/s/{encode_recipe_id(missing_id)}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_recipe_from_another_process_is_found(self):
+        # bulk_create не отправляет сигналы: карта этого процесса о рецепте
+        # не знает, как о рецепте, созданном другим воркером
+        recipe = RecipeModel.objects.bulk_create([
+            RecipeModel(
+                author=self.recipe.author,
+                name="stew",
+                text="text",
+                cooking_time=10,
+                image="recipes/test.png",
+                image_variants_ready=True,
+            )
+        ])[0]
+        response = self.client.get(f"/s/{encode_recipe_id(recipe.pk)}/")
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from recipes.models import (
+    FavoriteRecipeModel,
+    RecipeModel,
+    ShoppingCart,
+    TrendingScoreModel,
+    TrendingStateModel,
+    UserModel,
+)
+from recipes.trending import EVENT_GRACE_PERIOD, refresh_trending
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+UNTIL = NOW - EVENT_GRACE_PERIOD
+HALF_LIFE = timedelta(hours=24)
+
+
+def create_user(username):
+    return UserModel.objects.create_user(
+        username=username, email=f"{username}@example.com"
+    )
+
+
+def create_recipe(author, name):
+    return RecipeModel.objects.create(
+        author=author, name=name, text=name, cooking_time=1,
+        image="recipes/test.png", image_variants_ready=True,
+    )
+
+
+def scores():
+    return dict(TrendingScoreModel.objects.values_list("recipe_id", "score"))
+
+
+class RefreshTrendingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(f"user{number}") for number in range(3)]
+        author = create_user("author")
+        cls.first, cls.second = (
+            create_recipe(author, name) for name in ("soup", "stew")
+        )
+
+    def favorite(self, recipe, created_at, user=0):
+        return FavoriteRecipeModel.objects.create(
+            user=self.users[user], recipe=recipe, created_at=created_at
+        )
+
+    def test_scores_decay_with_half_life(self):
+        self.favorite(self.first, UNTIL)
+        self.favorite(self.second, UNTIL - HALF_LIFE)
+        ShoppingCart.objects.create(
+            user=self.users[0], recipe=self.second, created_at=UNTIL
+        )
+        self.assertEqual(refresh_trending(now=NOW), 2)
+        result = scores()
+        self.assertAlmostEqual(result[self.first.pk], 1.0)
+        # Половина веса избранного и вес корзины 0.5
+        self.assertAlmostEqual(result[self.second.pk], 1.0)
+
+        self.favorite(self.second, NOW, user=1)
+        refresh_trending(now=NOW + HALF_LIFE)
+        self.assertGreater(scores()[self.second.pk], scores()[self.first.pk])
+
+    def test_watermark_counts_each_event_once(self):
+        self.favorite(self.first, UNTIL - timedelta(hours=1))
+        refresh_trending(now=NOW)
+        self.assertEqual(TrendingStateModel.objects.get().watermark, UNTIL)
+        before = scores()
+
+        self.assertEqual(refresh_trending(now=NOW), 0)
+        self.assertEqual(scores(), before)
+
+        later = NOW + timedelta(hours=1)
+        self.favorite(self.first, later - timedelta(minutes=30), user=1)
+        self.assertEqual(refresh_trending(now=later), 1)
+        self.assertGreater(scores()[self.first.pk], before[self.first.pk])
+        self.assertEqual(
+            TrendingStateModel.objects.get().watermark,
+            later - EVENT_GRACE_PERIOD,
+        )
+
+    def test_grace_period_defers_recent_events(self):
+        refresh_trending(now=NOW)
+        # Транзакция события могла ещё не зафиксироваться к запуску
+        self.favorite(self.first, NOW - EVENT_GRACE_PERIOD / 2)
+        self.assertEqual(refresh_trending(now=NOW), 0)
+        self.assertEqual(scores(), {})
+
+        self.assertEqual(refresh_trending(now=NOW + EVENT_GRACE_PERIOD), 1)
+        self.assertIn(self.first.pk, scores())
+
+    def test_full_refresh_forgets_removed_and_old_events(self):
+        removed = self.favorite(self.first, UNTIL)
+        self.favorite(self.second, UNTIL - timedelta(days=30))
+        refresh_trending(now=NOW)
+        self.assertEqual(set(scores()), {self.first.pk})
+
+        removed.delete()
+        self.assertEqual(set(scores()), {self.first.pk})
+        refresh_trending(full=True, now=NOW)
+        self.assertEqual(scores(), {})
+
+    def test_command(self):
+        self.favorite(self.first, timezone.now() - 2 * EVENT_GRACE_PERIOD)
+        output = StringIO()
+        call_command("refresh_trending", stdout=output)
+        self.assertIn("Updated trending scores of 1 recipes",
+                      output.getvalue())
+        self.assertEqual(set(scores()), {self.first.pk})
+
+
+class TrendingOrderingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        cls.recipes = [
+            create_recipe(author, f"recipe {number}") for number in range(4)
+        ]
+        TrendingScoreModel.objects.bulk_create([
+            TrendingScoreModel(recipe=cls.recipes[1], score=5.0),
+            TrendingScoreModel(recipe=cls.recipes[3], score=2.0),
+            TrendingScoreModel(recipe=cls.recipes[0], score=2.0),
+        ])
+        cls.expected = [cls.recipes[index].pk for index in (1, 0, 3)]
+
+    def test_ordering(self):
+        response = self.client.get("/api/recipes/?ordering=trending")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], self.expected
+        )
+
+    def test_cursor_pages(self):
+        ids = []
+        url = "/api/recipes/?ordering=trending&limit=1&cursor="
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(ids, self.expected)
@@ -0,0 +1,118 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    FavoriteRecipeModel,
+    RecipeModel,
+    ShoppingCart,
+    TrendingScoreModel,
+    TrendingStateModel,
+)
+
+# Модель события -> вес одного события в популярности рецепта
+EVENT_WEIGHTS = {
+    FavoriteRecipeModel: 1.0,
+    ShoppingCart: 0.5,
+}
+
+# События младше этого не обрабатываются: их транзакции могут быть ещё
+# не зафиксированы, и следующий запуск начнёт уже после них
+EVENT_GRACE_PERIOD = timedelta(minutes=1)
+
+# Когда множитель exp((t - epoch) / tau) дорастает до e^REBASE_AFTER,
+# все оценки приводятся к новой точке отсчёта, чтобы не переполнить float
+REBASE_AFTER = 30.0
+SCORE_BATCH_SIZE = 1000
+
+
+def decay_time():
+    """Постоянная времени затухания в секундах"""
+    return settings.TRENDING_HALF_LIFE.total_seconds() / math.log(2)
+
+
+def _rebase(state, epoch, tau):
+    """Приводит оценки к новой точке отсчёта и удаляет затухшие"""
+    factor = math.exp(-(epoch - state.epoch).total_seconds() / tau)
+    TrendingScoreModel.objects.update(score=F("score") * factor)
+    TrendingScoreModel.objects.filter(
+        score__lt=settings.TRENDING_MIN_SCORE
+    ).delete()
+    state.epoch = epoch
+
+
+def _collect(since, until, epoch, tau):
+    increments = defaultdict(float)
+    for model, weight in EVENT_WEIGHTS.items():
+        events = model.objects.filter(created_at__lte=until)
+        if since is not None:
+            events = events.filter(created_at__gt=since)
+        rows = (
+            events.order_by()
+            .values_list("recipe_id", "created_at")
+            .iterator(chunk_size=SCORE_BATCH_SIZE)
+        )
+        for recipe_id, created_at in rows:
+            increments[recipe_id] += weight * math.exp(
+                (created_at - epoch).total_seconds() / tau
+            )
+    return increments
+
+
+def _apply(increments):
+    recipe_ids = list(increments)
+    for start in range(0, len(recipe_ids), SCORE_BATCH_SIZE):
+        batch = recipe_ids[start:start + SCORE_BATCH_SIZE]
+        # Заодно отбрасываются события удалённых рецептов
+        current = (RecipeModel.objects
+                   .filter(pk__in=batch)
+                   .values_list("pk", "trending__score"))
+        scores = [
+            (pk, (score or 0) + increments[pk]) for pk, score in current
+        ]
+        TrendingScoreModel.objects.bulk_create(
+            [
+                TrendingScoreModel(recipe_id=pk, score=score)
+                for pk, score in scores
+                if score >= settings.TRENDING_MIN_SCORE
+            ],
+            update_conflicts=True,
+            unique_fields=["recipe"],
+            update_fields=["score"],
+        )
+
+
+def refresh_trending(full=False, now=None):
+    """
+    Добавляет к оценкам вклад событий, появившихся после прошлого запуска.
+    full пересчитывает оценки по событиям за TRENDING_WINDOW, учитывая и
+    удалённые из избранного и корзины рецепты. Возвращает число рецептов,
+    чьи оценки изменились.
+    """
+    until = (now or timezone.now()) - EVENT_GRACE_PERIOD
+    tau = decay_time()
+
+    with transaction.atomic():
+        state = TrendingStateModel.objects.select_for_update().first()
+        if state is None:
+            state = TrendingStateModel(epoch=until)
+            full = True
+
+        since = state.watermark
+        if full:
+            TrendingScoreModel.objects.all().delete()
+            state.epoch = until
+            since = until - settings.TRENDING_WINDOW
+        elif (until - state.epoch).total_seconds() / tau > REBASE_AFTER:
+            _rebase(state, until, tau)
+
+        increments = _collect(since, until, state.epoch, tau)
+        _apply(increments)
+        state.watermark = until
+        state.save()
+    return len(increments)
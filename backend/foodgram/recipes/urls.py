@@ -1,11 +1,19 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, register_converter
 
-from .views import redirect_short_link
+from .short_links import ShortCodeConverter
+from .views import aredirect_short_link, redirect_short_link
 
 app_name = "recipes"
 
+register_converter(ShortCodeConverter, "shortcode")
+
 urlpatterns = [
     path(
-        "s/<int:recipe_id>/", redirect_short_link, name="short-link-redirect"
+        "s/<shortcode:recipe_ids>/",
+        aredirect_short_link
+        if settings.SERVER_PROFILE == "asgi"
+        else redirect_short_link,
+        name="short-link-redirect",
     ),
 ]
@@ -0,0 +1,89 @@
+from time import time_ns
+
+from django.utils import timezone
+
+from .models import DataVersionModel, RecipeModel
+
+LIST_VERSION_KEY = "recipes:list"
+VIEWER_VERSION_KEY = "viewers:{}"
+
+
+def viewer_version_key(user_id):
+    """Ключ версии избранного, корзины и подписок пользователя"""
+    return VIEWER_VERSION_KEY.format(user_id)
+
+
+def _version_rows(keys):
+    version = time_ns()
+    return [DataVersionModel(key=key, version=version) for key in keys]
+
+
+def bump_versions(*keys):
+    """Меняет версии по ключам одним запросом"""
+    rows = _version_rows(keys)
+    DataVersionModel.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["version"],
+    )
+    return {row.key: row.version for row in rows}
+
+
+def get_versions(*keys):
+    """
+    Версии по ключам одним запросом. Версия ключа, который ещё ни разу не
+    менялся, создаётся при первом чтении.
+    """
+    found = dict(
+        DataVersionModel.objects
+        .filter(key__in=keys)
+        .values_list("key", "version")
+    )
+    missing = [key for key in keys if key not in found]
+    if missing:
+        found.update(bump_versions(*missing))
+    return tuple(found[key] for key in keys)
+
+
+async def aget_versions(*keys):
+    found = {
+        key: version
+        async for key, version in DataVersionModel.objects
+        .filter(key__in=keys)
+        .values_list("key", "version")
+    }
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = _version_rows(missing)
+        await DataVersionModel.objects.abulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["version"],
+        )
+        found.update((row.key, row.version) for row in rows)
+    return tuple(found[key] for key in keys)
+
+
+def recipe_version(updated_at):
+    """Версия отдельного рецепта — время его последнего изменения"""
+    return int(updated_at.timestamp() * 10 ** 6) * 1000
+
+
+def bump_recipe_versions(recipe_ids=()):
+    """
+    Делает устаревшими закэшированные списки рецептов и указанные рецепты.
+    Версия рецепта — его updated_at, поэтому он обновляется у рецептов,
+    представление которых изменилось без их сохранения (профиль автора,
+    готовые варианты изображения).
+    """
+    if recipe_ids:
+        RecipeModel.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+    bump_versions(LIST_VERSION_KEY)
+
+
+def bump_viewer_version(user_id):
+    bump_versions(viewer_version_key(user_id))
@@ -1,11 +1,23 @@
-from django.core.exceptions import ValidationError
+from django.http import Http404
 from django.shortcuts import redirect
 
-from .models import RecipeModel
+from .short_links import recipe_id_bitmap
 
 
-def redirect_short_link(request, recipe_id):
-    """Перенаправляет на рецепт"""
-    if not RecipeModel.objects.filter(id=recipe_id).exists():
-        raise ValidationError(f"Рецепт с id={recipe_id} не существует")
-    return redirect(f"/recipes/{recipe_id}/")
+def redirect_short_link(request, recipe_ids):
+    """
+    Перенаправляет на первый существующий рецепт из кандидатов ссылки,
+    проверяя их наличие по карте id в памяти
+    """
+    for recipe_id in recipe_ids:
+        if recipe_id_bitmap.contains(recipe_id):
+            return redirect(f"/recipes/{recipe_id}/")
+    raise Http404(f"Рецепт с id={recipe_ids[0]} не существует")
+
+
+async def aredirect_short_link(request, recipe_ids):
+    """Асинхронный вариант redirect_short_link для профиля ASGI"""
+    for recipe_id in recipe_ids:
+        if await recipe_id_bitmap.acontains(recipe_id):
+            return redirect(f"/recipes/{recipe_id}/")
+    raise Http404(f"Рецепт с id={recipe_ids[0]} не существует")